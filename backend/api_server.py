@@ -32,11 +32,11 @@ from contextlib import asynccontextmanager
 import json
 import logging
 from queue import Queue
-import zipfile
 from datetime import datetime
 import psutil
 import time
 import shutil
+import zipfile
 import requests
 
 # --- CRITICAL: DEBUG LOGGING FOR PROD ---
@@ -76,6 +76,18 @@ from utils.api_client import (
     download_server_jar,
 )
 from utils.mods_manager import ModsManager
+from utils.blob_store import BlobStore, replace_file
+from utils.chunk_backup import ChunkBackupStore
+from utils.world_size import WorldSizeTracker
+from utils.level_info import LevelInfoCache
+from utils.backup_archive import ARCHIVE_EXT, BackupArchiveReader
+from utils.backup_pipeline import BackupPipeline, discard_staging, resolve_world, staging_report
+from utils.backup_scheduler import BackupScheduler, DEFAULT_RETENTION, parse_cron
+from utils.chunk_trimmer import ChunkTrimmer, TrimError, normalize_areas
+from utils.region_compactor import RegionCompactor
+from utils.region_file import RegionError, exclusive_rewrite
+from utils.mod_metadata import scan_client_only, quarantine_client_only
+from utils.cpu_placement import CpuPlacementScheduler
 
 
 @asynccontextmanager
@@ -105,6 +117,8 @@ async def lifespan(app: FastAPI):
 
     yield
     logging.info("Lifespan shutting down...")
+    if state:
+        state.world_size_tracker.close()
 
 
 app = FastAPI(lifespan=lifespan)
@@ -185,7 +199,11 @@ class AppState:
         # Java Runtimes in AppData
         self.java_runtimes_dir = os.path.join(self.app_data_dir, "java_runtimes")
         self.java_manager = JavaManager(self.java_runtimes_dir)
-        self.mods_manager = ModsManager()
+        self.blob_store = BlobStore(os.path.join(self.app_data_dir, "blob_store"))
+        self.mods_manager = ModsManager(
+            cache_dir=os.path.join(self.app_data_dir, "http_cache"),
+            blob_store=self.blob_store,
+        )
 
         self.active_websockets: List[WebSocket] = []
         self.loop: Optional[asyncio.AbstractEventLoop] = None
@@ -206,18 +224,42 @@ class AppState:
         self.install_error: Optional[str] = None
         self.installed_server_id: Optional[str] = None
 
-        self.world_size_cache = {}
-        self.world_size_inflight = set()
-        self.world_size_lock = threading.Lock()
-        self.world_size_cache_max = 100
+        # Incremental world sizes of every server: one inotify instance and thread,
+        # keyed by world path with its own LRU bound
+        self.world_size_tracker = WorldSizeTracker(max_worlds=64)
+        self.level_info = LevelInfoCache()
+
+        # Incremental world backups (one chunk store per server)
+        self.chunk_stores: Dict[str, ChunkBackupStore] = {}
+        self.chunk_store_lock = threading.Lock()
 
         # Multi-server management
         self.active_handlers = {}  # server_id -> ServerHandler
+        self.cpu_scheduler = CpuPlacementScheduler(
+            enabled=bool(self.config_manager.get("cpu_placement_enabled", False))
+        )
+
+        # Scheduled backups of every server (see utils/backup_scheduler.py)
+        self.backup_scheduler = BackupScheduler(
+            self.config_manager,
+            get_handler=lambda server_id: self.active_handlers.get(server_id),
+            get_chunk_store=self.get_chunk_store,
+            log=self.broadcast_log_sync,
+        )
 
         # App-level log history for Dashboard mini-console
         self.app_log_history = collections.deque(maxlen=500)
 
+    def get_chunk_store(self, server_path: str) -> ChunkBackupStore:
+        with self.chunk_store_lock:
+            store = self.chunk_stores.get(server_path)
+            if store is None:
+                store = ChunkBackupStore(os.path.join(server_path, "world_backups"))
+                self.chunk_stores[server_path] = store
+            return store
+
     def start_background_tasks(self):
+        self.backup_scheduler.start()
         if self._log_queue is None:
             self._log_queue = asyncio.Queue(maxsize=2000)
         if self._log_broadcaster_task is None:
@@ -356,6 +398,16 @@ class AppState:
         if dns_sub:
             new_handler.dns_subdomain = dns_sub
 
+        new_handler.cds_enabled = bool(server_config.get("cds_enabled", False))
+        new_handler.placement_scheduler = self.cpu_scheduler
+        new_handler.cpu_share = float(server_config.get("cpu_share", 1.0) or 1.0)
+        new_handler.cgroup_limits = server_config.get("cgroup_limits")
+        new_handler.client_mod_policy = server_config.get("client_mod_policy", "warn")
+        new_handler.mod_index = self.mods_manager.get_mod_index(server_path)
+        threshold = server_config.get("startup_regression_threshold")
+        if threshold:
+            new_handler.startup_timeline.threshold = float(threshold)
+
         self.config_manager.config["last_selected_id"] = server_id
         self.config_manager.save()
         return server_config
@@ -471,6 +523,10 @@ class ModDeleteRequest(BaseModel):
     filename: str
 
 
+class ModUpdateRequest(BaseModel):
+    updates: List[Dict[str, str]]  # [{"filename", "version_id"}] from /mods/updates
+
+
 class ScheduleStopRequest(BaseModel):
     minutes: int
 
@@ -635,6 +691,7 @@ def get_status():
         "max_players": state.server_handler.get_max_players(),
         "online_players": online_players,
         "uptime": stats["uptime"],
+        "cgroup": stats.get("cgroup"),
         "recent_logs": list(state.log_history)[-50:],
         "shutdown_info": state.server_handler.get_shutdown_info(),
         "tunnel": {
@@ -723,6 +780,41 @@ def get_auto_restart():
     }
 
 
+@app.get("/server/startup-history")
+def get_startup_history():
+    if not state or not state.server_handler:
+        raise HTTPException(status_code=400, detail="Server not configured")
+    return state.server_handler.startup_timeline.get_history()
+
+
+@app.get("/server/cds")
+def get_cds_report():
+    if not state or not state.server_handler:
+        raise HTTPException(status_code=400, detail="Server not configured")
+    report = state.server_handler.cds_manager.get_report()
+    report["enabled"] = state.server_handler.cds_enabled
+    return report
+
+
+@app.post("/server/cds")
+def set_cds_enabled(enabled: bool = True):
+    if not state or not state.server_handler:
+        raise HTTPException(status_code=400, detail="Server not configured")
+    state.server_handler.cds_enabled = enabled
+    state.config_manager.update_server(state.selected_server_id, {"cds_enabled": enabled})
+    return {
+        "message": f"AppCDS {'enabled' if enabled else 'disabled'}. Changes will apply on next restart."
+    }
+
+
+@app.delete("/server/cds")
+def clear_cds_archive():
+    if not state or not state.server_handler:
+        raise HTTPException(status_code=400, detail="Server not configured")
+    state.server_handler.cds_manager.clear()
+    return {"message": "AppCDS archive cleared"}
+
+
 @app.post("/command")
 def send_console_command(cmd: CommandRequest):
     if not state or not state.server_handler:
@@ -774,6 +866,16 @@ def check_java_status(minecraft_version: str):
     return state.java_manager.get_java_status(minecraft_version)
 
 
+@app.get("/setup/java/installations")
+def get_java_installations(refresh: bool = False):
+    if not state:
+        raise HTTPException(status_code=500, detail="App state not initialized")
+    index = state.java_manager.config.get("java_index")
+    if refresh or not index:
+        index = state.java_manager.discover_java()
+    return index
+
+
 class InstallJavaRequest(BaseModel):
     minecraft_version: str
 
@@ -990,6 +1092,7 @@ def install_server(req: InstallRequest):
                         )
 
                 # Ejecutar instalador
+                temp_handler.blob_store = state.blob_store
                 temp_handler.install_forge_server(
                     forge_ver, req.version, forge_progress
                 )
@@ -1032,6 +1135,7 @@ def install_server(req: InstallRequest):
                         )
 
                 # Ejecutar instalador
+                temp_handler.blob_store = state.blob_store
                 temp_handler.install_neoforge_server(neoforge_ver, neoforge_progress)
 
             else:
@@ -1042,6 +1146,7 @@ def install_server(req: InstallRequest):
                 )
                 if not success:
                     raise Exception("Failed to download Server JAR.")
+                state.blob_store.adopt(jar_path)
 
             # 4. Configuración Final
             send_progress(95, "Finalizing configuration...")
@@ -1546,6 +1651,7 @@ def get_worlds():
         return []
 
     server_path = state.server_handler.server_path
+    tracker = state.world_size_tracker
     worlds = []
 
     if os.path.exists(server_path):
@@ -1553,75 +1659,164 @@ def get_worlds():
             item_path = os.path.join(server_path, item)
             if os.path.isdir(item_path):
                 # Check for level.dat to confirm it's a world
-                if os.path.exists(os.path.join(item_path, "level.dat")):
-                    level_dat = os.path.join(item_path, "level.dat")
-                    level_mtime = os.path.getmtime(level_dat)
-                    folder_mtime = os.path.getmtime(item_path)
-
-                    cached = state.world_size_cache.get(item_path)
-                    size_str = None
-                    if cached and cached.get("folder_mtime") == folder_mtime:
-                        size_str = cached.get("size")
-                    else:
-                        size_str = (
-                            cached.get("size")
-                            if cached and cached.get("size")
-                            else "..."
-                        )
-
-                        with state.world_size_lock:
-                            if item_path not in state.world_size_inflight:
-                                state.world_size_inflight.add(item_path)
-
-                                def _compute_world_size(
-                                    path_to_size: str, expected_folder_mtime: float
-                                ):
-                                    try:
-                                        total_size = 0
-                                        for dirpath, dirnames, filenames in os.walk(
-                                            path_to_size
-                                        ):
-                                            for f in filenames:
-                                                fp = os.path.join(dirpath, f)
-                                                try:
-                                                    total_size += os.path.getsize(fp)
-                                                except Exception:
-                                                    pass
-                                        size_mb = round(total_size / (1024 * 1024), 2)
-                                        if state:
-                                            state.world_size_cache[path_to_size] = {
-                                                "size": f"{size_mb} MB",
-                                                "folder_mtime": expected_folder_mtime,
-                                            }
-                                            # Evict oldest entries if cache exceeds limit
-                                            if len(state.world_size_cache) > state.world_size_cache_max:
-                                                excess = sorted(state.world_size_cache.keys())[:-state.world_size_cache_max]
-                                                for k in excess:
-                                                    del state.world_size_cache[k]
-                                    finally:
-                                        if state:
-                                            with state.world_size_lock:
-                                                state.world_size_inflight.discard(
-                                                    path_to_size
-                                                )
-
-                                threading.Thread(
-                                    target=_compute_world_size,
-                                    args=(item_path, folder_mtime),
-                                    daemon=True,
-                                ).start()
-
+                level_dat = os.path.join(item_path, "level.dat")
+                if os.path.exists(level_dat):
+                    size = tracker.get_size(item_path)
+                    size_mb = round(size["total"] / (1024 * 1024), 2)
                     worlds.append(
                         {
                             "name": item,
-                            "size": size_str or "...",
-                            "last_modified": level_mtime,
+                            "size": f"{size_mb} MB",
+                            "size_bytes": size["total"],
+                            "dimensions": size["dimensions"],
+                            "last_modified": os.path.getmtime(level_dat),
+                            "level": state.level_info.get(level_dat),
                         }
                     )
 
     return worlds
 
 
+@app.get("/worlds/analyze")
+def analyze_world_regions(world: Optional[str] = None, top: int = 20):
+    """Where a world's space goes: chunk counts, sizes and free-sector waste per dimension."""
+    if not state or not state.server_handler:
+        raise HTTPException(status_code=400, detail="Server not configured")
+    server_path = state.server_handler.server_path
+    world_name, world_path = _resolve_world(server_path, world)
+    report = state.server_handler.region_analyzer.analyze(world_path, top=max(1, min(top, 200)))
+    return {"world": world_name, **report}
+
+
+class WorldTrimRequest(BaseModel):
+    world: Optional[str] = None
+    threshold_ticks: int = 1200  # InhabitedTime below this (20 ticks = 1s) is trimmed
+    protected: List[Dict] = []  # {"x1","z1","x2","z2"} or {"x","z","radius"}, optional "dimension"
+    dry_run: bool = True
+
+
+@app.post("/worlds/trim")
+def trim_world_chunks(req: WorldTrimRequest):
+    """
+    Removes chunks players barely visited (InhabitedTime). Dry runs return the
+    report; real runs take an incremental backup first and run in the background.
+    """
+    if not state or not state.server_handler:
+        raise HTTPException(status_code=400, detail="Server not configured")
+    if state.server_handler.get_status() != "offline":
+        raise HTTPException(status_code=409, detail="Stop the server before trimming chunks")
+    if req.threshold_ticks <= 0:
+        raise HTTPException(status_code=400, detail="threshold_ticks must be positive")
+    try:
+        normalize_areas(req.protected)
+    except TrimError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    handler = state.server_handler
+    server_path = handler.server_path
+    world_name, world_path = _resolve_world(server_path, req.world)
+    trimmer = ChunkTrimmer()
+
+    def server_active():
+        return handler.get_status() != "offline"
+
+    if req.dry_run:
+        try:
+            return {
+                "world": world_name,
+                **trimmer.trim(world_path, req.threshold_ticks, req.protected, server_active=server_active),
+            }
+        except (TrimError, RegionError) as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    store = state.get_chunk_store(server_path)
+    pipeline = _backup_pipeline(handler, os.path.join(server_path, "world_backups"))
+
+    def backup():
+        if state:
+            state.broadcast_log_sync(f"📦 Backing up {world_name} before trimming", "info")
+        result = pipeline.create_snapshot(world_path, world_name, store)
+        return {"snapshot": result["id"]}
+
+    def progress(done, total):
+        if state:
+            state.broadcast_log_sync(
+                {"type": "progress", "value": int(done * 100 / total), "message": f"Trimming {world_name}"}
+            )
+
+    def run_trim():
+        try:
+            report = trimmer.trim(world_path, req.threshold_ticks, req.protected, dry_run=False,
+                                  backup=backup, progress_callback=progress, server_active=server_active)
+            if not state:
+                return
+            state.world_size_tracker.forget(world_path)
+            state.broadcast_log_sync(
+                f"✂️ Trimmed {report['chunks_removed']} of {report['chunks']} chunks in {world_name}, "
+                f"{report['reclaimed_bytes'] / 1048576:.1f} MB reclaimed "
+                f"(backup: {report['backup']['snapshot']})",
+                "success",
+            )
+        except Exception as e:
+            logging.error(f"Chunk trim failed: {e}")
+            if state:
+                state.broadcast_log_sync(f"❌ Error trimming chunks: {e}", "error")
+
+    threading.Thread(target=run_trim, daemon=True).start()
+    return {"status": "started", "world": world_name}
+
+
+class WorldCompactRequest(BaseModel):
+    world: Optional[str] = None
+
+
+@app.post("/worlds/compact")
+def compact_world_regions(req: WorldCompactRequest):
+    """Rewrites the world's region files without free sectors (GET /worlds/analyze shows the waste)."""
+    if not state or not state.server_handler:
+        raise HTTPException(status_code=400, detail="Server not configured")
+    if state.server_handler.get_status() != "offline":
+        raise HTTPException(status_code=409, detail="Stop the server before compacting region files")
+
+    handler = state.server_handler
+    server_path = handler.server_path
+    world_name, world_path = _resolve_world(server_path, req.world)
+
+    def progress(done, total):
+        if state:
+            state.broadcast_log_sync(
+                {"type": "progress", "value": int(done * 100 / total), "message": f"Compacting {world_name}"}
+            )
+
+    def run_compact():
+        try:
+            if state:
+                state.broadcast_log_sync(f"🗜️ Compacting region files of {world_name}", "info")
+            report = RegionCompactor().compact(
+                world_path, progress_callback=progress, server_active=lambda: handler.get_status() != "offline"
+            )
+            if not state:
+                return
+            state.world_size_tracker.forget(world_path)
+            state.broadcast_log_sync(
+                f"✅ Compacted {report['compacted']} of {report['files']} region files in {world_name}, "
+                f"{report['reclaimed_bytes'] / 1048576:.1f} MB reclaimed in {report['duration']}s",
+                "success",
+            )
+            if report["error_count"]:
+                state.broadcast_log_sync(
+                    f"⚠️ {report['error_count']} region files could not be read and were left as they were",
+                    "warning",
+                )
+        except Exception as e:
+            logging.error(f"Region compaction failed: {e}")
+            if state:
+                state.broadcast_log_sync(f"❌ Error compacting region files: {e}", "error")
+
+    threading.Thread(target=run_compact, daemon=True).start()
+    return {"status": "started", "world": world_name}
+
+
 @app.post("/worlds/create")
 def create_world(request: Request):
     # Basic stub. Minecraft creates world automatically if level-name changes to non-existent folder.
@@ -1645,7 +1840,7 @@ def list_world_backups(world: Optional[str] = None):
     items = []
     try:
         for name in sorted(os.listdir(backups_dir), reverse=True):
-            if not name.lower().endswith(".zip"):
+            if not name.lower().endswith((".zip", ARCHIVE_EXT)):
                 continue
             if world and not name.startswith(f"{world}-"):
                 continue
@@ -1663,59 +1858,56 @@ def list_world_backups(world: Optional[str] = None):
     return items
 
 
+def _resolve_world(server_path: str, world: Optional[str]):
+    try:
+        return resolve_world(server_path, world)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+def _backup_pipeline(handler, backups_dir: str) -> BackupPipeline:
+    def log(message, level="info"):
+        if state:
+            state.broadcast_log_sync(message, level)
+
+    def progress(value, message):
+        if state:
+            state.broadcast_log_sync({"type": "progress", "value": value, "message": message})
+
+    return BackupPipeline(handler, backups_dir, log=log, progress_callback=progress)
+
+
 @app.post("/worlds/backups/create")
 def create_world_backup(req: WorldBackupRequest):
     if not state or not state.server_handler:
         raise HTTPException(status_code=400, detail="Server not configured")
 
     server_path = state.server_handler.server_path
-
-    world_name = (req.world or "").strip() or None
-    if not world_name:
-        props_path = os.path.join(server_path, "server.properties")
-        try:
-            if os.path.exists(props_path):
-                with open(props_path, "r", encoding="utf-8", errors="replace") as f:
-                    for line in f:
-                        if line.startswith("level-name="):
-                            world_name = line.split("=", 1)[1].strip() or None
-                            break
-        except Exception:
-            world_name = None
-
-    if not world_name:
-        world_name = "world"
-
-    world_path = os.path.join(server_path, world_name)
-    if not os.path.isdir(world_path):
-        raise HTTPException(status_code=404, detail=f"World not found: {world_name}")
+    world_name, world_path = _resolve_world(server_path, req.world)
 
     backups_dir = os.path.join(server_path, "world_backups")
     os.makedirs(backups_dir, exist_ok=True)
 
     ts = datetime.now().strftime("%Y%m%d-%H%M%S")
-    backup_name = f"{world_name}-{ts}.zip"
+    backup_name = f"{world_name}-{ts}{ARCHIVE_EXT}"
     backup_path = os.path.join(backups_dir, backup_name)
+    workers = state.config_manager.config.get("app_settings", {}).get("backup_workers")
+    pipeline = _backup_pipeline(state.server_handler, backups_dir)
 
     def run_backup():
         try:
             if state:
                 state.broadcast_log_sync(f"📦 Creating backup: {backup_name}", "info")
 
-            with zipfile.ZipFile(
-                backup_path, "w", compression=zipfile.ZIP_DEFLATED
-            ) as zf:
-                for dirpath, dirnames, filenames in os.walk(world_path):
-                    for filename in filenames:
-                        full_path = os.path.join(dirpath, filename)
-                        try:
-                            arcname = os.path.relpath(full_path, server_path)
-                            zf.write(full_path, arcname=arcname)
-                        except Exception:
-                            pass
+            stats = pipeline.create_archive(world_path, world_name, backup_name, workers)
 
             if state:
-                state.broadcast_log_sync(f"✅ Backup created: {backup_name}", "success")
+                state.broadcast_log_sync(
+                    f"✅ Backup created: {backup_name} ({stats['bytes_in'] / 1048576:.1f} MB → "
+                    f"{stats['bytes_out'] / 1048576:.1f} MB, {stats['throughput']} MB/s, "
+                    f"{stats['codec']} × {stats['workers']})",
+                    "success",
+                )
         except Exception as e:
             try:
                 if os.path.exists(backup_path):
@@ -1729,6 +1921,307 @@ def create_world_backup(req: WorldBackupRequest):
     return {"status": "started", "name": backup_name}
 
 
+class BackupFileRestoreRequest(BaseModel):
+    name: str
+    path: str
+
+
+def _backup_archive_path(name: str) -> str:
+    path = os.path.join(state.server_handler.server_path, "world_backups", os.path.basename(name))
+    if not name.endswith(ARCHIVE_EXT) or not os.path.isfile(path):
+        raise HTTPException(status_code=404, detail=f"Backup not found: {name}")
+    return path
+
+
+@app.get("/worlds/backups/{name}/files")
+def list_backup_files(name: str):
+    if not state or not state.server_handler:
+        raise HTTPException(status_code=400, detail="Server not configured")
+    try:
+        reader = BackupArchiveReader(_backup_archive_path(name))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"files": reader.list_files(), "stats": reader.index.get("stats", {})}
+
+
+@app.post("/worlds/backups/restore-file")
+def restore_backup_file(req: BackupFileRestoreRequest):
+    """Restores one file (e.g. a region or a player's .dat) from a backup archive."""
+    if not state or not state.server_handler:
+        raise HTTPException(status_code=400, detail="Server not configured")
+    handler = state.server_handler
+
+    def server_active():
+        return handler.get_status() != "offline"
+
+    if server_active():
+        raise HTTPException(status_code=409, detail="Stop the server before restoring from a backup")
+
+    server_path = os.path.abspath(handler.server_path)
+    dest = os.path.abspath(os.path.join(server_path, *req.path.split("/")))
+    if not dest.startswith(server_path + os.sep):
+        raise HTTPException(status_code=400, detail="Invalid path")
+    # Archive names start with the world folder
+    world_path = os.path.join(server_path, req.path.split("/", 1)[0])
+    try:
+        # Claimed like a trim: the server cannot start on a half-written file
+        with exclusive_rewrite(world_path, server_active):
+            BackupArchiveReader(_backup_archive_path(req.name)).extract(req.path, dest)
+    except RegionError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except (ValueError, RuntimeError, OSError) as e:
+        raise HTTPException(status_code=500, detail=f"Restore failed: {e}")
+    return {"status": "success", "path": req.path}
+
+
+def _restore_world(server_path: str, world_name: str, rebuild) -> Dict:
+    """
+    Rebuilds a world into <world>.restoring with rebuild(path) and swaps it
+    in; the replaced world is kept as <world>.pre-restore until the next restore.
+    """
+    world_path = os.path.join(server_path, world_name)
+    staging_path = world_path + ".restoring"
+    previous_path = world_path + ".pre-restore"
+    try:
+        # Claimed like a trim: no start, trim or compaction until the swap is done
+        with exclusive_rewrite(world_path, lambda: state.server_handler.get_status() != "offline"):
+            shutil.rmtree(staging_path, ignore_errors=True)
+            result = rebuild(staging_path)
+            if os.path.exists(world_path):
+                shutil.rmtree(previous_path, ignore_errors=True)
+                os.replace(world_path, previous_path)
+            os.replace(staging_path, world_path)
+    except RegionError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        shutil.rmtree(staging_path, ignore_errors=True)
+        raise HTTPException(status_code=500, detail=f"Restore failed: {e}")
+    # The folder was swapped: its watches follow the old one
+    state.world_size_tracker.forget(world_path)
+    # The live-backup mirror describes the replaced world
+    discard_staging(os.path.join(server_path, "world_backups"), world_name)
+    return result
+
+
+class BackupRestoreRequest(BaseModel):
+    name: str
+    world: Optional[str] = None  # Folder to restore; defaults to the one in the backup
+
+
+@app.post("/worlds/backups/restore")
+def restore_world_backup(req: BackupRestoreRequest):
+    """Restores a whole world from a .mcbak (or legacy .zip) backup."""
+    if not state or not state.server_handler:
+        raise HTTPException(status_code=400, detail="Server not configured")
+    if state.server_handler.get_status() != "offline":
+        raise HTTPException(status_code=409, detail="Stop the server before restoring a backup")
+
+    server_path = state.server_handler.server_path
+    path = os.path.join(server_path, "world_backups", os.path.basename(req.name))
+    if not os.path.isfile(path) or not req.name.endswith((ARCHIVE_EXT, ".zip")):
+        raise HTTPException(status_code=404, detail=f"Backup not found: {req.name}")
+
+    if req.name.endswith(ARCHIVE_EXT):
+        try:
+            reader = BackupArchiveReader(path)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        folders = reader.top_folders()
+    else:
+        try:
+            with zipfile.ZipFile(path) as zf:
+                folders = sorted({n.split("/", 1)[0] for n in zf.namelist() if "/" in n})
+        except zipfile.BadZipFile as e:
+            raise HTTPException(status_code=400, detail=f"Not a backup archive: {e}")
+    world_name = req.world or (folders[0] if len(folders) == 1 else None)
+    if not world_name or world_name not in folders:
+        raise HTTPException(status_code=400, detail=f"Choose the world to restore: {', '.join(folders)}")
+
+    def progress(done, total):
+        if state and (done == total or done % 200 == 0):
+            state.broadcast_log_sync(
+                {"type": "progress", "value": int(done * 100 / total), "message": f"Restoring {world_name}"}
+            )
+
+    def rebuild(staging_path):
+        if req.name.endswith(ARCHIVE_EXT):
+            files = reader.extract_all(staging_path, f"{world_name}/", progress)
+        else:
+            files = _extract_zip_world(path, world_name, staging_path)
+        return {"world": world_name, "files": files}
+
+    result = _restore_world(server_path, world_name, rebuild)
+    state.broadcast_log_sync(f"♻️ World {world_name} restored from {req.name}", "success")
+    return result
+
+
+def _extract_zip_world(path: str, world_name: str, dest_dir: str) -> int:
+    root = os.path.abspath(dest_dir)
+    count = 0
+    with zipfile.ZipFile(path) as zf:
+        for info in zf.infolist():
+            if info.is_dir() or not info.filename.startswith(f"{world_name}/"):
+                continue
+            dest = os.path.abspath(os.path.join(root, *info.filename[len(world_name) + 1:].split("/")))
+            if not dest.startswith(root + os.sep):
+                raise ValueError(f"Unsafe path in backup: {info.filename}")
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+            with zf.open(info) as src, open(dest, "wb") as dst:
+                shutil.copyfileobj(src, dst, 256 * 1024)
+            count += 1
+    return count
+
+
+class SnapshotRestoreRequest(BaseModel):
+    snapshot: str
+
+
+@app.post("/worlds/backups/incremental")
+def create_incremental_backup(req: WorldBackupRequest):
+    """Chunk-deduplicated snapshot: only chunks changed since the last one are stored."""
+    if not state or not state.server_handler:
+        raise HTTPException(status_code=400, detail="Server not configured")
+
+    server_path = state.server_handler.server_path
+    world_name, world_path = _resolve_world(server_path, req.world)
+    store = state.get_chunk_store(server_path)
+    pipeline = _backup_pipeline(state.server_handler, os.path.join(server_path, "world_backups"))
+
+    def run_snapshot():
+        try:
+            if state:
+                state.broadcast_log_sync(f"📦 Creating incremental backup of {world_name}", "info")
+
+            result = pipeline.create_snapshot(world_path, world_name, store)
+            stats = result["stats"]
+            if state:
+                state.broadcast_log_sync(
+                    f"✅ Incremental backup created: {result['id']} "
+                    f"({stats['chunks_new']} new chunks, {stats['bytes_added'] / 1048576:.1f} MB added "
+                    f"in {stats['duration']}s)",
+                    "success",
+                )
+        except Exception as e:
+            logging.error(f"Incremental backup failed: {e}")
+            if state:
+                state.broadcast_log_sync(f"❌ Error creating backup: {e}", "error")
+
+    threading.Thread(target=run_snapshot, daemon=True).start()
+    return {"status": "started", "world": world_name}
+
+
+@app.get("/worlds/backups/snapshots")
+def list_world_snapshots(world: Optional[str] = None):
+    if not state or not state.server_handler:
+        return []
+    return state.get_chunk_store(state.server_handler.server_path).list_snapshots(world)
+
+
+@app.post("/worlds/backups/snapshots/restore")
+def restore_world_snapshot(req: SnapshotRestoreRequest):
+    """
+    Rebuilds a snapshot next to the world and swaps it in.
+    The replaced world is kept as <world>.pre-restore until the next restore.
+    """
+    if not state or not state.server_handler:
+        raise HTTPException(status_code=400, detail="Server not configured")
+    if state.server_handler.is_running():
+        raise HTTPException(status_code=409, detail="Stop the server before restoring a backup")
+
+    server_path = state.server_handler.server_path
+    store = state.get_chunk_store(server_path)
+    try:
+        manifest = store.load_manifest(req.snapshot)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail=f"Snapshot not found: {req.snapshot}")
+
+    result = _restore_world(
+        server_path, manifest["world"], lambda staging_path: store.restore_snapshot(manifest["id"], staging_path)
+    )
+
+    state.broadcast_log_sync(f"♻️ World {manifest['world']} restored from {manifest['id']}", "success")
+    return result
+
+
+@app.delete("/worlds/backups/snapshots/{snapshot_id}")
+def delete_world_snapshot(snapshot_id: str, gc: bool = True):
+    if not state or not state.server_handler:
+        raise HTTPException(status_code=400, detail="Server not configured")
+    store = state.get_chunk_store(state.server_handler.server_path)
+    try:
+        store.delete_snapshot(snapshot_id)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail=f"Snapshot not found: {snapshot_id}")
+    return {"status": "success", "gc": store.gc() if gc else None}
+
+
+@app.get("/worlds/backups/store")
+def get_chunk_store_report():
+    if not state or not state.server_handler:
+        raise HTTPException(status_code=400, detail="Server not configured")
+    server_path = state.server_handler.server_path
+    report = state.get_chunk_store(server_path).get_report()
+    # Live backups keep a mirror of each world next to the store
+    staging = staging_report(os.path.join(server_path, "world_backups"))
+    report["staging"] = {"worlds": staging, "bytes": sum(staging.values())}
+    return report
+
+
+@app.delete("/worlds/backups/staging/{world}")
+def delete_backup_staging(world: str):
+    """Frees a world's live-backup mirror; the next live backup copies the world in full again."""
+    if not state or not state.server_handler:
+        raise HTTPException(status_code=400, detail="Server not configured")
+    backups_dir = os.path.join(state.server_handler.server_path, "world_backups")
+    if os.path.basename(world) != world or world not in staging_report(backups_dir):
+        raise HTTPException(status_code=404, detail=f"No staging mirror for {world}")
+    if not discard_staging(backups_dir, world):
+        raise HTTPException(status_code=409, detail="A backup of this world is running")
+    return {"status": "success"}
+
+
+class BackupScheduleRequest(BaseModel):
+    enabled: bool = False
+    interval_minutes: Optional[int] = None
+    cron: Optional[str] = None
+    mode: str = "incremental"  # "incremental" (chunk store) or "archive" (.mcbak)
+    world: Optional[str] = None
+    retention: Optional[Dict[str, int]] = None  # hourly/daily/weekly/monthly
+    io_rate_mb: float = 0  # 0 = unlimited
+    max_lag_ms: int = 1000
+    run_when_offline: bool = False
+
+
+@app.get("/server/backup-schedule")
+def get_backup_schedule():
+    if not state or not state.server_handler:
+        raise HTTPException(status_code=400, detail="Server not configured")
+    return state.backup_scheduler.get_status(state.selected_server_id)
+
+
+@app.post("/server/backup-schedule")
+def set_backup_schedule(req: BackupScheduleRequest):
+    if not state or not state.server_handler:
+        raise HTTPException(status_code=400, detail="Server not configured")
+    if req.mode not in ("incremental", "archive"):
+        raise HTTPException(status_code=400, detail="mode must be 'incremental' or 'archive'")
+    if req.enabled:
+        if req.cron:
+            try:
+                parse_cron(req.cron)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+        elif not req.interval_minutes or req.interval_minutes < 1:
+            raise HTTPException(status_code=400, detail="Set interval_minutes or a cron expression")
+
+    schedule = req.dict()
+    schedule["retention"] = {**DEFAULT_RETENTION, **(req.retention or {})}
+    state.config_manager.update_server(state.selected_server_id, {"backup_schedule": schedule})
+    return state.backup_scheduler.get_status(state.selected_server_id)
+
+
 # --- DNS Proxy Helper ---
 def _get_server_slug(state):
     """Devuelve el subdominio personalizado del servidor, o None si no se ha configurado."""
@@ -2336,6 +2829,8 @@ def install_mod(req: ModInstallRequest):
                 req.version_id,
                 state.server_handler.server_path,
                 progress_callback=progress,
+                loader=state.server_handler.server_type,
+                game_version=state.server_handler.minecraft_version,
             )
 
             if result.get("success"):
@@ -2343,6 +2838,11 @@ def install_mod(req: ModInstallRequest):
                     f"Installation success: {result.get('filename') or 'Modpack'}",
                     "success",
                 )
+                if result.get("dependencies"):
+                    state.broadcast_log_sync(
+                        f"Dependencies installed: {', '.join(result['dependencies'])}",
+                        "info",
+                    )
                 state.broadcast_log_sync(
                     {"type": "mod_install_complete", "success": True}
                 )
@@ -2364,6 +2864,90 @@ def install_mod(req: ModInstallRequest):
     return {"status": "started", "message": "Installation started in background"}
 
 
+@app.get("/mods/updates")
+def check_mod_updates():
+    if not state or not state.server_handler:
+        raise HTTPException(status_code=400, detail="Server not configured")
+    handler = state.server_handler
+    try:
+        return state.mods_manager.check_updates(
+            handler.server_path, handler.server_type, handler.minecraft_version
+        )
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"Update check failed: {e}")
+
+
+@app.post("/mods/updates/apply")
+def apply_mod_updates(req: ModUpdateRequest):
+    if not state or not state.server_handler:
+        raise HTTPException(status_code=400, detail="Server not configured")
+    if state.server_handler.is_running():
+        raise HTTPException(status_code=400, detail="Stop the server first")
+
+    def run_updates():
+        def progress(pct, msg):
+            state.broadcast_log_sync({"type": "progress", "value": pct, "message": msg})
+
+        try:
+            result = state.mods_manager.apply_updates(
+                state.server_handler.server_path, req.updates, progress_callback=progress
+            )
+            for item in result["updated"]:
+                state.broadcast_log_sync(f"Updated {item['from']} -> {item['to']}", "success")
+            for path in result["failed"]:
+                state.broadcast_log_sync(f"Update failed: {path}", "error")
+            for name in result["unresolved"]:
+                state.broadcast_log_sync(f"Update not found for {name}", "error")
+            state.broadcast_log_sync({"type": "mod_install_complete", "success": result["success"]})
+        except Exception as e:
+            state.broadcast_log_sync(f"Update crashed: {e}", "error")
+            state.broadcast_log_sync({"type": "mod_install_complete", "success": False})
+
+    threading.Thread(target=run_updates, daemon=True).start()
+    return {"status": "started", "message": "Updates started in background"}
+
+
+@app.get("/mods/dependencies")
+def get_mod_dependencies():
+    if not state or not state.server_handler:
+        raise HTTPException(status_code=400, detail="Server not configured")
+    return state.mods_manager.get_dependency_graph(state.server_handler.server_path)
+
+
+@app.get("/mods/client-only")
+def get_client_only_mods():
+    if not state or not state.server_handler:
+        raise HTTPException(status_code=400, detail="Server not configured")
+    return {
+        "policy": state.server_handler.client_mod_policy,
+        "mods": scan_client_only(
+            state.server_handler.server_path,
+            state.mods_manager.get_mod_index(state.server_handler.server_path).get_metadata(),
+        ),
+    }
+
+
+@app.post("/mods/client-only/policy")
+def set_client_mod_policy(policy: str):
+    if not state or not state.server_handler:
+        raise HTTPException(status_code=400, detail="Server not configured")
+    if policy not in ("warn", "quarantine", "off"):
+        raise HTTPException(status_code=400, detail="Policy must be warn, quarantine or off")
+    state.server_handler.client_mod_policy = policy
+    state.config_manager.update_server(state.selected_server_id, {"client_mod_policy": policy})
+    return {"status": "success", "policy": policy}
+
+
+@app.post("/mods/client-only/quarantine")
+def quarantine_client_mods():
+    if not state or not state.server_handler:
+        raise HTTPException(status_code=400, detail="Server not configured")
+    if state.server_handler.is_running():
+        raise HTTPException(status_code=400, detail="Stop the server first")
+    moved = quarantine_client_only(state.server_handler.server_path)
+    return {"status": "success", "moved": moved}
+
+
 @app.post("/mods/delete")
 def delete_mod(req: ModDeleteRequest):
     if not state or not state.server_handler:
@@ -2399,7 +2983,7 @@ async def import_mod(file: UploadFile = File(...)):
     if not os.path.exists(mods_path):
         os.makedirs(mods_path)
     dest = os.path.join(mods_path, file.filename)
-    with open(dest, "wb") as f:
+    with replace_file(dest) as f:
         f.write(await file.read())
     state.broadcast_log_sync(f"📦 Mod imported: {file.filename}", "info")
     return {"status": "imported", "filename": file.filename}
@@ -2599,7 +3183,7 @@ async def upload_plugin(file: UploadFile = File(...)):
 
     try:
         contents = await file.read()
-        with open(file_path, "wb") as f:
+        with replace_file(file_path) as f:
             f.write(contents)
         return {"status": "success", "filename": file.filename}
     except Exception as e:
@@ -2700,14 +3284,19 @@ def install_plugin(req: PluginInstallRequest):
                 os.makedirs(plugins_dir)
 
             file_path = os.path.join(plugins_dir, filename)
+            sha1 = (primary_file.get("hashes") or {}).get("sha1")
 
-            progress(10, f"Downloading {filename}...")
+            if state.blob_store.materialize_alias("sha1", sha1, file_path):
+                progress(90, f"{filename} linked from the shared store")
+            else:
+                progress(10, f"Downloading {filename}...")
 
-            with requests.get(url, stream=True, timeout=30) as r:
-                r.raise_for_status()
-                with open(file_path, "wb") as f:
-                    for chunk in r.iter_content(chunk_size=8192):
-                        f.write(chunk)
+                with requests.get(url, stream=True, timeout=30) as r:
+                    r.raise_for_status()
+                    with replace_file(file_path) as f:
+                        for chunk in r.iter_content(chunk_size=8192):
+                            f.write(chunk)
+                state.blob_store.adopt(file_path, {"sha1": sha1})
 
             progress(100, "Installed!")
             state.broadcast_log_sync(f"Plugin installed: {filename}", "success")
@@ -2756,6 +3345,91 @@ def get_system_info():
         }
 
 
+class CgroupLimitsRequest(BaseModel):
+    enabled: bool = False
+    memory_max: Optional[str] = None
+    memory_high: Optional[str] = None
+    cpu_weight: Optional[int] = None
+    cpu_max: Optional[str] = None
+    io_weight: Optional[int] = None
+
+
+@app.get("/server/cgroup")
+def get_cgroup_limits():
+    if not state or not state.server_handler:
+        raise HTTPException(status_code=400, detail="Server not configured")
+    from utils.cgroup_manager import CgroupManager
+
+    handler = state.server_handler
+    return {
+        "available": CgroupManager.is_available(),
+        "limits": handler.cgroup_limits or {"enabled": False},
+        "stats": handler._cgroup.read_stats() if handler._cgroup else None,
+    }
+
+
+@app.post("/server/cgroup")
+def set_cgroup_limits(req: CgroupLimitsRequest):
+    if not state or not state.server_handler:
+        raise HTTPException(status_code=400, detail="Server not configured")
+    from utils.cgroup_manager import parse_size, parse_cpu_max
+
+    try:
+        parse_size(req.memory_max)
+        parse_size(req.memory_high)
+        parse_cpu_max(req.cpu_max)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    limits = req.dict()
+    state.server_handler.cgroup_limits = limits
+    state.config_manager.update_server(state.selected_server_id, {"cgroup_limits": limits})
+    return {"message": "Resource limits saved. Changes will apply on next restart.", "limits": limits}
+
+
+@app.get("/system/blob-store")
+def get_blob_store_report():
+    if not state:
+        raise HTTPException(status_code=500, detail="App state not initialized")
+    return state.blob_store.get_report()
+
+
+@app.post("/system/blob-store/gc")
+def run_blob_store_gc():
+    if not state:
+        raise HTTPException(status_code=500, detail="App state not initialized")
+    return state.blob_store.gc()
+
+
+@app.get("/system/cpu-placement")
+def get_cpu_placement():
+    """Returns the current server -> CPU set mapping and the NUMA topology."""
+    if not state:
+        raise HTTPException(status_code=500, detail="App state not initialized")
+    return state.cpu_scheduler.get_mapping()
+
+
+@app.post("/system/cpu-placement")
+def set_cpu_placement(enabled: bool = True):
+    if not state:
+        raise HTTPException(status_code=500, detail="App state not initialized")
+    state.config_manager.set("cpu_placement_enabled", enabled)
+    state.cpu_scheduler.set_enabled(enabled)
+    return state.cpu_scheduler.get_mapping()
+
+
+@app.post("/server/cpu-share")
+def set_cpu_share(share: float = 1.0):
+    if not state or not state.server_handler:
+        raise HTTPException(status_code=400, detail="Server not configured")
+    if share <= 0:
+        raise HTTPException(status_code=400, detail="Share must be greater than 0")
+    state.server_handler.cpu_share = share
+    state.config_manager.update_server(state.selected_server_id, {"cpu_share": share})
+    state.cpu_scheduler.update_share(state.selected_server_id, share)
+    return state.cpu_scheduler.get_mapping()
+
+
 @app.get("/servers/running")
 def get_running_servers():
     """Returns whether any server is currently running. Used by Electron close handler."""
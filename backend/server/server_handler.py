@@ -14,6 +14,13 @@ import traceback
 
 from utils.api_client import download_file_from_url, download_and_extract_zip
 from utils.java_manager import JavaManager
+from utils.cds_manager import CDSManager
+from utils.cgroup_manager import CgroupManager
+from utils.startup_timeline import StartupTimeline
+from utils.mod_metadata import scan_client_only, quarantine_client_only, QUARANTINE_DIR
+from utils.mod_index import ModIndex
+from utils.region_analyzer import RegionAnalyzer
+from utils.region_file import RegionError, is_rewriting, no_rewrite
 from utils.status_query import get_server_status
 import psutil
 import time
@@ -93,6 +100,41 @@ class ServerHandler:
         self._last_stats_time = 0
         self._stats_update_interval = 2.0  # Update stats every 2 seconds maximum
 
+        # AppCDS class archive (opt-in per server, see utils/cds_manager.py)
+        self.cds_enabled = False
+        self.cds_manager = CDSManager(server_path)
+        self._spawn_time: Optional[float] = None
+
+        # Phase timestamps of every start + regression detection
+        self.startup_timeline = StartupTimeline(server_path)
+
+        # Client-only jars in mods/: "warn", "quarantine" or "off"
+        self.client_mod_policy = "warn"
+        # The ModsManager's index of this server (set by the API layer): one
+        # instance per .mlsg/mod_index.json, or saves overwrite each other
+        self.mod_index: Optional[ModIndex] = None
+
+        # Header-only .mca statistics, cached by region mtime
+        self.region_analyzer = RegionAnalyzer(server_path)
+
+        # CPU placement across running servers (set by the API layer)
+        self.placement_scheduler = None
+        self.cpu_share = 1.0
+
+        # Optional cgroup v2 limits: {"enabled", "memory_max", "memory_high",
+        # "cpu_weight", "cpu_max", "io_weight"} (set by the API layer)
+        self.cgroup_limits: Optional[dict] = None
+        self._cgroup: Optional[CgroupManager] = None
+
+        # Shared content-addressed store for installer libraries (set by the API layer)
+        self.blob_store = None
+
+        # Threads waiting for a console line (see wait_for_log) and
+        # callbacks fed every line (see add_log_listener)
+        self._log_waiters = []
+        self._log_listeners = []
+        self._log_waiters_lock = threading.Lock()
+
     def _log(self, message, level="normal"):
         """Internal log method that stores history and calls callback."""
         # Clean message if string
@@ -156,24 +198,11 @@ class ServerHandler:
 
     def _verify_java_installation(self, java_path):
         """Verifica que la instalación de Java funciona correctamente."""
-        try:
-            result = subprocess.run(
-                [java_path, "-version"],
-                capture_output=True,
-                text=True,
-                timeout=10,
-                creationflags=subprocess.CREATE_NO_WINDOW
-                if sys.platform == "win32"
-                else 0,
-            )
-            if result.returncode != 0:
-                print(
-                    f"[DEBUG] Java Check Failed. Path: {java_path}, RC: {result.returncode}, Stderr: {result.stderr}"
-                )
-            return result.returncode == 0
-        except Exception as e:
-            print(f"[DEBUG] Java Check Exception. Path: {java_path}, Error: {e}")
+        probe = self.java_manager.probe_java(java_path)
+        if not probe or not probe.get("ok"):
+            logging.debug(f"Handler: Java check failed. Path: {java_path}, Probe: {probe}")
             return False
+        return True
 
     def open_folder(self):
         """Abre la carpeta del servidor en el explorador de archivos."""
@@ -216,6 +245,7 @@ class ServerHandler:
                 "--installServer",
                 "."
             ]
+            self._detach_libraries()
             process = subprocess.Popen(
                 install_command,
                 cwd=self.server_path,
@@ -240,6 +270,7 @@ class ServerHandler:
                 )
             else:
                 self.output_callback("Forge installation successful.\n", "info")
+                self._adopt_libraries()
                 # On Windows, a run.bat is created. On Linux/macOS, a run.sh.
                 # The server can now be started with the standard start() method.
 
@@ -262,6 +293,23 @@ class ServerHandler:
             except OSError as e:
                 self.output_callback(f"Error during cleanup: {e}\n", "warning")
 
+    def _detach_libraries(self):
+        """Installers rewrite libraries in place: they must not write through links into the store."""
+        libraries = os.path.join(self.server_path, "libraries")
+        if self.blob_store and os.path.isdir(libraries):
+            self.blob_store.detach_tree(libraries)
+
+    def _adopt_libraries(self):
+        """Deduplicates the installer's libraries/ tree against the shared blob store."""
+        libraries = os.path.join(self.server_path, "libraries")
+        if not self.blob_store or not os.path.isdir(libraries):
+            return
+        try:
+            count = self.blob_store.adopt_tree(libraries)
+            self.output_callback(f"Linked {count} libraries to the shared store.\n", "info")
+        except Exception as e:
+            logging.warning(f"Handler: Could not deduplicate libraries: {e}")
+
     def install_neoforge_server(self, neoforge_version, progress_callback):
         """Downloads and installs a NeoForge server."""
         # NeoForge installer URL: https://maven.neoforged.net/releases/net/neoforged/neoforge/20.4.80/neoforge-20.4.80-installer.jar
@@ -287,6 +335,7 @@ class ServerHandler:
                 "--installServer",
                 "."
             ]
+            self._detach_libraries()
             process = subprocess.Popen(
                 install_command,
                 cwd=self.server_path,
@@ -311,6 +360,7 @@ class ServerHandler:
                 )
             else:
                 self.output_callback("NeoForge installation successful.\n", "info")
+                self._adopt_libraries()
                 self._accept_eula()
                 self._create_default_server_properties()
 
@@ -464,16 +514,34 @@ allow-flight=false
             self.output_callback("Server path is not set up.\n", "error")
             return
 
+        if is_rewriting(self.server_path):
+            self.output_callback("World files are being trimmed or compacted; start the server when it finishes.\n",
+                                 "warning")
+            return
+
+        self.startup_timeline.begin()
+
         # Auto-accept EULA before starting
         self._accept_eula()
 
+        self._check_mods()
+
         command, env = self._get_start_command()
         if not command:
+            self.startup_timeline.abort("No launch command could be built")
             return
+        self.startup_timeline.mark("command_built")
 
-        self.server_fully_started = False
-        self.server_stopping = False
-        self.server_running = True
+        try:
+            # Committed under the rewrite lock: a trim/compaction cannot slip in between
+            with no_rewrite(self.server_path):
+                self.server_fully_started = False
+                self.server_stopping = False
+                self.server_running = True
+        except RegionError as e:
+            self.startup_timeline.abort(str(e))
+            self.output_callback(f"{e}\n", "warning")
+            return
         self.output_callback(
             f"Starting server with command: {' '.join(command)}\n", "info"
         )
@@ -482,6 +550,43 @@ allow-flight=false
             target=self._run_server, args=(command, env), daemon=True
         ).start()
 
+    def _check_mods(self):
+        """Reports missing dependencies and client-only mods before they break the boot."""
+        if not os.path.isdir(os.path.join(self.server_path, "mods")):
+            return
+        index = self.mod_index or ModIndex(self.server_path)
+        try:
+            graph = index.get_dependency_graph()
+            for dep in graph["missing"]:
+                self.output_callback(
+                    f"Missing dependency: {dep['required_by']} ({dep['filename']}) requires "
+                    f"{dep['mod_id']} {dep['version'] or ''}\n",
+                    "warning",
+                )
+            if self.client_mod_policy == "off":
+                return
+            found = scan_client_only(self.server_path, index.get_metadata())
+        except Exception as e:
+            logging.warning(f"Handler: Mod scan failed: {e}")
+            return
+        if not found:
+            return
+
+        if self.client_mod_policy == "quarantine":
+            moved = quarantine_client_only(self.server_path, found)
+            if moved:
+                self.output_callback(
+                    f"Moved {len(moved)} client-only mod(s) to {QUARANTINE_DIR}/: {', '.join(moved)}\n",
+                    "warning",
+                )
+            found = [f for f in found if f["filename"] not in moved]
+
+        for item in found:
+            label = "Client-only mod" if item["certain"] else "Possibly client-only mod"
+            self.output_callback(
+                f"{label} in mods/: {item['filename']} ({item['reason']})\n", "warning"
+            )
+
     def _get_start_command(self):
         java_path = self.java_path
 
@@ -548,22 +653,22 @@ allow-flight=false
                     )
                     return None, None
 
+        self.startup_timeline.mark("java_resolved")
+
         # CRITICAL: Normalize server path
         self.server_path = os.path.normpath(self.server_path)
         java_path = os.path.normpath(java_path)
 
         logging.info(f"Handler: Preparing environment. Java Path: {java_path}")
 
-        # --- JAVA HEALTH CHECK ---
-        try:
-            logging.info("Handler: Running Java health check (-version)...")
-            java_check = subprocess.run(
-                [java_path, "-version"], capture_output=True, text=True, timeout=5
+        # --- JAVA HEALTH CHECK --- (cached probe, no extra JVM spawn on warm starts)
+        java_info = self.java_manager.probe_java(java_path)
+        if java_info:
+            logging.info(
+                f"Handler: Java {java_info.get('version')} ({java_info.get('vendor')}, {java_info.get('arch')})"
             )
-            logging.info(f"Handler: Java Version Check Stdout: {java_check.stdout}")
-            logging.info(f"Handler: Java Version Check Stderr: {java_check.stderr}")
-        except Exception as je:
-            logging.error(f"Handler: Java Health Check FAILED: {je}")
+        else:
+            logging.error(f"Handler: Java Health Check FAILED for {java_path}")
 
         custom_env = os.environ.copy()
         custom_env["PYTHONIOENCODING"] = "utf-8"
@@ -603,7 +708,7 @@ allow-flight=false
             if parsed:
                 if "nogui" not in parsed:
                     parsed.append("nogui")
-                command = [java_path] + parsed
+                command = self._apply_cds_flags([java_path] + parsed, java_path)
                 self.output_callback(
                     "Parsed startup script: using direct Java launch.\n", "info"
                 )
@@ -772,8 +877,36 @@ allow-flight=false
         else:
             command.extend(["-jar", server_jar_path, "--nogui"])
 
+        command = self._apply_cds_flags(command, java_path, java_major)
         return command, custom_env
 
+    def _apply_cds_flags(self, command, java_path, java_major=None):
+        """Inserts the AppCDS flags after the java executable when enabled."""
+        if not self.cds_enabled:
+            self.cds_manager.active_mode = "off"
+            return command
+        try:
+            if java_major is None:
+                java_major = self._detect_java_major_version(java_path)
+            flags = self.cds_manager.get_launch_flags(java_path, java_major, command[1:])
+            mode = self.cds_manager.active_mode
+            if mode == "training":
+                self.output_callback(
+                    "AppCDS: training run, the class archive will be written when the server stops.\n",
+                    "info",
+                )
+            elif mode == "shared":
+                self.output_callback("AppCDS: using cached class archive.\n", "info")
+            elif mode == "unsupported":
+                self.output_callback(
+                    "AppCDS requires Java 13 or newer. Starting without it.\n", "warning"
+                )
+            return [command[0]] + flags + command[1:]
+        except Exception as e:
+            logging.warning(f"Handler: Could not prepare AppCDS flags: {e}")
+            self.cds_manager.active_mode = "off"
+            return command
+
     def _parse_startup_script(self, script_path):
         """Extract Java command args from run.sh/run.bat without executing sh/bat."""
         try:
@@ -811,27 +944,10 @@ allow-flight=false
         return installed_major >= required_version
 
     def _detect_java_major_version(self, java_path: str) -> Optional[int]:
-        try:
-            result = subprocess.run(
-                [java_path, "-version"],
-                capture_output=True,
-                text=True,
-                timeout=5,
-                creationflags=subprocess.CREATE_NO_WINDOW
-                if sys.platform == "win32"
-                else 0,
-            )
-            output = result.stderr or result.stdout
-            import re
-
-            match = re.search(r'version "(\d+)(?:\.(\d+))?', output)
-            if match:
-                major = int(match.group(1))
-                if major == 1 and match.group(2):
-                    major = int(match.group(2))
-                return major
-        except Exception as e:
-            logging.warning(f"Could not detect Java version: {e}")
+        probe = self.java_manager.probe_java(java_path)
+        if probe and probe.get("major"):
+            return probe["major"]
+        logging.warning(f"Could not detect Java version for {java_path}")
         return None
 
     def _run_server(self, command, env):
@@ -839,6 +955,7 @@ allow-flight=false
         stdout_thread = None
         stderr_thread = None
         try:
+            command = self._prepare_cgroup(command)
             logging.info(f"Handler: Launching process in {self.server_path}...")
             self.server_process = subprocess.Popen(
                 command,
@@ -854,8 +971,26 @@ allow-flight=false
                 else 0,
                 env=env,
             )
+            self._spawn_time = time.time()
+            if self._cgroup:
+                # The wrapper joins the group as its first step; give it a moment
+                for _ in range(20):
+                    if self._cgroup.contains(self.server_process.pid) or self.server_process.poll() is not None:
+                        break
+                    time.sleep(0.05)
+                else:
+                    self._log("The server could not join its cgroup; it runs without limits.\n", "warning")
+            self.startup_timeline.mark("process_spawned", self._spawn_time)
             logging.info(f"Handler: Process spawned with PID {self.server_process.pid}")
 
+            if self.placement_scheduler and self.server_id:
+                try:
+                    self.placement_scheduler.register(
+                        self.server_id, self.server_process.pid, self.cpu_share
+                    )
+                except Exception as pe:
+                    logging.warning(f"Handler: CPU placement failed: {pe}")
+
             stdout_thread = threading.Thread(
                 target=self._read_output,
                 args=(self.server_process.stdout, "normal"),
@@ -904,6 +1039,19 @@ allow-flight=false
             except:
                 pass
 
+            if self.placement_scheduler and self.server_id:
+                try:
+                    self.placement_scheduler.unregister(self.server_id)
+                except Exception:
+                    pass
+
+            if self._cgroup:
+                self._cgroup.cleanup()
+                self._cgroup = None
+
+            if self.startup_timeline.is_active():
+                self.startup_timeline.abort("Process exited before the server finished starting")
+
             # --- CRITICAL FIX: ACTUALIZAR ESTADO INTERNO PRIMERO ---
             # Guardamos el estado previo para el log
             was_stopping = self.server_stopping
@@ -954,6 +1102,35 @@ allow-flight=false
                     }
                 )
 
+    def _prepare_cgroup(self, command):
+        """
+        Creates the server's cgroup v2 group if limits are enabled.
+        Returns the launch command, wrapped to join the group when there is one.
+        """
+        self._cgroup = None
+        if not self.cgroup_limits or not self.cgroup_limits.get("enabled"):
+            return command
+        if not sys.platform.startswith("linux"):
+            return command
+        if not CgroupManager.is_available():
+            self._log(
+                "cgroup v2 limits are enabled but no delegated cgroup is available. Starting without limits.\n",
+                "warning",
+            )
+            return command
+
+        cgroup = CgroupManager(self.server_id, self.cgroup_limits)
+        if not cgroup.prepare():
+            self._log("Could not create cgroup for this server. Starting without limits.\n", "warning")
+            return command
+
+        self._cgroup = cgroup
+        self._log(
+            f"Resource limits applied via cgroup ({', '.join(cgroup.enabled_controllers) or 'no controllers'}).\n",
+            "info",
+        )
+        return cgroup.wrap_command(command)
+
     def _process_log_line(
         self,
         line,
@@ -966,6 +1143,12 @@ allow-flight=false
     ):
         line_no_ansi = re.sub(r"\x1B(?:[@-Z\\-_]|\[[0-?]*[ -/]*[@-~])", "", line)
 
+        if not self.server_fully_started:
+            self.startup_timeline.observe_line(line_no_ansi)
+
+        if self._log_waiters or self._log_listeners:
+            self._notify_log_waiters(line_no_ansi)
+
         is_done = False
         if "Done" in line_no_ansi and (
             "For help" in line_no_ansi or "help" in line_no_ansi.lower()
@@ -987,6 +1170,7 @@ allow-flight=false
             self.server_fully_started = True
             self.server_stopping = False
             self._restart_count = 0  # Reset restart counter on successful start
+            self._record_startup_time(line_no_ansi)
             # Broadcast explicit status change to online
             if self.output_callback:
                 self.output_callback(
@@ -1072,6 +1256,36 @@ allow-flight=false
         if not suppress_from_console:
             self._log(line + "\n", level)
 
+    def _record_startup_time(self, done_line):
+        """Closes the startup timeline and stores time-to-Done for the CDS report."""
+        try:
+            reported = None
+            m = re.search(r"Done \((\d+(?:[.,]\d+)?)s\)", done_line)
+            if m:
+                reported = float(m.group(1).replace(",", "."))
+            wall = time.time() - self._spawn_time if self._spawn_time else None
+            cds_mode = self.cds_manager.active_mode
+            self.cds_manager.record_startup(cds_mode, reported, wall)
+
+            entry = self.startup_timeline.finish(reported, {"cds_mode": cds_mode})
+            if entry and entry.get("regression"):
+                self._log(
+                    f"Startup took {entry['total_seconds']:.1f}s, slower than the usual "
+                    f"{entry['baseline_median']:.1f}s. Check recently added or updated mods.\n",
+                    "warning",
+                )
+                if self.output_callback:
+                    self.output_callback(
+                        {
+                            "type": "startup_regression",
+                            "total_seconds": entry["total_seconds"],
+                            "baseline_median": entry["baseline_median"],
+                            "server_id": self.server_id,
+                        }
+                    )
+        except Exception as e:
+            logging.warning(f"Handler: Could not record startup time: {e}")
+
     def _read_output(self, pipe, level):
         import re
 
@@ -1313,6 +1527,51 @@ allow-flight=false
             error_info["server_id"] = self.server_id
             self.output_callback(error_info)
 
+    def expect_log(self, *needles):
+        """
+        Registers a waiter for the next console line containing any of needles.
+        Register it before sending the command that triggers the line, then
+        call wait_for_log() on the returned waiter.
+        """
+        waiter = {"needles": needles, "event": threading.Event(), "line": None}
+        with self._log_waiters_lock:
+            self._log_waiters.append(waiter)
+        return waiter
+
+    def wait_for_log(self, waiter, timeout: float) -> Optional[str]:
+        """Blocks until the waiter's line shows up. Returns the line, or None on timeout."""
+        try:
+            waiter["event"].wait(timeout)
+            return waiter["line"]
+        finally:
+            with self._log_waiters_lock:
+                if waiter in self._log_waiters:
+                    self._log_waiters.remove(waiter)
+
+    def add_log_listener(self, callback):
+        """callback(line) is called from the log reader thread for every console line."""
+        with self._log_waiters_lock:
+            self._log_listeners.append(callback)
+
+    def remove_log_listener(self, callback):
+        with self._log_waiters_lock:
+            if callback in self._log_listeners:
+                self._log_listeners.remove(callback)
+
+    def _notify_log_waiters(self, line):
+        with self._log_waiters_lock:
+            for waiter in list(self._log_waiters):
+                if any(needle in line for needle in waiter["needles"]):
+                    waiter["line"] = line.strip()
+                    waiter["event"].set()
+                    self._log_waiters.remove(waiter)
+            listeners = list(self._log_listeners)
+        for callback in listeners:
+            try:
+                callback(line)
+            except Exception as e:
+                logging.debug(f"Handler: Log listener failed: {e}")
+
     def send_command(self, command, silent: bool = False):
         if (
             self.server_process
@@ -1509,6 +1768,8 @@ allow-flight=false
                 "ram": f"{ram_used_gb:.1f}/{ram_max_gb:.1f} GB",
                 "uptime": f"{hours}h {minutes}m",
             }
+            if self._cgroup:
+                self._stats_cache["cgroup"] = self._cgroup.read_stats()
             self._last_stats_time = current_time
 
             return self._stats_cache
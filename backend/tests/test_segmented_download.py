@@ -0,0 +1,143 @@
+import os
+import json
+import hashlib
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+from utils import segmented_download
+from utils.segmented_download import SegmentedDownloader
+
+MB = 1024 * 1024
+
+
+class _RangeServer:
+    """
+    Local HTTP stand-in with Range and ETag support. `short_responses`
+    range responses are cut off after `short_bytes` bytes (the connection
+    closes early); after `fail_after` range requests every request gets 503.
+    """
+
+    def __init__(self, payload: bytes, short_responses: int = 0, short_bytes: int = 0, fail_after=None):
+        self.payload = payload
+        self.short_responses = short_responses
+        self.short_bytes = short_bytes
+        self.fail_after = fail_after
+        self.ranges = []  # (start, end) of every range request after the probe
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                server.handle(self)
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}/runtime.tar.gz"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def handle(self, request: BaseHTTPRequestHandler):
+        size = len(self.payload)
+        start, end = 0, size - 1
+        header = request.headers.get("Range")
+        if header:
+            first, _, last = header.split("=", 1)[1].partition("-")
+            start, end = int(first), min(int(last) if last else size - 1, size - 1)
+        short = False
+        if header and header != "bytes=0-0":
+            with self._lock:
+                if self.fail_after is not None and len(self.ranges) >= self.fail_after:
+                    request.send_error(503)
+                    return
+                self.ranges.append((start, end))
+                if self.short_responses > 0:
+                    self.short_responses -= 1
+                    short = True
+        body = self.payload[start:end + 1]
+        request.send_response(206 if header else 200)
+        request.send_header("ETag", '"v1"')
+        request.send_header("Content-Length", str(len(body)))
+        if header:
+            request.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        request.end_headers()
+        request.wfile.write(body[:self.short_bytes] if short else body)
+        if short:
+            request.close_connection = True
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class SegmentedDownloaderTest(unittest.TestCase):
+    def setUp(self):
+        self.payload = os.urandom(5 * MB)
+        self.sha256 = hashlib.sha256(self.payload).hexdigest()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dest = os.path.join(self.tmp.name, "runtime.tar.gz")
+        self.servers = []
+        # Backoff between attempts is not what is being tested
+        patcher = mock.patch.object(segmented_download.time, "sleep")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        for server in self.servers:
+            server.close()
+        self.tmp.cleanup()
+
+    def serve(self, **kwargs) -> _RangeServer:
+        server = _RangeServer(self.payload, **kwargs)
+        self.servers.append(server)
+        return server
+
+    def read_dest(self) -> bytes:
+        with open(self.dest, "rb") as f:
+            return f.read()
+
+    def test_download_in_segments(self):
+        server = self.serve()
+        self.assertTrue(SegmentedDownloader(segments=2).download(server.url, self.dest, self.sha256))
+        self.assertEqual(self.read_dest(), self.payload)
+        self.assertEqual(sorted(server.ranges), [(0, 2.5 * MB - 1), (2.5 * MB, 5 * MB - 1)])
+        self.assertFalse(os.path.exists(self.dest + ".part"))
+        self.assertFalse(os.path.exists(self.dest + ".part.json"))
+
+    def test_short_responses_resume_where_they_stopped(self):
+        server = self.serve(short_responses=3, short_bytes=300 * 1024)
+        self.assertTrue(SegmentedDownloader(segments=2, retries=1).download(server.url, self.dest, self.sha256))
+        self.assertEqual(self.read_dest(), self.payload)
+        # Every retry starts after the bytes already written, none starts over
+        starts = sorted(start for start, _ in server.ranges)
+        self.assertEqual(len(server.ranges), 5)
+        self.assertEqual(starts.count(0), 1)
+        self.assertEqual(starts.count(int(2.5 * MB)), 1)
+
+    def test_resume_from_part_state(self):
+        # First run: the server goes away after a few cut-off responses
+        server = self.serve(short_responses=2, short_bytes=MB, fail_after=2)
+        self.assertFalse(SegmentedDownloader(segments=2, retries=1).download(server.url, self.dest, self.sha256))
+        with open(self.dest + ".part.json", "r", encoding="utf-8") as f:
+            state = json.load(f)
+        self.assertEqual([s["done"] for s in state["segments"]], [MB, MB])
+
+        # Second run (e.g. after a restart): only the missing bytes are requested
+        server = self.serve()
+        self.assertTrue(SegmentedDownloader(segments=2).download(server.url, self.dest, self.sha256))
+        self.assertEqual(self.read_dest(), self.payload)
+        self.assertEqual(sorted(server.ranges), [(MB, 2.5 * MB - 1), (3.5 * MB, 5 * MB - 1)])
+        self.assertFalse(os.path.exists(self.dest + ".part.json"))
+
+    def test_checksum_mismatch_discards_the_download(self):
+        server = self.serve()
+        self.assertFalse(SegmentedDownloader(segments=2).download(server.url, self.dest, "0" * 64))
+        for path in (self.dest, self.dest + ".part", self.dest + ".part.json"):
+            self.assertFalse(os.path.exists(path))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -8,6 +8,7 @@ import xml.etree.ElementTree as ET
 from collections import defaultdict
 import re
 import zipfile
+from utils.blob_store import replace_file
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -202,7 +203,7 @@ def download_file_from_url(download_url, save_path, progress_callback):
             
             logging.info(f"Downloading {download_url} - Total size: {total_size if total_size > 0 else 'unknown'}")
             
-            with open(save_path, 'wb') as f:
+            with replace_file(save_path) as f:
                 for chunk in r.iter_content(chunk_size=65536): # 64KB chunks for better throughput
                     if not chunk:
                         continue
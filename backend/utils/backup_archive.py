@@ -0,0 +1,242 @@
+import os
+import sys
+import json
+import time
+import zlib
+import struct
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+try:
+    import zstandard
+except ImportError:  # Optional: deflate (zlib) is always available
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_EXT = ".mcbak"
+MAGIC = b"MCBAK001"
+# Trailer: index offset, index length (compressed JSON), magic
+TRAILER = struct.Struct(">QQ8s")
+# Large files are compressed in independent pieces so they spread over the workers
+PIECE_SIZE = 8 * 1024 * 1024
+
+CODEC_STORE = "store"
+CODEC_DEFLATE = "deflate"
+CODEC_ZSTD = "zstd"
+
+
+def best_codec() -> str:
+    return CODEC_ZSTD if zstandard is not None else CODEC_DEFLATE
+
+
+def default_workers() -> int:
+    """A quarter of the cores (at least one): the game server keeps the rest."""
+    return max(1, (os.cpu_count() or 2) // 4)
+
+
+def _lower_priority():
+    # Runs in each worker process: lowest CPU and I/O priority
+    try:
+        import psutil
+
+        proc = psutil.Process()
+        if sys.platform == "win32":
+            proc.nice(psutil.BELOW_NORMAL_PRIORITY_CLASS)
+            proc.ionice(psutil.IOPRIO_VERYLOW)
+        else:
+            os.nice(10)
+            if sys.platform.startswith("linux"):
+                proc.ionice(psutil.IOPRIO_CLASS_IDLE)
+    except Exception:
+        pass
+
+
+def _compress(data: bytes, codec: str) -> bytes:
+    if codec == CODEC_ZSTD:
+        return zstandard.ZstdCompressor(level=3).compress(data)
+    if codec == CODEC_DEFLATE:
+        return zlib.compress(data, 6)
+    return data
+
+
+def _decompress(data: bytes, codec: str, size: int) -> bytes:
+    if codec == CODEC_ZSTD:
+        if zstandard is None:
+            raise RuntimeError("This backup uses zstd; install the 'zstandard' package to read it")
+        return zstandard.ZstdDecompressor().decompress(data, max_output_size=size)
+    if codec == CODEC_DEFLATE:
+        return zlib.decompress(data)
+    return data
+
+
+def _compress_piece(path: str, offset: int, length: int, codec: str):
+    """Worker: reads one piece of a file and compresses it. Returns (codec, data, raw_size)."""
+    with open(path, "rb") as f:
+        f.seek(offset)
+        raw = f.read(length)
+    packed = _compress(raw, codec)
+    if len(packed) >= len(raw):
+        return CODEC_STORE, raw, len(raw)  # Already compressed content (region chunks, pngs)
+    return codec, packed, len(raw)
+
+
+class BackupArchiveWriter:
+    """
+    Escribe copias de seguridad comprimidas en paralelo (formato .mcbak).
+
+    Files are cut into pieces that a process pool compresses with zstd when
+    the 'zstandard' package is installed, or deflate otherwise. Pieces are
+    written in order after an 8-byte magic; a compressed JSON index at the
+    end (located through a fixed-size trailer) maps every file to its
+    pieces, so any single file can be read back without touching the rest.
+    """
+
+    def __init__(self, workers: Optional[int] = None, codec: Optional[str] = None):
+        self.workers = max(1, workers or default_workers())
+        self.codec = codec or best_codec()
+
+    def write(
+        self,
+        archive_path: str,
+        files: List[tuple],
+        progress_callback: Optional[Callable[[int, int], None]] = None,
+        throttle=None,
+    ) -> Dict:
+        """
+        Writes `files` ((source path, name in the archive) pairs) to archive_path.
+        `throttle` (an IoThrottle) paces the reads and writes.
+        Returns the stats: files, bytes_in, bytes_out, duration, throughput (MB/s).
+        """
+        started = time.time()
+        pieces = []
+        entries = []
+        for source, name in files:
+            try:
+                st = os.stat(source)
+            except OSError:
+                continue
+            entry = {"name": name.replace(os.sep, "/"), "size": st.st_size, "mtime": st.st_mtime, "pieces": []}
+            entries.append(entry)
+            for offset in range(0, st.st_size, PIECE_SIZE) if st.st_size else [0]:
+                pieces.append((entry, source, offset, min(PIECE_SIZE, st.st_size - offset)))
+
+        total_in = sum(p[3] for p in pieces)
+        done_in = 0
+        tmp = archive_path + ".tmp"
+        try:
+            with open(tmp, "wb") as out, ProcessPoolExecutor(
+                max_workers=self.workers, initializer=_lower_priority
+            ) as pool:
+                out.write(MAGIC)
+                # Bounded window: memory stays at a few pieces per worker
+                window = self.workers * 3
+                inflight = []
+                queue = iter(pieces)
+                while True:
+                    while len(inflight) < window:
+                        piece = next(queue, None)
+                        if piece is None:
+                            break
+                        entry, source, offset, length = piece
+                        if throttle:
+                            throttle.consume(length)
+                        inflight.append((entry, pool.submit(_compress_piece, source, offset, length, self.codec)))
+                    if not inflight:
+                        break
+                    entry, future = inflight.pop(0)
+                    codec, data, raw_size = future.result()
+                    if throttle:
+                        throttle.consume(len(data))
+                    entry["pieces"].append([out.tell(), len(data), raw_size, codec])
+                    out.write(data)
+                    done_in += raw_size
+                    if progress_callback:
+                        progress_callback(done_in, total_in)
+
+                stats = {
+                    "files": len(entries),
+                    "bytes_in": total_in,
+                    "bytes_out": 0,
+                    "codec": self.codec,
+                    "workers": self.workers,
+                }
+                index = zlib.compress(json.dumps({"version": 1, "created": time.time(), "entries": entries,
+                                                  "stats": stats}).encode("utf-8"))
+                index_offset = out.tell()
+                out.write(index)
+                out.write(TRAILER.pack(index_offset, len(index), MAGIC))
+                stats["bytes_out"] = out.tell()
+            os.replace(tmp, archive_path)
+        except BaseException:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            raise
+
+        duration = max(time.time() - started, 0.001)
+        stats["duration"] = round(duration, 3)
+        stats["throughput"] = round(total_in / 1048576 / duration, 1)
+        logger.info(
+            f"Backup archive {os.path.basename(archive_path)}: {total_in / 1048576:.1f} MB -> "
+            f"{stats['bytes_out'] / 1048576:.1f} MB in {stats['duration']}s "
+            f"({stats['throughput']} MB/s, {self.codec}, {self.workers} workers)"
+        )
+        return stats
+
+
+class BackupArchiveReader:
+    """Reads .mcbak archives; files are located through the index, not by scanning."""
+
+    def __init__(self, archive_path: str):
+        self.archive_path = archive_path
+        with open(archive_path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"Not a backup archive: {os.path.basename(archive_path)}")
+            f.seek(-TRAILER.size, os.SEEK_END)
+            index_offset, index_length, magic = TRAILER.unpack(f.read(TRAILER.size))
+            if magic != MAGIC:
+                raise ValueError(f"Truncated backup archive: {os.path.basename(archive_path)}")
+            f.seek(index_offset)
+            self.index = json.loads(zlib.decompress(f.read(index_length)))
+        self.entries = {e["name"]: e for e in self.index["entries"]}
+
+    def list_files(self) -> List[Dict]:
+        return [{"name": e["name"], "size": e["size"], "mtime": e["mtime"]} for e in self.index["entries"]]
+
+    def extract(self, name: str, dest: str):
+        """Restores a single file (atomically) without decompressing anything else."""
+        entry = self.entries.get(name)
+        if entry is None:
+            raise KeyError(f"{name} is not in the backup")
+        os.makedirs(os.path.dirname(dest) or ".", exist_ok=True)
+        tmp = dest + ".tmp"
+        with open(self.archive_path, "rb") as src, open(tmp, "wb") as out:
+            for offset, length, size, codec in entry["pieces"]:
+                src.seek(offset)
+                out.write(_decompress(src.read(length), codec, size))
+        os.utime(tmp, (entry["mtime"], entry["mtime"]))
+        os.replace(tmp, dest)
+
+    def extract_all(self, dest_dir: str, prefix: str = "", progress_callback: Optional[Callable[[int, int], None]] = None) -> int:
+        """
+        Restores every file under prefix into dest_dir, relative to prefix
+        (prefix "world/" puts world/level.dat at dest_dir/level.dat).
+        Returns the number of files. Raises ValueError for names escaping dest_dir.
+        """
+        root = os.path.abspath(dest_dir)
+        names = [n for n in self.entries if n.startswith(prefix)]
+        for done, name in enumerate(names, 1):
+            dest = os.path.abspath(os.path.join(root, *name[len(prefix):].split("/")))
+            if not dest.startswith(root + os.sep):
+                raise ValueError(f"Unsafe path in backup: {name}")
+            self.extract(name, dest)
+            if progress_callback:
+                progress_callback(done, len(names))
+        return len(names)
+
+    def top_folders(self) -> List[str]:
+        """First path component of the archived files (the world folders)."""
+        return sorted({e["name"].split("/", 1)[0] for e in self.index["entries"] if "/" in e["name"]})
@@ -0,0 +1,305 @@
+import os
+import time
+import shutil
+import logging
+import threading
+from typing import Callable, Dict, Optional
+
+from utils.blob_store import reflink
+from utils.backup_archive import BackupArchiveWriter
+from utils.chunk_backup import ChunkBackupStore
+from utils.io_throttle import IoThrottle, lower_io_priority, restore_io_priority
+
+logger = logging.getLogger(__name__)
+
+STAGING_DIR = ".staging"
+# Vanilla/Paper print "Saved the game" after save-all; 1.12 and older "Saved the world"
+SAVED_LINES = ("Saved the game", "Saved the world")
+SAVE_TIMEOUT = 120
+
+
+def resolve_world(server_path: str, world: Optional[str] = None):
+    """
+    World name (the given one, else level-name from server.properties,
+    else "world") and its folder. Raises FileNotFoundError if it does not exist.
+    """
+    world_name = (world or "").strip() or None
+    if not world_name:
+        props_path = os.path.join(server_path, "server.properties")
+        try:
+            if os.path.exists(props_path):
+                with open(props_path, "r", encoding="utf-8", errors="replace") as f:
+                    for line in f:
+                        if line.startswith("level-name="):
+                            world_name = line.split("=", 1)[1].strip() or None
+                            break
+        except Exception:
+            world_name = None
+
+    if not world_name:
+        world_name = "world"
+
+    world_path = os.path.join(server_path, world_name)
+    if not os.path.isdir(world_path):
+        raise FileNotFoundError(f"World not found: {world_name}")
+    return world_name, world_path
+
+
+class BackupError(Exception):
+    pass
+
+
+def _dir_size(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def staging_report(backups_dir: str) -> Dict[str, int]:
+    """Bytes held by each world's staging mirror (world_backups/.staging/<world>)."""
+    root = os.path.join(backups_dir, STAGING_DIR)
+    if not os.path.isdir(root):
+        return {}
+    return {name: _dir_size(os.path.join(root, name)) for name in sorted(os.listdir(root))}
+
+
+def discard_staging(backups_dir: str, world_name: str) -> bool:
+    """
+    Removes a world's staging mirror (after a restore, or once the world is
+    gone). The next live backup rebuilds it with a full copy. False if a
+    backup of that world is using it right now.
+    """
+    path = os.path.join(backups_dir, STAGING_DIR, world_name)
+    world_path = os.path.join(os.path.dirname(os.path.abspath(backups_dir)), world_name)
+    with BackupPipeline._active_lock:
+        if os.path.normcase(world_path) in BackupPipeline._active:
+            return False
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+    return True
+
+
+def prune_staging(backups_dir: str) -> list:
+    """Discards the mirrors of worlds that no longer exist in the server folder."""
+    server_path = os.path.dirname(os.path.abspath(backups_dir))
+    removed = []
+    for name in staging_report(backups_dir):
+        if not os.path.isdir(os.path.join(server_path, name)) and discard_staging(backups_dir, name):
+            removed.append(name)
+    return removed
+
+
+class BackupPipeline:
+    """
+    Copia de seguridad consistente de un mundo, también con el servidor en marcha.
+
+    With the server running, saving is paused (save-off), pending chunks
+    are flushed (save-all flush, waiting for the "Saved the game" line)
+    and the world is mirrored into world_backups/.staging/<world>/, then
+    saving is turned back on. Only files whose size or mtime changed since
+    the previous backup are copied (reflinked where the filesystem allows),
+    so the window without saving stays short even for large worlds.
+    Compression (archive or chunk store) then runs on the staged copy.
+
+    The mirror is kept between backups; that is what makes the next
+    window short. It costs a full copy of each world backed up live (less
+    on reflink filesystems): staging_report() lists it, the chunk store
+    report includes it, restores discard it and mirrors of worlds that no
+    longer exist are pruned before each backup. With the server stopped
+    the world is read directly and no mirror is made.
+
+    An optional IoThrottle paces the compression I/O and is fed the
+    server's "Can't keep up!" lines while the backup runs.
+    """
+
+    # Worlds with a backup in progress (normalized world paths)
+    _active = set()
+    _active_lock = threading.Lock()
+
+    def __init__(
+        self,
+        handler,
+        backups_dir: str,
+        log: Optional[Callable[[str, str], None]] = None,
+        progress_callback: Optional[Callable[[int, str], None]] = None,
+        throttle: Optional[IoThrottle] = None,
+    ):
+        self.handler = handler
+        self.backups_dir = backups_dir
+        self.log = log or (lambda message, level="info": None)
+        self.progress_callback = progress_callback or (lambda value, message: None)
+        self.throttle = throttle
+        self._io_priority = None
+
+    # --- Save coordination ---
+
+    def _flush_and_pause(self) -> bool:
+        """save-off + save-all flush. Returns False if the save was not confirmed."""
+        self.handler.send_command("save-off", silent=True)
+        waiter = self.handler.expect_log(*SAVED_LINES)
+        self.handler.send_command("save-all flush", silent=True)
+        line = self.handler.wait_for_log(waiter, SAVE_TIMEOUT)
+        if line is None:
+            self.log(f"⚠️ The server did not confirm the save within {SAVE_TIMEOUT}s, backing up anyway", "warning")
+            return False
+        return True
+
+    def _resume(self):
+        if self.handler.is_running():
+            self.handler.send_command("save-on", silent=True)
+
+    # --- Staging ---
+
+    @staticmethod
+    def _copy(src: str, dst: str):
+        # Not throttled: this runs with saving disabled, the shorter the better
+        tmp = dst + ".tmp"
+        if not reflink(src, tmp):
+            shutil.copyfile(src, tmp)
+        shutil.copystat(src, tmp)  # The mtime is what the next sync compares
+        os.replace(tmp, dst)
+
+    def _sync_staging(self, world_path: str, staging_path: str) -> Dict:
+        """Mirrors world_path into staging_path, copying only changed files."""
+        copied, copied_bytes, removed = 0, 0, 0
+        seen = set()
+        for root, dirs, files in os.walk(world_path):
+            rel_root = os.path.relpath(root, world_path)
+            target_root = os.path.normpath(os.path.join(staging_path, rel_root))
+            os.makedirs(target_root, exist_ok=True)
+            for name in files:
+                if name == "session.lock":
+                    continue
+                src = os.path.join(root, name)
+                dst = os.path.join(target_root, name)
+                seen.add(os.path.normcase(dst))
+                try:
+                    st = os.stat(src)
+                    try:
+                        dst_st = os.stat(dst)
+                        if dst_st.st_size == st.st_size and dst_st.st_mtime == st.st_mtime:
+                            continue
+                    except OSError:
+                        pass
+                    self._copy(src, dst)
+                    copied += 1
+                    copied_bytes += st.st_size
+                except FileNotFoundError:
+                    continue  # Deleted while walking
+
+        for root, dirs, files in os.walk(staging_path, topdown=False):
+            for name in files:
+                path = os.path.join(root, name)
+                if os.path.normcase(path) not in seen:
+                    os.remove(path)
+                    removed += 1
+            if root != staging_path and not os.listdir(root):
+                os.rmdir(root)
+        return {"copied": copied, "copied_bytes": copied_bytes, "removed": removed}
+
+    def stage(self, world_path: str, world_name: str) -> Dict:
+        """
+        Produces a consistent copy of the world to back up from.
+        Returns {"path", "live", "consistent", "window", "copied", ...}.
+        """
+        for name in prune_staging(self.backups_dir):
+            logger.info(f"Backup: Removed the staging mirror of {name} (world no longer exists)")
+        if not self.handler or not self.handler.is_running():
+            return {"path": world_path, "live": False, "consistent": True, "window": 0.0}
+        if not self.handler.server_fully_started:
+            raise BackupError("The server is still starting; try again once it is online")
+
+        staging_path = os.path.join(self.backups_dir, STAGING_DIR, world_name)
+        self.log("💾 Flushing the world to disk (save-off, save-all flush)", "info")
+        window_start = time.time()
+        try:
+            confirmed = self._flush_and_pause()
+            sync = self._sync_staging(world_path, staging_path)
+        finally:
+            self._resume()
+        window = round(time.time() - window_start, 3)
+        self.log(
+            f"▶️ Saving re-enabled after {window}s ({sync['copied']} changed files, "
+            f"{sync['copied_bytes'] / 1048576:.1f} MB staged)",
+            "info",
+        )
+        return {"path": staging_path, "live": True, "consistent": confirmed, "window": window, **sync}
+
+    # --- Backups ---
+
+    def _claim(self, world_path: str):
+        key = os.path.normcase(os.path.abspath(world_path))
+        with self._active_lock:
+            if key in self._active:
+                raise BackupError("A backup of this world is already running")
+            self._active.add(key)
+        if self.throttle and self.handler:
+            self.handler.add_log_listener(self.throttle.on_log_line)
+        return key
+
+    def _background_io(self):
+        # After stage(): the save-off window must not run in the idle I/O class
+        self._io_priority = lower_io_priority()
+
+    def _release(self, key: str):
+        restore_io_priority(self._io_priority)
+        self._io_priority = None
+        if self.throttle and self.handler:
+            self.handler.remove_log_listener(self.throttle.on_log_line)
+        with self._active_lock:
+            self._active.discard(key)
+
+    def _files(self, source: str, world_name: str):
+        files = []
+        for root, _, names in os.walk(source):
+            for name in names:
+                if name == "session.lock":
+                    continue
+                full = os.path.join(root, name)
+                files.append((full, os.path.join(world_name, os.path.relpath(full, source))))
+        return files
+
+    def create_archive(self, world_path: str, world_name: str, backup_name: str, workers: Optional[int] = None) -> Dict:
+        """Full compressed archive (.mcbak) of the world."""
+        key = self._claim(world_path)
+        try:
+            staged = self.stage(world_path, world_name)
+            self._background_io()
+            backup_path = os.path.join(self.backups_dir, backup_name)
+
+            def on_progress(done, total):
+                if total:
+                    self.progress_callback(int(done * 100 / total), f"Compressing {world_name}")
+
+            stats = BackupArchiveWriter(workers=workers).write(
+                backup_path, self._files(staged["path"], world_name), on_progress, self.throttle
+            )
+        finally:
+            self._release(key)
+        if self.throttle:
+            stats["io"] = self.throttle.get_report()
+        return {"name": backup_name, "staging": staged, **stats}
+
+    def create_snapshot(self, world_path: str, world_name: str, store: ChunkBackupStore) -> Dict:
+        """Chunk-deduplicated snapshot of the world."""
+        key = self._claim(world_path)
+        try:
+            staged = self.stage(world_path, world_name)
+            self._background_io()
+
+            def on_progress(done, total):
+                if total:
+                    self.progress_callback(int(done * 100 / total), f"Backing up {world_name}")
+
+            result = store.create_snapshot(staged["path"], world_name, on_progress, self.throttle)
+        finally:
+            self._release(key)
+        result["staging"] = staged
+        if self.throttle:
+            result["io"] = self.throttle.get_report()
+        return result
@@ -0,0 +1,378 @@
+import os
+import re
+import json
+import time
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from utils.backup_archive import ARCHIVE_EXT
+from utils.backup_pipeline import BackupPipeline, resolve_world
+from utils.io_throttle import IoThrottle
+
+logger = logging.getLogger(__name__)
+
+# Tier -> strftime bucket; one backup (the newest) is kept per bucket
+GFS_TIERS = (
+    ("hourly", "%Y%m%d%H"),
+    ("daily", "%Y%m%d"),
+    ("weekly", "%G%V"),
+    ("monthly", "%Y%m"),
+)
+DEFAULT_RETENTION = {"hourly": 24, "daily": 7, "weekly": 4, "monthly": 6}
+
+CRON_FIELDS = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+NAME_TIMESTAMP = re.compile(r"-(\d{8}-\d{6})")
+
+
+# --- Cron ---
+
+
+def parse_cron(expr: str) -> List[Set[int]]:
+    """
+    Parses a 5-field cron expression (minute hour day month weekday) with
+    *, lists, ranges and steps. Weekday 0 or 7 is Sunday. Raises ValueError.
+    """
+    fields = (expr or "").split()
+    if len(fields) != 5:
+        raise ValueError("Cron expression must have 5 fields: minute hour day month weekday")
+    parsed = []
+    for position, (field, (low, high)) in enumerate(zip(fields, CRON_FIELDS)):
+        values = set()
+        for part in field.split(","):
+            base, _, step = part.partition("/")
+            try:
+                step = int(step) if step else 1
+                if base == "*":
+                    start, end = low, high
+                elif "-" in base:
+                    start, end = (int(v) for v in base.split("-", 1))
+                else:
+                    start = int(base)
+                    end = high if step > 1 else start
+            except ValueError:
+                raise ValueError(f"Invalid cron field: {part}")
+            if start < low or end > high or start > end or step < 1:
+                raise ValueError(f"Cron field out of range: {part}")
+            values.update(range(start, end + 1, step))
+        if position == 4:
+            values = {v % 7 for v in values}
+        parsed.append(values)
+    return parsed
+
+
+def cron_next(expr: str, after: datetime) -> Optional[datetime]:
+    """First minute strictly after `after` that matches the expression (within a year)."""
+    minutes, hours, days, months, weekdays = parse_cron(expr)
+    # As in classic cron, any field starting with * (*/2 too) counts as unrestricted
+    fields = expr.split()
+    dom_any = fields[2].startswith("*")
+    dow_any = fields[4].startswith("*")
+    t = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+    limit = t + timedelta(days=366)
+    while t < limit:
+        if t.month not in months:
+            t = (t.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+            continue
+        # Classic cron: when both day fields are restricted, either may match
+        weekday = (t.weekday() + 1) % 7
+        if dom_any or dow_any:
+            day_ok = t.day in days and weekday in weekdays
+        else:
+            day_ok = t.day in days or weekday in weekdays
+        if not day_ok:
+            t = t.replace(hour=0, minute=0) + timedelta(days=1)
+            continue
+        if t.hour not in hours:
+            t = t.replace(minute=0) + timedelta(hours=1)
+            continue
+        if t.minute not in minutes:
+            t += timedelta(minutes=1)
+            continue
+        return t
+    return None
+
+
+# --- Retention ---
+
+
+def select_gfs(items: Iterable[Tuple[str, float]], retention: Dict[str, int]) -> Set[str]:
+    """
+    Grandfather-father-son: returns the keys to keep out of (key, timestamp)
+    pairs. Each tier keeps the newest backup of its N most recent
+    hours/days/weeks/months; the newest backup is always kept.
+    """
+    ordered = sorted(items, key=lambda item: item[1], reverse=True)
+    if not ordered:
+        return set()
+    keep = {ordered[0][0]}
+    for tier, fmt in GFS_TIERS:
+        count = int(retention.get(tier, 0) or 0)
+        buckets = set()
+        for key, ts in ordered:
+            bucket = time.strftime(fmt, time.localtime(ts))
+            if bucket in buckets:
+                continue
+            if len(buckets) >= count:
+                break
+            buckets.add(bucket)
+            keep.add(key)
+    return keep
+
+
+def _archive_time(name: str, path: str) -> float:
+    m = NAME_TIMESTAMP.search(name)
+    if m:
+        try:
+            return time.mktime(time.strptime(m.group(1), "%Y%m%d-%H%M%S"))
+        except ValueError:
+            pass
+    return os.path.getmtime(path)
+
+
+def _scheduled_archive(name: str, world_name: str) -> bool:
+    # <world>-YYYYmmdd-HHMMSS.mcbak exactly: "world" must not match "world-old-..."
+    return re.fullmatch(rf"{re.escape(world_name)}-\d{{8}}-\d{{6}}(\.zip|{re.escape(ARCHIVE_EXT)})", name) is not None
+
+
+def prune_backups(
+    server_path: str, world_name: str, retention: Dict[str, int], owned: Dict[str, List[str]], chunk_store=None
+) -> Dict:
+    """
+    Applies GFS retention to the world's scheduled archives and chunk
+    snapshots. Only what the scheduler created (the names and ids in
+    `owned`, which is updated in place) is considered: manual backups and
+    the safety backups taken before a trim or compaction are never pruned.
+    """
+    if not any(int(retention.get(tier, 0) or 0) for tier, _ in GFS_TIERS):
+        return {"archives": [], "snapshots": []}  # No tiers configured: keep everything
+
+    backups_dir = os.path.join(server_path, "world_backups")
+    archives = []
+    for name in owned.get("archives", []):
+        path = os.path.join(backups_dir, name)
+        if _scheduled_archive(name, world_name) and os.path.isfile(path):
+            archives.append((name, _archive_time(name, path)))
+    keep = select_gfs(archives, retention)
+    removed_archives = []
+    for name, _ in archives:
+        if name not in keep:
+            try:
+                os.remove(os.path.join(backups_dir, name))
+                removed_archives.append(name)
+            except OSError as e:
+                logger.warning(f"Backup retention: Could not delete {name}: {e}")
+    # Forget deleted files (by retention or by hand); other worlds' entries stay
+    owned["archives"] = [
+        name for name in owned.get("archives", [])
+        if name not in removed_archives and os.path.isfile(os.path.join(backups_dir, name))
+    ]
+
+    removed_snapshots = []
+    if chunk_store is not None:
+        ids = set(owned.get("snapshots", []))
+        present = {s["id"] for s in chunk_store.list_snapshots()}
+        snapshots = [(s["id"], s["created"]) for s in chunk_store.list_snapshots(world_name) if s["id"] in ids]
+        keep = select_gfs(snapshots, retention)
+        for snapshot_id, _ in snapshots:
+            if snapshot_id not in keep:
+                chunk_store.delete_snapshot(snapshot_id)
+                removed_snapshots.append(snapshot_id)
+        if removed_snapshots:
+            chunk_store.gc()
+        owned["snapshots"] = [i for i in owned.get("snapshots", []) if i in present and i not in removed_snapshots]
+
+    if removed_archives or removed_snapshots:
+        logger.info(
+            f"Backup retention ({world_name}): removed {len(removed_archives)} archives, "
+            f"{len(removed_snapshots)} snapshots"
+        )
+    return {"archives": removed_archives, "snapshots": removed_snapshots}
+
+
+# --- Scheduler ---
+
+
+class BackupScheduler:
+    """
+    Programador de copias de seguridad por servidor.
+
+    Each server may carry a "backup_schedule" in its config:
+    {"enabled", "interval_minutes" | "cron", "mode" ("incremental" or
+    "archive"), "world", "retention" {hourly, daily, weekly, monthly},
+    "io_rate_mb", "max_lag_ms", "run_when_offline"}.
+
+    A single thread checks the schedules and runs due backups one at a
+    time, so two servers never back up concurrently. Servers that have not
+    run since their last backup are skipped (their world did not change)
+    unless run_when_offline is set. Last run times, and the backups the
+    scheduler created (the only ones retention may delete), are kept in
+    <server>/.mlsg/backup_schedule.json.
+    """
+
+    CHECK_INTERVAL = 30
+
+    def __init__(
+        self,
+        config_manager,
+        get_handler: Callable[[str], Optional[object]],
+        get_chunk_store: Callable[[str], object],
+        log: Optional[Callable[[str, str], None]] = None,
+    ):
+        self.config_manager = config_manager
+        self.get_handler = get_handler
+        self.get_chunk_store = get_chunk_store
+        self.log = log or (lambda message, level="info": None)
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._running_server: Optional[str] = None
+
+    # --- State ---
+
+    @staticmethod
+    def _state_file(server_path: str) -> str:
+        return os.path.join(server_path, ".mlsg", "backup_schedule.json")
+
+    def _load_state(self, server_path: str) -> Dict:
+        try:
+            with open(self._state_file(server_path), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return {}
+
+    def _save_state(self, server_path: str, data: Dict):
+        try:
+            path = self._state_file(server_path)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=2)
+        except IOError as e:
+            logger.error(f"Error saving backup schedule state: {e}")
+
+    # --- Timing ---
+
+    @staticmethod
+    def next_run(schedule: Dict, sched_state: Dict) -> Optional[float]:
+        """Epoch of the next due backup, or None if the schedule is off."""
+        if not schedule or not schedule.get("enabled"):
+            return None
+        base = sched_state.get("last_run") or sched_state.get("armed_at") or time.time()
+        if schedule.get("cron"):
+            nxt = cron_next(schedule["cron"], datetime.fromtimestamp(base))
+            return nxt.timestamp() if nxt else None
+        interval = float(schedule.get("interval_minutes") or 0)
+        if interval <= 0:
+            return None
+        return base + interval * 60 if sched_state.get("last_run") else base
+
+    def get_status(self, server_id: str) -> Dict:
+        server = self.config_manager.get_server(server_id) or {}
+        sched_state = self._load_state(server["path"]) if server.get("path") else {}
+        return {
+            "schedule": server.get("backup_schedule") or {"enabled": False},
+            "last_run": sched_state.get("last_run"),
+            "last_result": sched_state.get("last_result"),
+            "next_run": self.next_run(server.get("backup_schedule") or {}, sched_state),
+            "running": self._running_server == server_id,
+        }
+
+    # --- Loop ---
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _loop(self):
+        while not self._stop.wait(self.CHECK_INTERVAL):
+            for server in list(self.config_manager.get_all_servers()):
+                try:
+                    self._check_server(server)
+                except Exception as e:
+                    logger.error(f"Backup scheduler: {server.get('id')}: {e}")
+
+    def _check_server(self, server: Dict):
+        schedule = server.get("backup_schedule") or {}
+        server_path = server.get("path")
+        if not schedule.get("enabled") or not server_path or not os.path.isdir(server_path):
+            return
+
+        now = time.time()
+        sched_state = self._load_state(server_path)
+        handler = self.get_handler(server["id"])
+        running = bool(handler and handler.is_running())
+        changed = False
+        if "armed_at" not in sched_state:
+            sched_state["armed_at"] = now
+            changed = True
+        if running:
+            sched_state["last_seen_running"] = now
+            changed = True
+
+        due = self.next_run(schedule, sched_state)
+        ran_since = sched_state.get("last_seen_running", 0) > sched_state.get("last_run", 0)
+        if due is not None and due <= now and (running or ran_since or schedule.get("run_when_offline")):
+            if running and not handler.server_fully_started:
+                pass  # Starting up: retry on the next check
+            else:
+                sched_state["last_result"] = self.run_backup(server, handler if running else None, sched_state)
+                sched_state["last_run"] = now
+                changed = True
+        if changed:
+            self._save_state(server_path, sched_state)
+
+    def run_backup(self, server: Dict, handler=None, sched_state: Optional[Dict] = None) -> Dict:
+        """
+        Runs one scheduled backup and applies retention. The archives and
+        snapshots it creates are recorded in sched_state["owned"]; retention
+        only ever deletes those.
+        """
+        schedule = server.get("backup_schedule") or {}
+        owned = (sched_state if sched_state is not None else {}).setdefault(
+            "owned", {"archives": [], "snapshots": []}
+        )
+        server_path = server["path"]
+        name = server.get("name", server["id"])
+        self._running_server = server["id"]
+        try:
+            world_name, world_path = resolve_world(server_path, schedule.get("world"))
+            throttle = IoThrottle(
+                rate=int(float(schedule.get("io_rate_mb") or 0) * 1024 * 1024),
+                max_lag_ms=int(schedule.get("max_lag_ms") or 0),
+            )
+            backups_dir = os.path.join(server_path, "world_backups")
+            os.makedirs(backups_dir, exist_ok=True)
+            pipeline = BackupPipeline(handler, backups_dir, log=self.log, throttle=throttle)
+            store = self.get_chunk_store(server_path)
+
+            self.log(f"⏰ Scheduled backup of {name} ({world_name})", "info")
+            if schedule.get("mode") == "archive":
+                backup_name = f"{world_name}-{datetime.now().strftime('%Y%m%d-%H%M%S')}{ARCHIVE_EXT}"
+                result = pipeline.create_archive(world_path, world_name, backup_name)
+                owned.setdefault("archives", []).append(backup_name)
+                summary = {"name": backup_name, "bytes_out": result["bytes_out"], "duration": result["duration"]}
+            else:
+                result = pipeline.create_snapshot(world_path, world_name, store)
+                owned.setdefault("snapshots", []).append(result["id"])
+                summary = {"id": result["id"], **result["stats"]}
+            summary["window"] = result["staging"]["window"]
+            summary["io"] = throttle.get_report()
+
+            pruned = prune_backups(
+                server_path, world_name, schedule.get("retention") or DEFAULT_RETENTION, owned, store
+            )
+            summary["pruned"] = len(pruned["archives"]) + len(pruned["snapshots"])
+            self.log(f"✅ Scheduled backup of {name} done ({summary['pruned']} old backups pruned)", "success")
+            return {"status": "success", **summary}
+        except Exception as e:
+            logger.error(f"Scheduled backup of {name} failed: {e}")
+            self.log(f"❌ Scheduled backup of {name} failed: {e}", "error")
+            return {"status": "error", "error": str(e)}
+        finally:
+            self._running_server = None
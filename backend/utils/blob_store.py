@@ -0,0 +1,308 @@
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# linux/fs.h: _IOW(0x94, 9, int)
+FICLONE = 0x40049409
+
+
+def sha256_file(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def reflink(src: str, dst: str) -> bool:
+    """Copy-on-write clone (Btrfs, XFS, bcachefs...). False if unsupported."""
+    if not sys.platform.startswith("linux"):
+        return False
+    import fcntl
+
+    try:
+        with open(src, "rb") as s, open(dst, "wb") as d:
+            fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+        return True
+    except OSError:
+        try:
+            os.remove(dst)
+        except OSError:
+            pass
+        return False
+
+
+@contextmanager
+def replace_file(path: str):
+    """
+    Opens a temp file next to path for writing and renames it over path on
+    success. Files in server folders may be hardlinks into the store (and
+    into other servers); writing through them in place would corrupt the blob.
+    """
+    tmp = f"{path}.write-tmp"
+    try:
+        with open(tmp, "wb") as f:
+            yield f
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+
+class BlobStore:
+    """
+    Almacén global de archivos (jars de mods, plugins, servidores, librerías)
+    direccionado por SHA-256, compartido por todos los servidores.
+
+    Files in the server folders are hardlinks to the blob when the store is on
+    the same filesystem, reflinks where the filesystem supports them, and
+    plain copies otherwise. Hashes published by Modrinth (sha1/sha512) are kept
+    as aliases so a known file is linked instead of downloaded again.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self.blobs_dir = os.path.join(root, "sha256")
+        self.meta_file = os.path.join(root, "store.json")
+        self._lock = threading.Lock()
+        # Files adopt() left alone because they could not share the store's data
+        self.not_adopted = 0
+        os.makedirs(self.blobs_dir, exist_ok=True)
+        self.meta = self._load_meta()
+
+    def _load_meta(self) -> Dict:
+        try:
+            if os.path.exists(self.meta_file):
+                with open(self.meta_file, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                data.setdefault("aliases", {})
+                data.setdefault("refs", {})
+                return data
+        except (json.JSONDecodeError, IOError) as e:
+            logger.warning(f"Error loading blob store metadata: {e}")
+        # aliases: "sha1:<hex>" -> sha256; refs: sha256 -> [paths materialized by copy/reflink]
+        return {"aliases": {}, "refs": {}}
+
+    def _save_meta(self):
+        try:
+            tmp = self.meta_file + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self.meta, f)
+            os.replace(tmp, self.meta_file)
+        except IOError as e:
+            logger.error(f"Error saving blob store metadata: {e}")
+
+    def blob_path(self, sha256: str) -> str:
+        return os.path.join(self.blobs_dir, sha256[:2], sha256)
+
+    def has(self, sha256: str) -> bool:
+        return os.path.exists(self.blob_path(sha256))
+
+    def resolve_alias(self, algorithm: str, digest: str) -> Optional[str]:
+        sha256 = digest.lower() if algorithm == "sha256" else self.meta["aliases"].get(f"{algorithm}:{digest.lower()}")
+        return sha256 if sha256 and self.has(sha256) else None
+
+    # --- Linking ---
+
+    def _place(self, blob: str, dest: str) -> str:
+        """Puts a blob at dest (atomically). Returns the method used."""
+        tmp = f"{dest}.blob-tmp"
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        try:
+            os.link(blob, tmp)
+            method = "hardlink"
+        except OSError:
+            if reflink(blob, tmp):
+                method = "reflink"
+            else:
+                shutil.copyfile(blob, tmp)
+                method = "copy"
+        os.replace(tmp, dest)
+        return method
+
+    def _add_ref(self, sha256: str, dest: str):
+        refs = self.meta["refs"].setdefault(sha256, [])
+        dest = os.path.abspath(dest)
+        if dest not in refs:
+            refs.append(dest)
+
+    def materialize(self, sha256: str, dest: str) -> bool:
+        """Links a stored blob to dest. False if the blob is not in the store."""
+        blob = self.blob_path(sha256)
+        if not os.path.exists(blob):
+            return False
+        os.makedirs(os.path.dirname(dest) or ".", exist_ok=True)
+        method = self._place(blob, dest)
+        if method != "hardlink":
+            with self._lock:
+                self._add_ref(sha256, dest)
+                self._save_meta()
+        return True
+
+    def materialize_alias(self, algorithm: str, digest: Optional[str], dest: str) -> bool:
+        if not digest:
+            return False
+        sha256 = self.resolve_alias(algorithm, digest)
+        return bool(sha256) and self.materialize(sha256, dest)
+
+    def adopt(self, path: str, aliases: Optional[Dict[str, str]] = None, save: bool = True) -> Optional[str]:
+        """
+        Moves a freshly written file into the store and links it back in place.
+        If the same content is already stored, the file becomes a link to it.
+        A file that can be neither hardlinked nor reflinked into the store
+        (another filesystem) is left alone: a copy would double its size.
+        Returns the sha256, or None if the file could not be adopted.
+        """
+        try:
+            sha256 = sha256_file(path)
+            blob = self.blob_path(sha256)
+            with self._lock:
+                if not os.path.exists(blob):
+                    os.makedirs(os.path.dirname(blob), exist_ok=True)
+                    try:
+                        os.link(path, blob)  # Same inode: nothing else to do
+                    except OSError:
+                        tmp = blob + ".tmp"
+                        if not reflink(path, tmp):
+                            self.not_adopted += 1
+                            logger.debug(f"Blob store: {path} is on another filesystem, not stored")
+                            return None
+                        os.replace(tmp, blob)
+                        self._add_ref(sha256, path)
+                elif not os.path.samefile(path, blob):
+                    if self._place(blob, path) != "hardlink":
+                        self._add_ref(sha256, path)
+                for algorithm, digest in (aliases or {}).items():
+                    if digest:
+                        self.meta["aliases"][f"{algorithm}:{digest.lower()}"] = sha256
+                if save:
+                    self._save_meta()
+            return sha256
+        except OSError as e:
+            logger.warning(f"Blob store: Could not adopt {path}: {e}")
+            return None
+
+    def adopt_tree(self, directory: str, extensions=(".jar",)) -> int:
+        """Adopts every matching file below directory (e.g. a Forge libraries/ tree)."""
+        count = 0
+        for root, _, files in os.walk(directory):
+            for name in files:
+                if name.lower().endswith(extensions):
+                    if self.adopt(os.path.join(root, name), save=False):
+                        count += 1
+        with self._lock:
+            self._save_meta()
+        logger.info(f"Blob store: Adopted {count} files from {directory}")
+        return count
+
+    def detach_tree(self, directory: str, extensions=(".jar",)) -> int:
+        """
+        Turns hardlinked files below directory back into private copies
+        (reflink where possible), before a tool that writes in place (e.g. a
+        Forge installer re-run) touches them. adopt_tree links them again.
+        """
+        count = 0
+        for root, _, files in os.walk(directory):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    if not name.lower().endswith(extensions) or os.stat(path).st_nlink < 2:
+                        continue
+                    tmp = f"{path}.blob-tmp"
+                    if not reflink(path, tmp):
+                        shutil.copyfile(path, tmp)
+                    os.replace(tmp, path)
+                    count += 1
+                except OSError as e:
+                    logger.warning(f"Blob store: Could not detach {path}: {e}")
+        return count
+
+    # --- Maintenance ---
+
+    def _live_refs(self, sha256: str, size: int):
+        """Copy/reflink paths that still hold this blob's content (same size)."""
+        live = []
+        for path in self.meta["refs"].get(sha256, []):
+            try:
+                if os.path.getsize(path) == size:
+                    live.append(path)
+            except OSError:
+                pass
+        return live
+
+    def _iter_blobs(self):
+        for prefix in os.listdir(self.blobs_dir):
+            prefix_dir = os.path.join(self.blobs_dir, prefix)
+            if not os.path.isdir(prefix_dir):
+                continue
+            for name in os.listdir(prefix_dir):
+                if not name.endswith(".tmp"):
+                    yield name, os.path.join(prefix_dir, name)
+
+    def gc(self, min_age: int = 3600) -> Dict:
+        """
+        Deletes blobs no server uses anymore: no other hardlink and no live
+        copy/reflink. Blobs younger than min_age are kept (installs in flight).
+        """
+        removed, freed = 0, 0
+        now = time.time()
+        with self._lock:
+            for sha256, blob in list(self._iter_blobs()):
+                st = os.stat(blob)
+                live = self._live_refs(sha256, st.st_size)
+                if st.st_nlink > 1 or live or now - st.st_mtime < min_age:
+                    if live:
+                        self.meta["refs"][sha256] = live
+                    continue
+                os.remove(blob)
+                self.meta["refs"].pop(sha256, None)
+                removed += 1
+                freed += st.st_size
+            stored = {name for name, _ in self._iter_blobs()}
+            self.meta["aliases"] = {a: s for a, s in self.meta["aliases"].items() if s in stored}
+            self.meta["refs"] = {s: r for s, r in self.meta["refs"].items() if s in stored}
+            self._save_meta()
+        logger.info(f"Blob store GC: removed {removed} blobs, freed {freed / 1048576:.1f} MB")
+        return {"removed": removed, "freed_bytes": freed}
+
+    def get_report(self) -> Dict:
+        """
+        Space used by the store versus what every server would use with its
+        own copies. Only hardlinks count as saved: copies (and reflinks, whose
+        shared extents can't be measured from here) are counted as used.
+        """
+        blobs, store_bytes, logical_bytes, hardlinks = 0, 0, 0, 0
+        with self._lock:
+            for sha256, blob in self._iter_blobs():
+                st = os.stat(blob)
+                users = (st.st_nlink - 1) + len(self._live_refs(sha256, st.st_size))
+                blobs += 1
+                store_bytes += st.st_size
+                logical_bytes += st.st_size * max(users, 1)
+                hardlinks += st.st_nlink - 1
+        # Copies still occupy their own space
+        copies_bytes = sum(
+            os.path.getsize(p) for refs in self.meta["refs"].values() for p in refs if os.path.exists(p)
+        )
+        return {
+            "blobs": blobs,
+            "store_bytes": store_bytes,
+            "linked_files": hardlinks,
+            "logical_bytes": logical_bytes,
+            "saved_bytes": max(logical_bytes - store_bytes - copies_bytes, 0),
+            # Non-zero: servers live on another filesystem than the store, nothing of theirs is shared
+            "not_adopted": self.not_adopted,
+        }
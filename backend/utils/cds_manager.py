@@ -0,0 +1,232 @@
+import os
+import json
+import glob
+import hashlib
+import logging
+import statistics
+import time
+from typing import Optional, List, Dict
+
+logger = logging.getLogger(__name__)
+
+
+class CDSManager:
+    """
+    Gestiona los archivos AppCDS (Application Class-Data Sharing) de un servidor.
+
+    The first start with CDS enabled is a "training" run: the JVM dumps the
+    loaded classes into an archive when it exits cleanly. Later starts map that
+    archive instead of loading and verifying every class again.
+
+    The archive is keyed by a hash of the Java runtime, the server jars/arg
+    files, the mods folder and the launch arguments. When any of those change
+    the old archive is discarded and a new training run happens automatically.
+    """
+
+    ARCHIVE_PREFIX = "app-"
+    MAX_TIMINGS = 20
+
+    def __init__(self, server_path: str):
+        self.server_path = server_path
+        self.cds_dir = os.path.join(server_path, ".mlsg", "cds")
+        self.state_file = os.path.join(self.cds_dir, "cds_state.json")
+        self.state = self._load_state()
+
+        # Mode of the last launch: "off", "unsupported", "training" or "shared"
+        self.active_mode: Optional[str] = None
+        self.active_key: Optional[str] = None
+
+    def _load_state(self) -> Dict:
+        try:
+            if os.path.exists(self.state_file):
+                with open(self.state_file, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                data.setdefault("timings", {})
+                return data
+        except (json.JSONDecodeError, IOError) as e:
+            logger.warning(f"Error loading CDS state: {e}")
+        return {"key": None, "timings": {}}
+
+    def _save_state(self):
+        try:
+            os.makedirs(self.cds_dir, exist_ok=True)
+            with open(self.state_file, "w", encoding="utf-8") as f:
+                json.dump(self.state, f, indent=2)
+        except IOError as e:
+            logger.error(f"Error saving CDS state: {e}")
+
+    # --- Key computation ---
+
+    def _stat_token(self, path: str) -> str:
+        """Returns 'path|size|mtime' for a file, or 'path|missing'."""
+        full = path if os.path.isabs(path) else os.path.join(self.server_path, path)
+        try:
+            st = os.stat(full)
+            return f"{os.path.realpath(full)}|{st.st_size}|{int(st.st_mtime)}"
+        except OSError:
+            return f"{full}|missing"
+
+    def compute_key(self, java_path: str, launch_args: List[str]) -> str:
+        """
+        Hash of everything that makes a class archive stale: the Java binary
+        (plus the JDK module image), the jars and @arg files referenced by the
+        launch arguments, the mods folder contents and the arguments themselves.
+        """
+        h = hashlib.sha256()
+
+        java_real = os.path.realpath(java_path)
+        h.update(self._stat_token(java_real).encode("utf-8"))
+        # The classes really live in lib/modules, not in the launcher binary
+        java_root = os.path.dirname(os.path.dirname(java_real))
+        h.update(self._stat_token(os.path.join(java_root, "lib", "modules")).encode("utf-8"))
+
+        for arg in launch_args:
+            h.update(b"\0" + arg.encode("utf-8"))
+            if arg.startswith("@"):
+                # @libraries/.../unix_args.txt: the file content is part of the command
+                arg_file = arg[1:]
+                full = arg_file if os.path.isabs(arg_file) else os.path.join(self.server_path, arg_file)
+                try:
+                    with open(full, "rb") as f:
+                        h.update(f.read())
+                except OSError:
+                    h.update(b"missing")
+                continue
+            for part in arg.split(os.pathsep):
+                if part.lower().endswith(".jar"):
+                    h.update(self._stat_token(part).encode("utf-8"))
+
+        mods_dir = os.path.join(self.server_path, "mods")
+        if os.path.isdir(mods_dir):
+            try:
+                entries = sorted(
+                    (e.name, e.stat().st_size, int(e.stat().st_mtime))
+                    for e in os.scandir(mods_dir)
+                    if e.is_file() and e.name.lower().endswith(".jar")
+                )
+                h.update(json.dumps(entries).encode("utf-8"))
+            except OSError as e:
+                logger.warning(f"Could not list mods for CDS key: {e}")
+
+        return h.hexdigest()
+
+    def archive_path(self, key: str) -> str:
+        return os.path.join(self.cds_dir, f"{self.ARCHIVE_PREFIX}{key[:16]}.jsa")
+
+    def _invalidate_stale(self, key: str):
+        """Deletes archives that belong to a different key."""
+        current = self.archive_path(key)
+        for path in glob.glob(os.path.join(self.cds_dir, f"{self.ARCHIVE_PREFIX}*.jsa")):
+            if os.path.normcase(path) != os.path.normcase(current):
+                try:
+                    os.remove(path)
+                    logger.info(f"CDS: Removed stale archive {os.path.basename(path)}")
+                except OSError as e:
+                    logger.warning(f"CDS: Could not remove stale archive {path}: {e}")
+
+    # --- Launch integration ---
+
+    def get_launch_flags(
+        self, java_path: str, java_major: Optional[int], launch_args: List[str]
+    ) -> List[str]:
+        """
+        Returns the JVM flags to insert right after the java executable.
+        Sets active_mode so the startup time can be attributed afterwards.
+        """
+        if not java_major or java_major < 13:
+            # -XX:ArchiveClassesAtExit (dynamic archive) needs JDK 13+
+            self.active_mode = "unsupported"
+            self.active_key = None
+            return []
+
+        key = self.compute_key(java_path, launch_args)
+        os.makedirs(self.cds_dir, exist_ok=True)
+
+        if self.state.get("key") != key:
+            if self.state.get("key"):
+                logger.info("CDS: Launch configuration changed, archive invalidated.")
+            self._invalidate_stale(key)
+            self.state["key"] = key
+            self._save_state()
+
+        archive = self.archive_path(key)
+        exists = os.path.exists(archive) and os.path.getsize(archive) > 0
+        self.active_key = key
+        self.active_mode = "shared" if exists else "training"
+
+        if java_major >= 19:
+            # The JVM validates the archive itself and regenerates it on exit if needed
+            return ["-XX:+AutoCreateSharedArchive", f"-XX:SharedArchiveFile={archive}"]
+        if exists:
+            return [f"-XX:SharedArchiveFile={archive}"]
+        return [f"-XX:ArchiveClassesAtExit={archive}"]
+
+    def clear(self):
+        """Deletes every archive so the next start is a training run."""
+        for path in glob.glob(os.path.join(self.cds_dir, f"{self.ARCHIVE_PREFIX}*.jsa")):
+            try:
+                os.remove(path)
+            except OSError as e:
+                logger.warning(f"CDS: Could not remove archive {path}: {e}")
+        self.state["key"] = None
+        self._save_state()
+
+    # --- Timing report ---
+
+    def record_startup(
+        self, mode: Optional[str], reported_seconds: Optional[float], wall_seconds: Optional[float]
+    ):
+        """Stores the time-to-Done of a start under its CDS mode."""
+        if not mode:
+            return
+        bucket = self.state["timings"].setdefault(mode, [])
+        bucket.append(
+            {
+                "reported": reported_seconds,
+                "wall": round(wall_seconds, 2) if wall_seconds is not None else None,
+                "time": time.time(),
+            }
+        )
+        del bucket[: -self.MAX_TIMINGS]
+        self._save_state()
+
+    def get_report(self) -> Dict:
+        """Median time-to-Done with and without the archive."""
+
+        def _median(entries, field):
+            values = [e[field] for e in entries if e.get(field) is not None]
+            return round(statistics.median(values), 2) if values else None
+
+        timings = self.state.get("timings", {})
+        without = timings.get("off", []) + timings.get("unsupported", [])
+        with_cds = timings.get("shared", [])
+
+        report = {
+            "mode": self.active_mode,
+            "archive": None,
+            "archive_size": 0,
+            "without_cds": {
+                "starts": len(without),
+                "median_reported": _median(without, "reported"),
+                "median_wall": _median(without, "wall"),
+            },
+            "with_cds": {
+                "starts": len(with_cds),
+                "median_reported": _median(with_cds, "reported"),
+                "median_wall": _median(with_cds, "wall"),
+            },
+            "training_runs": len(timings.get("training", [])),
+            "improvement_pct": None,
+        }
+
+        key = self.state.get("key")
+        if key and os.path.exists(self.archive_path(key)):
+            report["archive"] = os.path.basename(self.archive_path(key))
+            report["archive_size"] = os.path.getsize(self.archive_path(key))
+
+        before = report["without_cds"]["median_wall"]
+        after = report["with_cds"]["median_wall"]
+        if before and after:
+            report["improvement_pct"] = round((before - after) / before * 100, 1)
+
+        return report
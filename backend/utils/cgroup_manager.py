@@ -0,0 +1,256 @@
+import os
+import sys
+import re
+import errno
+import logging
+from typing import Optional, Dict, List
+
+logger = logging.getLogger(__name__)
+
+CGROUP_ROOT = "/sys/fs/cgroup"
+# Leaf the backend moves itself into when its own cgroup must become a pure parent
+BACKEND_LEAF = "mlsg-backend"
+
+
+def parse_size(value) -> Optional[str]:
+    """Converts '4G', '512M', 1073741824 or 'max' into a value for memory.* files."""
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)):
+        return str(int(value))
+    text = str(value).strip().upper()
+    if text == "MAX":
+        return "max"
+    m = re.match(r"^(\d+(?:\.\d+)?)\s*([KMGT]?)B?$", text)
+    if not m:
+        raise ValueError(f"Invalid size: {value}")
+    factor = {"": 1, "K": 1024, "M": 1024**2, "G": 1024**3, "T": 1024**4}[m.group(2)]
+    return str(int(float(m.group(1)) * factor))
+
+
+def parse_cpu_max(value) -> Optional[str]:
+    """
+    Accepts a raw cpu.max value ('200000 100000', 'max') or a number of cores
+    (2, '1.5') and returns the cpu.max content.
+    """
+    if value is None or value == "":
+        return None
+    text = str(value).strip()
+    if text == "max" or " " in text:
+        return text
+    cores = float(text)
+    period = 100000
+    return f"{int(cores * period)} {period}"
+
+
+def read_pressure(path: str) -> Optional[Dict]:
+    """Parses a PSI file (cpu.pressure, memory.pressure, io.pressure)."""
+    try:
+        with open(path, "r") as f:
+            content = f.read()
+    except OSError:
+        return None
+    result = {}
+    for line in content.splitlines():
+        parts = line.split()
+        if not parts:
+            continue
+        kind = parts[0]  # "some" or "full"
+        values = {}
+        for item in parts[1:]:
+            key, _, val = item.partition("=")
+            try:
+                values[key] = float(val) if key.startswith("avg") else int(val)
+            except ValueError:
+                continue
+        result[kind] = values
+    return result
+
+
+class CgroupManager:
+    """
+    Runs a server inside a dedicated cgroup v2 child group so one runaway
+    modpack cannot swap the host or starve the other servers.
+
+    Only works when the backend's own cgroup has been delegated to the user
+    (the usual case under a systemd user session or a container with a
+    writable cgroup2 mount). Otherwise is_available() is False and the server
+    starts exactly like before.
+    """
+
+    CONTROLLERS = ("memory", "cpu", "io")
+
+    def __init__(self, server_id: str, limits: Optional[Dict] = None):
+        self.server_id = server_id or "default"
+        self.limits = limits or {}
+        self.path: Optional[str] = None
+        self.enabled_controllers: List[str] = []
+
+    # --- Detection ---
+
+    @staticmethod
+    def own_cgroup_path() -> Optional[str]:
+        """Absolute path of the cgroup the backend process lives in (v2 only)."""
+        if not sys.platform.startswith("linux"):
+            return None
+        if not os.path.exists(os.path.join(CGROUP_ROOT, "cgroup.controllers")):
+            return None  # Not a unified (v2) hierarchy
+        try:
+            with open("/proc/self/cgroup", "r") as f:
+                for line in f:
+                    if line.startswith("0::"):
+                        rel = line.strip()[3:]
+                        path = os.path.normpath(os.path.join(CGROUP_ROOT, rel.lstrip("/")))
+                        # If we were already moved into our own leaf, manage its parent
+                        if os.path.basename(path) == BACKEND_LEAF:
+                            path = os.path.dirname(path)
+                        return path
+        except OSError:
+            return None
+        return None
+
+    @classmethod
+    def is_available(cls) -> bool:
+        base = cls.own_cgroup_path()
+        return bool(
+            base
+            and os.access(base, os.W_OK)
+            and os.access(os.path.join(base, "cgroup.subtree_control"), os.W_OK)
+        )
+
+    # --- Setup ---
+
+    def _enable_controllers(self, base: str) -> List[str]:
+        try:
+            with open(os.path.join(base, "cgroup.controllers"), "r") as f:
+                available = f.read().split()
+        except OSError:
+            return []
+        wanted = [c for c in self.CONTROLLERS if c in available]
+        if not wanted:
+            return []
+
+        control = os.path.join(base, "cgroup.subtree_control")
+        payload = " ".join(f"+{c}" for c in wanted)
+        try:
+            with open(control, "w") as f:
+                f.write(payload)
+        except OSError as e:
+            if e.errno != errno.EBUSY:
+                raise
+            # "No internal processes" rule: move the backend into a leaf first
+            self._move_own_processes_to_leaf(base)
+            with open(control, "w") as f:
+                f.write(payload)
+        return wanted
+
+    def _move_own_processes_to_leaf(self, base: str):
+        """Moves this backend and its children (nothing else sharing the group) into the leaf."""
+        import psutil
+
+        leaf = os.path.join(base, BACKEND_LEAF)
+        os.makedirs(leaf, exist_ok=True)
+        me = psutil.Process()
+        own = {str(me.pid)} | {str(child.pid) for child in me.children(recursive=True)}
+        with open(os.path.join(base, "cgroup.procs"), "r") as f:
+            pids = [p.strip() for p in f if p.strip() in own]
+        for pid in pids:
+            try:
+                with open(os.path.join(leaf, "cgroup.procs"), "w") as f:
+                    f.write(pid)
+            except OSError as e:
+                logger.warning(f"cgroup: Could not move PID {pid} to {BACKEND_LEAF}: {e}")
+
+    def _write(self, name: str, value: Optional[str]):
+        if value is None:
+            return
+        try:
+            with open(os.path.join(self.path, name), "w") as f:
+                f.write(value)
+        except OSError as e:
+            logger.warning(f"cgroup: Could not set {name}={value}: {e}")
+
+    def prepare(self) -> Optional[str]:
+        """Creates the child group and applies the limits. Returns its path or None."""
+        base = self.own_cgroup_path()
+        if not base or not self.is_available():
+            return None
+        try:
+            self.enabled_controllers = self._enable_controllers(base)
+            safe_id = re.sub(r"[^A-Za-z0-9_.-]", "-", self.server_id)
+            self.path = os.path.join(base, f"mlsg-server-{safe_id}")
+            os.makedirs(self.path, exist_ok=True)
+        except OSError as e:
+            logger.warning(f"cgroup: Setup failed, starting without limits: {e}")
+            self.path = None
+            return None
+
+        if "memory" in self.enabled_controllers:
+            self._write("memory.max", parse_size(self.limits.get("memory_max")))
+            self._write("memory.high", parse_size(self.limits.get("memory_high")))
+        if "cpu" in self.enabled_controllers:
+            weight = self.limits.get("cpu_weight")
+            self._write("cpu.weight", str(int(weight)) if weight else None)
+            self._write("cpu.max", parse_cpu_max(self.limits.get("cpu_max")))
+        if "io" in self.enabled_controllers:
+            io_weight = self.limits.get("io_weight")
+            self._write("io.weight", f"default {int(io_weight)}" if io_weight else None)
+
+        logger.info(f"cgroup: Prepared {self.path} (controllers: {self.enabled_controllers})")
+        return self.path
+
+    def wrap_command(self, command: List[str]) -> List[str]:
+        """
+        Prefixes a launch command with a tiny shell that joins the group and
+        then execs it, so the server (same PID) and anything it forks start
+        inside. Done by the child itself: preexec_fn is unsafe in this
+        multi-threaded process.
+        """
+        if not self.path:
+            return command
+        procs = os.path.join(self.path, "cgroup.procs")
+        return ["/bin/sh", "-c", 'echo $$ > "$0"; exec "$@"', procs, *command]
+
+    def contains(self, pid: int) -> bool:
+        try:
+            with open(os.path.join(self.path, "cgroup.procs"), "r") as f:
+                return str(pid) in (line.strip() for line in f)
+        except (OSError, TypeError):
+            return False
+
+    def cleanup(self):
+        """Removes the (now empty) group after the server exits."""
+        if not self.path:
+            return
+        try:
+            os.rmdir(self.path)
+        except OSError as e:
+            logger.debug(f"cgroup: Could not remove {self.path}: {e}")
+        self.path = None
+
+    # --- Stats ---
+
+    def read_stats(self) -> Optional[Dict]:
+        """Memory usage and PSI pressure readings of the server's group."""
+        if not self.path or not os.path.isdir(self.path):
+            return None
+
+        stats = {
+            "path": self.path,
+            "cpu_pressure": read_pressure(os.path.join(self.path, "cpu.pressure")),
+            "memory_pressure": read_pressure(os.path.join(self.path, "memory.pressure")),
+            "io_pressure": read_pressure(os.path.join(self.path, "io.pressure")),
+        }
+        try:
+            with open(os.path.join(self.path, "memory.current"), "r") as f:
+                stats["memory_current"] = int(f.read().strip())
+        except (OSError, ValueError):
+            pass
+        try:
+            with open(os.path.join(self.path, "memory.events"), "r") as f:
+                events = dict(line.split() for line in f if line.strip())
+            stats["oom_kills"] = int(events.get("oom_kill", 0))
+            stats["memory_high_events"] = int(events.get("high", 0))
+        except (OSError, ValueError):
+            pass
+        return stats
@@ -0,0 +1,433 @@
+import os
+import json
+import time
+import zlib
+import shutil
+import sqlite3
+import hashlib
+import logging
+import threading
+from typing import Callable, Dict, List, Optional
+
+from utils.region_file import HEADER_SIZE, RegionError, read_chunk_records, write_region
+
+logger = logging.getLogger(__name__)
+
+STORE_DIR = ".chunkstore"
+PACK_MAX_SIZE = 256 * 1024 * 1024
+# Files other than region files are stored in pieces of this size
+PIECE_SIZE = 4 * 1024 * 1024
+
+CODEC_RAW = 0
+CODEC_ZLIB = 1
+
+
+class _PackWriter:
+    """Appends objects to the current pack, rolling over at PACK_MAX_SIZE."""
+
+    def __init__(self, store: "ChunkBackupStore", db: sqlite3.Connection, throttle=None):
+        self.store = store
+        self.db = db
+        self.throttle = throttle
+        numbers = store._pack_numbers()
+        self.pack = numbers[-1] if numbers else 1
+        self.file = None
+        self.pending: Dict[str, int] = {}  # Written in this run, not yet committed
+        self.bytes_added = 0
+
+    def _open(self):
+        path = self.store._pack_path(self.pack)
+        if os.path.exists(path) and os.path.getsize(path) >= PACK_MAX_SIZE:
+            self.pack += 1
+            path = self.store._pack_path(self.pack)
+        self.file = open(path, "ab")
+
+    def has(self, digest: str) -> bool:
+        if digest in self.pending:
+            return True
+        row = self.db.execute("SELECT 1 FROM objects WHERE hash = ?", (digest,)).fetchone()
+        return row is not None
+
+    def add(self, digest: str, data: bytes, codec: int):
+        if self.file is None:
+            self._open()
+        elif self.file.tell() >= PACK_MAX_SIZE:
+            self.flush()
+            self.file.close()
+            self.pack += 1
+            self._open()
+        stored = zlib.compress(data, 6) if codec == CODEC_ZLIB else data
+        if codec == CODEC_ZLIB and len(stored) >= len(data):
+            stored, codec = data, CODEC_RAW
+        if self.throttle:
+            self.throttle.consume(len(stored))
+        offset = self.file.tell()
+        self.file.write(stored)
+        self.db.execute(
+            "INSERT OR IGNORE INTO objects (hash, pack, offset, length, size, codec) VALUES (?, ?, ?, ?, ?, ?)",
+            (digest, self.pack, offset, len(stored), len(data), codec),
+        )
+        self.pending[digest] = len(stored)
+        self.bytes_added += len(stored)
+
+    def flush(self):
+        if self.file is not None:
+            self.file.flush()
+            os.fsync(self.file.fileno())
+
+    def close(self):
+        # Pack data reaches the disk before the index rows that point to it
+        if self.file is not None:
+            self.flush()
+            self.file.close()
+            self.file = None
+        self.db.commit()
+
+
+class ChunkBackupStore:
+    """
+    Copias incrementales de mundos con deduplicación a nivel de chunk.
+
+    Region files (.mca) are split into their chunk records using the header
+    offsets; every other file is split into fixed-size pieces. Each record is
+    stored once, by SHA-256, appended to pack files (packs/pack-NNNNNN.dat)
+    and located through a sqlite index (index.db). A snapshot is a JSON
+    manifest listing, per file, the hashes needed to rebuild it.
+
+    Files whose size and mtime match the previous snapshot of the same world
+    are not read at all, and chunks already in the store are not written
+    again, so a snapshot of a lightly modified world costs little time and
+    only the changed chunks in space.
+    """
+
+    def __init__(self, backups_dir: str):
+        self.root = os.path.join(backups_dir, STORE_DIR)
+        self.packs_dir = os.path.join(self.root, "packs")
+        self.snapshots_dir = os.path.join(self.root, "snapshots")
+        self.db_path = os.path.join(self.root, "index.db")
+        self._lock = threading.Lock()
+        os.makedirs(self.packs_dir, exist_ok=True)
+        os.makedirs(self.snapshots_dir, exist_ok=True)
+        with self._connect() as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS objects ("
+                "hash TEXT PRIMARY KEY, pack INTEGER NOT NULL, offset INTEGER NOT NULL, "
+                "length INTEGER NOT NULL, size INTEGER NOT NULL, codec INTEGER NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        db = sqlite3.connect(self.db_path, timeout=30)
+        db.execute("PRAGMA journal_mode=WAL")
+        return db
+
+    # --- Packs ---
+
+    def _pack_path(self, pack: int) -> str:
+        return os.path.join(self.packs_dir, f"pack-{pack:06d}.dat")
+
+    def _pack_numbers(self) -> List[int]:
+        numbers = []
+        for name in os.listdir(self.packs_dir):
+            if name.startswith("pack-") and name.endswith(".dat"):
+                try:
+                    numbers.append(int(name[5:-4]))
+                except ValueError:
+                    pass
+        return sorted(numbers)
+
+    def _read_object(self, db: sqlite3.Connection, digest: str, handles: Dict[int, object]) -> bytes:
+        row = db.execute("SELECT pack, offset, length, codec FROM objects WHERE hash = ?", (digest,)).fetchone()
+        if row is None:
+            raise KeyError(f"Object {digest} missing from the chunk store")
+        pack, offset, length, codec = row
+        f = handles.get(pack)
+        if f is None:
+            f = handles[pack] = open(self._pack_path(pack), "rb")
+        f.seek(offset)
+        data = f.read(length)
+        return zlib.decompress(data) if codec == CODEC_ZLIB else data
+
+    # --- Manifests ---
+
+    def _manifest_path(self, snapshot_id: str) -> str:
+        return os.path.join(self.snapshots_dir, f"{snapshot_id}.json")
+
+    def load_manifest(self, snapshot_id: str) -> Dict:
+        path = self._manifest_path(os.path.basename(snapshot_id))
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Snapshot not found: {snapshot_id}")
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def list_snapshots(self, world: Optional[str] = None) -> List[Dict]:
+        items = []
+        for name in os.listdir(self.snapshots_dir):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.snapshots_dir, name), "r", encoding="utf-8") as f:
+                    manifest = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                logger.warning(f"Chunk store: Unreadable manifest {name}: {e}")
+                continue
+            if world and manifest.get("world") != world:
+                continue
+            items.append(
+                {
+                    "id": manifest["id"],
+                    "world": manifest["world"],
+                    "created": manifest["created"],
+                    "files": len(manifest["files"]),
+                    "stats": manifest.get("stats", {}),
+                }
+            )
+        items.sort(key=lambda s: s["created"], reverse=True)
+        return items
+
+    def _latest_manifest(self, world: str) -> Optional[Dict]:
+        snapshots = self.list_snapshots(world)
+        return self.load_manifest(snapshots[0]["id"]) if snapshots else None
+
+    # --- Backup ---
+
+    def _store_region(self, path: str, writer: _PackWriter, stats: Dict) -> Dict:
+        if writer.throttle:
+            writer.throttle.consume(os.path.getsize(path))
+        chunks = []
+        for index, timestamp, record in read_chunk_records(path):
+            digest = hashlib.sha256(record).hexdigest()
+            stats["chunks"] += 1
+            if not writer.has(digest):
+                # Chunk payloads are already compressed by the game
+                writer.add(digest, record, CODEC_RAW)
+                stats["chunks_new"] += 1
+            chunks.append([index, timestamp, digest])
+        return {"type": "region", "chunks": chunks}
+
+    def _store_file(self, path: str, writer: _PackWriter, stats: Dict) -> Dict:
+        pieces = []
+        with open(path, "rb") as f:
+            for piece in iter(lambda: f.read(PIECE_SIZE), b""):
+                if writer.throttle:
+                    writer.throttle.consume(len(piece))
+                digest = hashlib.sha256(piece).hexdigest()
+                if not writer.has(digest):
+                    writer.add(digest, piece, CODEC_ZLIB)
+                pieces.append(digest)
+        return {"type": "file", "pieces": pieces}
+
+    def create_snapshot(
+        self,
+        world_path: str,
+        world_name: Optional[str] = None,
+        progress_callback: Optional[Callable[[int, int], None]] = None,
+        throttle=None,
+    ) -> Dict:
+        """
+        Stores a snapshot of world_path and returns its manifest summary,
+        including the stats: duration, files read/unchanged, chunks seen/new
+        and bytes_added (pack bytes written by this snapshot).
+        `throttle` (an IoThrottle) paces the reads and pack writes.
+        """
+        world_name = world_name or os.path.basename(os.path.normpath(world_path))
+        started = time.time()
+        stats = {
+            "files": 0, "files_unchanged": 0, "chunks": 0, "chunks_new": 0,
+            "bytes_logical": 0, "bytes_added": 0, "duration": 0.0,
+        }
+
+        paths = []
+        for root, _, files in os.walk(world_path):
+            for name in files:
+                if name == "session.lock":
+                    continue  # Held open by the running server
+                full = os.path.join(root, name)
+                paths.append((os.path.relpath(full, world_path).replace(os.sep, "/"), full))
+
+        with self._lock:
+            previous = self._latest_manifest(world_name)
+            previous_files = previous["files"] if previous else {}
+            db = self._connect()
+            writer = _PackWriter(self, db, throttle)
+            files = {}
+            try:
+                for i, (rel, full) in enumerate(paths):
+                    try:
+                        st = os.stat(full)
+                    except OSError:
+                        continue  # Deleted while walking
+                    stats["files"] += 1
+                    stats["bytes_logical"] += st.st_size
+                    old = previous_files.get(rel)
+                    if old and old["size"] == st.st_size and old["mtime"] == st.st_mtime:
+                        files[rel] = old
+                        stats["files_unchanged"] += 1
+                    else:
+                        entry = None
+                        if rel.endswith(".mca") and st.st_size >= HEADER_SIZE:
+                            try:
+                                entry = self._store_region(full, writer, stats)
+                            except RegionError as e:
+                                logger.warning(f"Chunk store: {rel} is not a valid region file ({e}), storing it whole")
+                        if entry is None:
+                            entry = self._store_file(full, writer, stats)
+                        entry.update(size=st.st_size, mtime=st.st_mtime)
+                        files[rel] = entry
+                    if progress_callback:
+                        progress_callback(i + 1, len(paths))
+            finally:
+                writer.close()
+                db.close()
+
+            stats["bytes_added"] = writer.bytes_added
+            stats["duration"] = round(time.time() - started, 3)
+            created = time.time()
+            snapshot_id = f"{world_name}-{time.strftime('%Y%m%d-%H%M%S', time.localtime(created))}"
+            if os.path.exists(self._manifest_path(snapshot_id)):
+                snapshot_id += f"-{int(created * 1000) % 1000:03d}"
+            manifest = {"id": snapshot_id, "world": world_name, "created": created, "files": files, "stats": stats}
+            tmp = self._manifest_path(snapshot_id) + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(manifest, f)
+            os.replace(tmp, self._manifest_path(snapshot_id))
+
+        logger.info(
+            f"Chunk store: Snapshot {snapshot_id} in {stats['duration']}s, "
+            f"{stats['chunks_new']}/{stats['chunks']} new chunks, "
+            f"{stats['files_unchanged']}/{stats['files']} files unchanged, "
+            f"{stats['bytes_added'] / 1048576:.1f} MB added"
+        )
+        return {"id": snapshot_id, "world": world_name, "created": created, "stats": stats}
+
+    # --- Restore ---
+
+    def restore_snapshot(
+        self,
+        snapshot_id: str,
+        dest_path: str,
+        progress_callback: Optional[Callable[[int, int], None]] = None,
+    ) -> Dict:
+        """
+        Rebuilds a snapshot into dest_path, which must not exist yet
+        (the caller swaps it with the live world).
+        """
+        manifest = self.load_manifest(snapshot_id)
+        if os.path.exists(dest_path):
+            raise FileExistsError(f"Restore target already exists: {dest_path}")
+        started = time.time()
+        handles: Dict[int, object] = {}
+        written = 0
+        db = self._connect()
+        try:
+            total = len(manifest["files"])
+            for i, (rel, entry) in enumerate(sorted(manifest["files"].items())):
+                target = os.path.join(dest_path, *rel.split("/"))
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                if entry["type"] == "region":
+                    chunks = {
+                        index: (timestamp, self._read_object(db, digest, handles))
+                        for index, timestamp, digest in entry["chunks"]
+                    }
+                    write_region(target, chunks, mtime=entry["mtime"])
+                else:
+                    with open(target, "wb") as f:
+                        for digest in entry["pieces"]:
+                            f.write(self._read_object(db, digest, handles))
+                    os.utime(target, (entry["mtime"], entry["mtime"]))
+                written += os.path.getsize(target)
+                if progress_callback:
+                    progress_callback(i + 1, total)
+        except Exception:
+            shutil.rmtree(dest_path, ignore_errors=True)
+            raise
+        finally:
+            for f in handles.values():
+                f.close()
+            db.close()
+        return {"id": manifest["id"], "files": len(manifest["files"]), "bytes": written,
+                "duration": round(time.time() - started, 3)}
+
+    # --- Maintenance ---
+
+    def delete_snapshot(self, snapshot_id: str):
+        with self._lock:
+            os.remove(self._manifest_path(os.path.basename(snapshot_id)))
+
+    def _live_hashes(self) -> set:
+        live = set()
+        for name in os.listdir(self.snapshots_dir):
+            if not name.endswith(".json"):
+                continue
+            with open(os.path.join(self.snapshots_dir, name), "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+            for entry in manifest["files"].values():
+                if entry["type"] == "region":
+                    live.update(digest for _, _, digest in entry["chunks"])
+                else:
+                    live.update(entry["pieces"])
+        return live
+
+    def gc(self) -> Dict:
+        """
+        Drops objects no snapshot references. Packs holding dead objects
+        are rewritten with only their live ones.
+        """
+        with self._lock:
+            live = self._live_hashes()
+            db = self._connect()
+            freed, removed = 0, 0
+            try:
+                for pack in self._pack_numbers():
+                    rows = db.execute(
+                        "SELECT hash, offset, length, size, codec FROM objects WHERE pack = ? ORDER BY offset", (pack,)
+                    ).fetchall()
+                    dead = [r for r in rows if r[0] not in live]
+                    old_path = self._pack_path(pack)
+                    old_size = os.path.getsize(old_path)
+                    if not dead and rows:
+                        continue
+                    if len(dead) == len(rows):
+                        db.execute("DELETE FROM objects WHERE pack = ?", (pack,))
+                        db.commit()
+                        os.remove(old_path)
+                        freed += old_size
+                        removed += len(dead)
+                        continue
+                    # Live objects move to a fresh pack; the old one goes once the index points there
+                    new_pack = self._pack_numbers()[-1] + 1
+                    new_path = self._pack_path(new_pack)
+                    moved = []
+                    with open(old_path, "rb") as src, open(new_path, "wb") as dst:
+                        for digest, offset, length, size, codec in rows:
+                            if digest not in live:
+                                continue
+                            src.seek(offset)
+                            moved.append((new_pack, dst.tell(), digest))
+                            dst.write(src.read(length))
+                        dst.flush()
+                        os.fsync(dst.fileno())
+                    db.executemany("DELETE FROM objects WHERE hash = ?", [(r[0],) for r in dead])
+                    db.executemany("UPDATE objects SET pack = ?, offset = ? WHERE hash = ?", moved)
+                    db.commit()
+                    os.remove(old_path)
+                    freed += old_size - os.path.getsize(new_path)
+                    removed += len(dead)
+            finally:
+                db.close()
+        logger.info(f"Chunk store GC: removed {removed} objects, freed {freed / 1048576:.1f} MB")
+        return {"removed": removed, "freed_bytes": freed}
+
+    def get_report(self) -> Dict:
+        with self._connect() as db:
+            objects, stored, logical = db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(length), 0), COALESCE(SUM(size), 0) FROM objects"
+            ).fetchone()
+        packs = self._pack_numbers()
+        return {
+            "snapshots": len(self.list_snapshots()),
+            "objects": objects,
+            "packs": len(packs),
+            "pack_bytes": sum(os.path.getsize(self._pack_path(p)) for p in packs),
+            "stored_bytes": stored,
+            "object_bytes": logical,
+        }
@@ -0,0 +1,250 @@
+import os
+import time
+import logging
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional
+
+from utils.nbt import NbtError, read_nbt
+from utils.region_file import (
+    SECTOR_SIZE,
+    RegionError,
+    decompress_record,
+    exclusive_rewrite,
+    read_chunk_records,
+    region_size,
+    write_region,
+)
+from utils.world_size import dimension_of
+
+logger = logging.getLogger(__name__)
+
+# Chunk data in region/, and what belongs to the same chunks in entities/ and poi/
+SIBLING_KINDS = ("entities", "poi")
+# Only InhabitedTime is decoded: at the root since 1.18, under Level before
+INHABITED_SELECT = {"InhabitedTime": True, "Level": {"InhabitedTime": True}}
+MAX_ERRORS = 50
+
+
+class TrimError(Exception):
+    pass
+
+
+def normalize_areas(areas: Optional[List[Dict]]) -> List[Dict]:
+    """
+    Protected areas in block coordinates, as given by the user:
+      {"x1", "z1", "x2", "z2"} (rectangle) or {"x", "z", "radius"} (circle),
+    each with an optional "dimension" (default minecraft:overworld).
+    Raises TrimError for malformed entries.
+    """
+    result = []
+    for area in areas or []:
+        dimension = area.get("dimension") or "minecraft:overworld"
+        try:
+            if "radius" in area:
+                result.append({"dimension": dimension, "x": float(area["x"]), "z": float(area["z"]),
+                               "radius": float(area["radius"])})
+            else:
+                x1, x2 = sorted((int(area["x1"]), int(area["x2"])))
+                z1, z2 = sorted((int(area["z1"]), int(area["z2"])))
+                result.append({"dimension": dimension, "x1": x1, "z1": z1, "x2": x2, "z2": z2})
+        except (KeyError, TypeError, ValueError):
+            raise TrimError(f"Invalid protected area: {area}")
+    return result
+
+
+def _protected(cx: int, cz: int, areas: List[Dict]) -> bool:
+    # A chunk covers blocks [cx*16, cx*16+15]; any overlap protects it
+    bx, bz = cx * 16, cz * 16
+    for area in areas:
+        if "radius" in area:
+            dx = max(bx - area["x"], 0, area["x"] - (bx + 15))
+            dz = max(bz - area["z"], 0, area["z"] - (bz + 15))
+            if dx * dx + dz * dz <= area["radius"] ** 2:
+                return True
+        elif bx <= area["x2"] and bx + 15 >= area["x1"] and bz <= area["z2"] and bz + 15 >= area["z1"]:
+            return True
+    return False
+
+
+def _inhabited_time(record: bytes) -> Optional[int]:
+    root = read_nbt(decompress_record(record), INHABITED_SELECT)
+    if not isinstance(root, dict):
+        return None
+    if "InhabitedTime" in root:
+        return root["InhabitedTime"]
+    return (root.get("Level") or {}).get("InhabitedTime")
+
+
+def _trim_region(task: Dict) -> Dict:
+    """
+    Worker: decides which chunks of one region file go, and (unless dry_run)
+    rewrites it and its entities/poi counterparts without them.
+    """
+    path = task["path"]
+    result = {"key": task["key"], "dimension": task["dimension"], "chunks": 0, "removed": 0,
+              "removed_bytes": 0, "bytes_before": 0, "bytes_after": 0, "errors": []}
+    try:
+        records = read_chunk_records(path)
+    except (OSError, RegionError) as e:
+        result["errors"].append(f"{task['key']}: {e}")
+        return result
+
+    rx, rz = task["region"]
+    doomed = set()
+    for index, _, record in records:
+        try:
+            inhabited = _inhabited_time(record)
+        except (RegionError, NbtError) as e:
+            # Unreadable chunks are kept: removing them is not this tool's call
+            result["errors"].append(f"{task['key']} chunk {index}: {e}")
+            continue
+        if inhabited is None or inhabited >= task["threshold"]:
+            continue
+        if _protected(rx * 32 + index % 32, rz * 32 + index // 32, task["areas"]):
+            continue
+        doomed.add(index)
+    result["chunks"] = len(records)
+    result["removed"] = len(doomed)
+
+    files = [(path, records)]
+    for sibling in task["siblings"]:
+        try:
+            files.append((sibling, read_chunk_records(sibling)))
+        except (OSError, RegionError) as e:
+            result["errors"].append(f"{os.path.relpath(sibling, task['root'])}: {e} (left untouched)")
+
+    for file_path, file_records in files:
+        before = os.path.getsize(file_path)
+        kept = {index: (ts, record) for index, ts, record in file_records if index not in doomed}
+        result["bytes_before"] += before
+        if len(kept) == len(file_records):
+            result["bytes_after"] += before
+            continue
+        result["removed_bytes"] += sum(
+            -(-len(record) // SECTOR_SIZE) * SECTOR_SIZE for index, _, record in file_records if index in doomed
+        )
+        # Emptied files are deleted; the game recreates missing region files
+        result["bytes_after"] += region_size([record for _, record in kept.values()]) if kept else 0
+        if task["dry_run"]:
+            continue
+        if kept:
+            write_region(file_path, kept)
+        else:
+            os.remove(file_path)
+    return result
+
+
+class ChunkTrimmer:
+    """
+    Recorta los chunks apenas visitados de un mundo (servidor detenido).
+
+    Every chunk's NBT is read just far enough to get InhabitedTime (the
+    ticks players have spent nearby). Chunks below the threshold and
+    outside the protected areas are removed from region/, together with
+    their entities/ and poi/ data; the game regenerates them if someone
+    goes there again. Region files are processed in parallel (one process
+    per core, the server is stopped) and rewritten atomically, packed.
+
+    A dry run only reports what would be reclaimed. A real run requires a
+    backup callable, which is invoked (and must succeed) before anything
+    is deleted.
+    """
+
+    def __init__(self, workers: Optional[int] = None):
+        self.workers = max(1, workers or os.cpu_count() or 1)
+
+    def _tasks(self, world_path: str, threshold: int, areas: List[Dict], dry_run: bool) -> List[Dict]:
+        tasks = []
+        for root, dirs, files in os.walk(world_path):
+            if os.path.basename(root) != "region":
+                continue
+            dims_root = os.path.dirname(root)
+            dimension = dimension_of(os.path.relpath(root, world_path))
+            dim_areas = [a for a in areas if a["dimension"] == dimension]
+            for name in files:
+                parts = name.split(".")
+                if len(parts) != 4 or parts[0] != "r" or parts[3] != "mca":
+                    continue
+                try:
+                    region = (int(parts[1]), int(parts[2]))
+                except ValueError:
+                    continue
+                path = os.path.join(root, name)
+                if os.path.getsize(path) == 0:
+                    continue
+                siblings = [os.path.join(dims_root, kind, name) for kind in SIBLING_KINDS]
+                tasks.append({
+                    "path": path,
+                    "root": world_path,
+                    "key": os.path.relpath(path, world_path).replace(os.sep, "/"),
+                    "dimension": dimension,
+                    "region": region,
+                    "siblings": [s for s in siblings if os.path.isfile(s) and os.path.getsize(s) > 0],
+                    "threshold": threshold,
+                    "areas": dim_areas,
+                    "dry_run": dry_run,
+                })
+        return tasks
+
+    def trim(
+        self,
+        world_path: str,
+        threshold: int,
+        protected: Optional[List[Dict]] = None,
+        dry_run: bool = True,
+        backup: Optional[Callable[[], Dict]] = None,
+        progress_callback: Optional[Callable[[int, int], None]] = None,
+        server_active: Optional[Callable[[], bool]] = None,
+    ) -> Dict:
+        """
+        Removes (or, with dry_run, counts) the chunks with InhabitedTime < threshold ticks.
+        Returns the report. Raises TrimError if a real run has no backup, RegionError
+        if the world is already being rewritten or server_active() is true.
+        """
+        if not dry_run and backup is None:
+            raise TrimError("A backup is required before trimming chunks")
+        areas = normalize_areas(protected)
+        with exclusive_rewrite(world_path, server_active):
+            started = time.time()
+            report = {"dry_run": dry_run, "threshold": threshold}
+            if not dry_run:
+                # Mandatory: nothing is deleted unless the backup went through
+                report["backup"] = backup()
+                # The server cannot start while the rewrite is claimed; this catches any earlier start
+                if server_active and server_active():
+                    raise RegionError("The server was started; nothing was trimmed")
+
+            tasks = self._tasks(world_path, threshold, areas, dry_run)
+            totals = {"regions": len(tasks), "chunks": 0, "chunks_removed": 0, "removed_bytes": 0,
+                      "bytes_before": 0, "bytes_after": 0}
+            by_dimension: Dict[str, Dict] = {}
+            errors = []
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                futures = [pool.submit(_trim_region, task) for task in tasks]
+                for done, future in enumerate(as_completed(futures), 1):
+                    result = future.result()
+                    totals["chunks"] += result["chunks"]
+                    totals["chunks_removed"] += result["removed"]
+                    for field in ("removed_bytes", "bytes_before", "bytes_after"):
+                        totals[field] += result[field]
+                    dim = by_dimension.setdefault(result["dimension"], {"chunks": 0, "chunks_removed": 0,
+                                                                        "reclaimed_bytes": 0})
+                    dim["chunks"] += result["chunks"]
+                    dim["chunks_removed"] += result["removed"]
+                    dim["reclaimed_bytes"] += result["bytes_before"] - result["bytes_after"]
+                    errors.extend(result["errors"])
+                    if progress_callback:
+                        progress_callback(done, len(tasks))
+
+            totals["reclaimed_bytes"] = totals["bytes_before"] - totals["bytes_after"]
+            report.update(totals)
+            report["by_dimension"] = by_dimension
+            report["errors"] = errors[:MAX_ERRORS]
+            report["error_count"] = len(errors)
+            report["duration"] = round(time.time() - started, 3)
+            logger.info(
+                f"Chunk trim{' (dry run)' if dry_run else ''} of {os.path.basename(world_path)}: "
+                f"{totals['chunks_removed']}/{totals['chunks']} chunks, "
+                f"{totals['reclaimed_bytes'] / 1048576:.1f} MB in {report['duration']}s"
+            )
+            return report
@@ -0,0 +1,228 @@
+import os
+import sys
+import glob
+import logging
+import threading
+from typing import Dict, List
+
+import psutil
+
+logger = logging.getLogger(__name__)
+
+
+def _parse_cpulist(text: str) -> List[int]:
+    """Parses a Linux cpulist string such as '0-3,8-11' into a list of CPU ids."""
+    cpus = []
+    for part in text.strip().split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            start, end = part.split("-", 1)
+            cpus.extend(range(int(start), int(end) + 1))
+        else:
+            cpus.append(int(part))
+    return cpus
+
+
+class CpuPlacementScheduler:
+    """
+    Assigns disjoint CPU sets to the running servers so their main tick threads
+    don't compete for (and thrash the caches of) the same cores.
+
+    Cores are split proportionally to each server's configured share and,
+    when /sys/devices/system/node exposes the NUMA topology, a server is kept
+    inside a single node whenever its core count fits there.
+    """
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._servers: Dict[str, Dict] = {}  # server_id -> {"pid", "share"}
+        self._mapping: Dict[str, List[int]] = {}  # server_id -> cpus
+        self.available_cpus = self._detect_available_cpus()
+        self.topology = self._detect_topology()
+
+    # --- Topology ---
+
+    def _detect_available_cpus(self) -> List[int]:
+        """CPUs this process may run on (respects container/taskset limits)."""
+        try:
+            if hasattr(os, "sched_getaffinity"):
+                return sorted(os.sched_getaffinity(0))
+            return sorted(psutil.Process().cpu_affinity())
+        except Exception:
+            return list(range(psutil.cpu_count(logical=True) or 1))
+
+    def _detect_topology(self) -> Dict[int, List[int]]:
+        """Returns {numa_node: [cpus]} restricted to the available CPUs."""
+        available = set(self.available_cpus)
+        nodes = {}
+        if sys.platform.startswith("linux"):
+            for node_dir in glob.glob("/sys/devices/system/node/node[0-9]*"):
+                try:
+                    node_id = int(os.path.basename(node_dir)[4:])
+                    with open(os.path.join(node_dir, "cpulist"), "r") as f:
+                        cpus = [c for c in _parse_cpulist(f.read()) if c in available]
+                    if cpus:
+                        nodes[node_id] = sorted(cpus)
+                except (OSError, ValueError):
+                    continue
+        if not nodes:
+            nodes = {0: list(self.available_cpus)}
+        return dict(sorted(nodes.items()))
+
+    # --- Registration ---
+
+    def register(self, server_id: str, pid: int, share: float = 1.0):
+        """Called when a server process has been spawned."""
+        with self._lock:
+            self._servers[server_id] = {"pid": pid, "share": max(float(share or 1.0), 0.1)}
+        self.rebalance()
+
+    def unregister(self, server_id: str):
+        """Called when a server process has exited."""
+        with self._lock:
+            self._servers.pop(server_id, None)
+            self._mapping.pop(server_id, None)
+        self.rebalance()
+
+    def update_share(self, server_id: str, share: float):
+        with self._lock:
+            if server_id not in self._servers:
+                return
+            self._servers[server_id]["share"] = max(float(share or 1.0), 0.1)
+        self.rebalance()
+
+    def set_enabled(self, enabled: bool):
+        self.enabled = enabled
+        if enabled:
+            self.rebalance()
+        else:
+            # Give every server back the full CPU set
+            with self._lock:
+                servers = dict(self._servers)
+                self._mapping = {}
+            for info in servers.values():
+                self._apply_affinity(info["pid"], self.available_cpus)
+
+    # --- Placement ---
+
+    def _compute_counts(self, servers: Dict[str, Dict]) -> Dict[str, int]:
+        """Splits the cores by share (largest remainder, at least one core each)."""
+        total = len(self.available_cpus)
+        total_share = sum(s["share"] for s in servers.values())
+        exact = {sid: s["share"] / total_share * total for sid, s in servers.items()}
+        counts = {sid: max(1, int(v)) for sid, v in exact.items()}
+
+        # Hand out leftover cores to the largest fractional parts
+        leftover = total - sum(counts.values())
+        by_remainder = sorted(exact, key=lambda sid: exact[sid] - int(exact[sid]), reverse=True)
+        i = 0
+        while leftover > 0 and by_remainder:
+            counts[by_remainder[i % len(by_remainder)]] += 1
+            leftover -= 1
+            i += 1
+        # The minimum of one core may have oversubscribed; take back from the largest
+        while leftover < 0:
+            sid = max(counts, key=counts.get)
+            if counts[sid] <= 1:
+                break
+            counts[sid] -= 1
+            leftover += 1
+        return counts
+
+    def _compute_mapping(self, servers: Dict[str, Dict]) -> Dict[str, List[int]]:
+        if not servers:
+            return {}
+
+        if len(servers) > len(self.available_cpus):
+            # Not enough cores for disjoint sets: one core each, round robin
+            ordered = sorted(servers, key=lambda sid: servers[sid]["share"], reverse=True)
+            return {
+                sid: [self.available_cpus[i % len(self.available_cpus)]]
+                for i, sid in enumerate(ordered)
+            }
+
+        counts = self._compute_counts(servers)
+        free = {node: list(cpus) for node, cpus in self.topology.items()}
+        mapping = {}
+
+        for sid in sorted(counts, key=counts.get, reverse=True):
+            need = counts[sid]
+            # Best fit: the node with the fewest free cores that still fits the server
+            fitting = [n for n, cpus in free.items() if len(cpus) >= need]
+            if fitting:
+                node = min(fitting, key=lambda n: len(free[n]))
+                mapping[sid] = free[node][:need]
+                free[node] = free[node][need:]
+                continue
+            # Doesn't fit in one node: span nodes, fullest node first
+            cpus = []
+            for node in sorted(free, key=lambda n: len(free[n]), reverse=True):
+                take = free[node][: need - len(cpus)]
+                cpus.extend(take)
+                free[node] = free[node][len(take):]
+                if len(cpus) >= need:
+                    break
+            mapping[sid] = cpus
+
+        return mapping
+
+    def rebalance(self):
+        """Recomputes the placement and applies it to every registered process."""
+        with self._lock:
+            servers = {sid: dict(info) for sid, info in self._servers.items()}
+            self._mapping = self._compute_mapping(servers)
+            mapping = dict(self._mapping)
+
+        if not self.enabled:
+            return
+
+        for sid, cpus in mapping.items():
+            self._apply_affinity(servers[sid]["pid"], cpus)
+        if mapping:
+            logger.info(f"CPU placement updated: {mapping}")
+
+    def _apply_affinity(self, pid: int, cpus: List[int]):
+        """Pins a process tree (and, on Linux, every existing thread) to cpus."""
+        try:
+            parent = psutil.Process(pid)
+            procs = [parent] + parent.children(recursive=True)
+        except psutil.NoSuchProcess:
+            return
+
+        for proc in procs:
+            try:
+                if hasattr(os, "sched_setaffinity"):
+                    # sched_setaffinity only affects one thread; the JVM is already running many
+                    for thread in proc.threads():
+                        try:
+                            os.sched_setaffinity(thread.id, cpus)
+                        except OSError:
+                            pass
+                elif hasattr(proc, "cpu_affinity"):
+                    proc.cpu_affinity(cpus)
+            except (psutil.NoSuchProcess, psutil.AccessDenied, OSError) as e:
+                logger.warning(f"Could not set CPU affinity for PID {proc.pid}: {e}")
+
+    def get_mapping(self) -> Dict:
+        with self._lock:
+            servers = {sid: dict(info) for sid, info in self._servers.items()}
+            mapping = dict(self._mapping)
+
+        cpu_to_node = {c: n for n, cpus in self.topology.items() for c in cpus}
+        return {
+            "enabled": self.enabled,
+            "available_cpus": self.available_cpus,
+            "numa_nodes": self.topology,
+            "servers": {
+                sid: {
+                    "pid": info["pid"],
+                    "share": info["share"],
+                    "cpus": mapping.get(sid, []),
+                    "numa_nodes": sorted({cpu_to_node.get(c, 0) for c in mapping.get(sid, [])}),
+                }
+                for sid, info in servers.items()
+            },
+        }
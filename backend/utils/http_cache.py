@@ -0,0 +1,278 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from email.utils import parsedate_to_datetime
+from typing import Optional, Dict
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+logger = logging.getLogger(__name__)
+
+
+def _parse_cache_control(value: Optional[str]) -> Dict[str, Optional[str]]:
+    directives = {}
+    for part in (value or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        key, _, val = part.partition("=")
+        directives[key.strip().lower()] = val.strip().strip('"') or None
+    return directives
+
+
+def _to_int(value: Optional[str]) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class CachedResponse:
+    """Minimal stand-in for requests.Response served from the cache."""
+
+    def __init__(self, url: str, status_code: int, headers: Dict, content: bytes, from_cache: bool):
+        self.url = url
+        self.status_code = status_code
+        self.headers = CaseInsensitiveDict(headers)
+        self.content = content
+        self.from_cache = from_cache
+
+    @property
+    def text(self) -> str:
+        return self.content.decode("utf-8", errors="replace")
+
+    def json(self):
+        return json.loads(self.content)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} Error for url: {self.url}", response=self)
+
+
+class HttpCache:
+    """
+    Sesión HTTP compartida (con pool de conexiones) y caché de respuestas GET.
+
+    Responses are kept in a small in-memory LRU in front of a disk cache
+    (one .json metadata + one .body file per URL). Freshness follows
+    Cache-Control max-age / Expires, or the caller's `ttl` when the server
+    sends none; stale entries are revalidated with ETag / Last-Modified.
+    Within the stale-while-revalidate window a stale entry is returned
+    immediately and refreshed in the background.
+    """
+
+    # Only these headers are worth persisting
+    KEPT_HEADERS = ("content-type", "etag", "last-modified", "cache-control", "expires", "date")
+    MAX_DISK_AGE = 7 * 24 * 3600
+
+    def __init__(
+        self,
+        cache_dir: Optional[str] = None,
+        headers: Optional[Dict[str, str]] = None,
+        memory_entries: int = 256,
+        pool_size: int = 16,
+    ):
+        self.cache_dir = cache_dir
+        self.memory_entries = memory_entries
+        self._memory: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._revalidating = set()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        if headers:
+            self.session.headers.update(headers)
+
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+            threading.Thread(target=self.prune, daemon=True).start()
+
+    # --- Storage ---
+
+    @staticmethod
+    def _key(url: str, params: Optional[Dict]) -> str:
+        items = sorted((k, str(v)) for k, v in (params or {}).items() if v is not None)
+        return hashlib.sha256(json.dumps([url, items]).encode("utf-8")).hexdigest()
+
+    def _paths(self, key: str):
+        base = os.path.join(self.cache_dir, key[:2], key)
+        return base + ".json", base + ".body"
+
+    def _remember(self, key: str, entry: Dict):
+        with self._lock:
+            self._memory[key] = entry
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def _lookup(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                return entry
+        if not self.cache_dir:
+            return None
+        meta_path, body_path = self._paths(key)
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            with open(body_path, "rb") as f:
+                entry["content"] = f.read()
+        except (OSError, json.JSONDecodeError):
+            return None
+        self._remember(key, entry)
+        return entry
+
+    def _store(self, key: str, entry: Dict):
+        self._remember(key, entry)
+        if not self.cache_dir:
+            return
+        meta_path, body_path = self._paths(key)
+        try:
+            os.makedirs(os.path.dirname(meta_path), exist_ok=True)
+            suffix = f".{threading.get_ident()}.tmp"
+            # Body first: a meta file always has its body next to it
+            with open(body_path + suffix, "wb") as f:
+                f.write(entry["content"])
+            os.replace(body_path + suffix, body_path)
+            with open(meta_path + suffix, "w", encoding="utf-8") as f:
+                json.dump({k: v for k, v in entry.items() if k != "content"}, f)
+            os.replace(meta_path + suffix, meta_path)
+        except OSError as e:
+            logger.debug(f"HTTP cache: Could not write entry: {e}")
+
+    def prune(self, max_age: Optional[int] = None):
+        """Deletes disk entries not refreshed within max_age seconds."""
+        max_age = max_age or self.MAX_DISK_AGE
+        cutoff = time.time() - max_age
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    if os.path.getmtime(path) < cutoff:
+                        os.remove(path)
+                except OSError:
+                    pass
+
+    # --- Freshness ---
+
+    def _entry_from_response(self, url: str, resp: requests.Response, ttl: float, swr: float) -> Optional[Dict]:
+        cc = _parse_cache_control(resp.headers.get("Cache-Control"))
+        if "no-store" in cc:
+            return None
+        now = time.time()
+        max_age = _to_int(cc.get("s-maxage")) or _to_int(cc.get("max-age"))
+        if "no-cache" in cc:
+            max_age = 0
+        elif max_age is None and resp.headers.get("Expires"):
+            try:
+                max_age = parsedate_to_datetime(resp.headers["Expires"]).timestamp() - now
+            except (TypeError, ValueError):
+                max_age = None
+        if max_age is None or (max_age < ttl and "no-cache" not in cc):
+            max_age = ttl  # Our floor for APIs that don't send caching headers
+        server_swr = _to_int(cc.get("stale-while-revalidate"))
+        return {
+            "url": url,
+            "status": resp.status_code,
+            "headers": {k: v for k, v in resp.headers.items() if k.lower() in self.KEPT_HEADERS},
+            "stored_at": now,
+            "expires_at": now + max(max_age, 0),
+            "swr": max(server_swr or 0, swr),
+            "content": resp.content,
+        }
+
+    def _conditional_headers(self, entry: Optional[Dict]) -> Dict[str, str]:
+        if not entry:
+            return {}
+        headers = {}
+        stored = CaseInsensitiveDict(entry.get("headers", {}))
+        if stored.get("ETag"):
+            headers["If-None-Match"] = stored["ETag"]
+        if stored.get("Last-Modified"):
+            headers["If-Modified-Since"] = stored["Last-Modified"]
+        return headers
+
+    def _fetch(self, key, url, params, timeout, ttl, swr, cached: Optional[Dict]) -> CachedResponse:
+        resp = self.session.get(
+            url, params=params, headers=self._conditional_headers(cached), timeout=timeout
+        )
+        if resp.status_code == 304 and cached:
+            refreshed = self._entry_from_response(url, resp, ttl, swr) or {}
+            entry = dict(cached)
+            entry["stored_at"] = time.time()
+            entry["expires_at"] = refreshed.get("expires_at", entry["stored_at"] + ttl)
+            self._store(key, entry)
+            return self._respond(entry, from_cache=True)
+
+        if resp.status_code == 200:
+            entry = self._entry_from_response(url, resp, ttl, swr)
+            if entry:
+                self._store(key, entry)
+        return CachedResponse(url, resp.status_code, dict(resp.headers), resp.content, False)
+
+    @staticmethod
+    def _respond(entry: Dict, from_cache: bool) -> CachedResponse:
+        return CachedResponse(entry["url"], entry["status"], entry["headers"], entry["content"], from_cache)
+
+    def _revalidate_async(self, key, url, params, timeout, ttl, swr, cached):
+        with self._lock:
+            if key in self._revalidating:
+                return
+            self._revalidating.add(key)
+
+        def run():
+            try:
+                self._fetch(key, url, params, timeout, ttl, swr, cached)
+            except requests.RequestException as e:
+                logger.debug(f"HTTP cache: Background revalidation of {url} failed: {e}")
+            finally:
+                with self._lock:
+                    self._revalidating.discard(key)
+
+        threading.Thread(target=run, daemon=True).start()
+
+    # --- Public API ---
+
+    def get(
+        self,
+        url: str,
+        params: Optional[Dict] = None,
+        timeout: float = 10,
+        ttl: float = 0,
+        stale_while_revalidate: float = 0,
+    ) -> CachedResponse:
+        """
+        Cached GET. `ttl` is the minimum freshness when the server sends no
+        (or a shorter) max-age; `stale_while_revalidate` is how long past
+        expiry a stale entry may be served while it is refreshed.
+        """
+        key = self._key(url, params)
+        cached = self._lookup(key)
+        now = time.time()
+
+        if cached:
+            if now < cached["expires_at"]:
+                return self._respond(cached, from_cache=True)
+            swr = max(cached.get("swr", 0), stale_while_revalidate)
+            if now < cached["expires_at"] + swr:
+                self._revalidate_async(key, url, params, timeout, ttl, stale_while_revalidate, cached)
+                return self._respond(cached, from_cache=True)
+
+        try:
+            return self._fetch(key, url, params, timeout, ttl, stale_while_revalidate, cached)
+        except requests.RequestException as e:
+            if cached:
+                # Offline: an old answer is better than none
+                logger.warning(f"HTTP cache: {url} unreachable, serving stale entry ({e})")
+                return self._respond(cached, from_cache=True)
+            raise
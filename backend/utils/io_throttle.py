@@ -0,0 +1,147 @@
+import re
+import sys
+import time
+import logging
+import threading
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# "Can't keep up! Is the server overloaded? Running 2034ms or 40 ticks behind"
+LAG_PATTERN = re.compile(r"Can't keep up!.*?Running (\d+)ms or (\d+) ticks behind")
+
+# Never throttle below this, or a backup could stall forever
+MIN_RATE = 1024 * 1024
+
+
+def parse_lag(line: str) -> Optional[int]:
+    """Milliseconds behind reported by a "Can't keep up!" line, else None."""
+    m = LAG_PATTERN.search(line)
+    return int(m.group(1)) if m else None
+
+
+def lower_io_priority():
+    """
+    Puts the calling thread in the idle I/O class (Linux, CFQ/BFQ schedulers)
+    so the game server's disk access always goes first. Returns the previous
+    priority, to hand back to restore_io_priority (None if unchanged).
+    """
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        import psutil
+
+        # On Linux ioprio is per thread; the native id addresses this one
+        proc = psutil.Process(threading.get_native_id())
+        previous = proc.ionice()
+        proc.ionice(psutil.IOPRIO_CLASS_IDLE)
+        return previous
+    except Exception as e:
+        logger.debug(f"Could not lower I/O priority: {e}")
+        return None
+
+
+def restore_io_priority(previous):
+    """Undoes lower_io_priority on the same thread."""
+    if previous is None:
+        return
+    try:
+        import psutil
+
+        ioclass, value = previous
+        proc = psutil.Process(threading.get_native_id())
+        if ioclass in (psutil.IOPRIO_CLASS_RT, psutil.IOPRIO_CLASS_BE):
+            proc.ionice(ioclass, value)
+        else:
+            proc.ionice(ioclass)
+    except Exception as e:
+        logger.debug(f"Could not restore I/O priority: {e}")
+
+
+class IoThrottle:
+    """
+    Limitador de E/S (token bucket) para las copias de seguridad.
+
+    consume(n) blocks until n bytes fit in the configured rate (0 means
+    unlimited). When the server reports lag above max_lag_ms ("Can't keep
+    up!"), the rate is halved and I/O pauses for a moment; it then recovers
+    gradually towards the configured rate while the server keeps up.
+    """
+
+    PAUSE_ON_LAG = 5.0
+    RECOVERY_PER_SECOND = 0.05  # Fraction of the configured rate regained per quiet second
+
+    def __init__(self, rate: int = 0, max_lag_ms: int = 0):
+        self.configured_rate = max(0, int(rate))
+        self.rate = float(self.configured_rate)
+        self.max_lag_ms = max(0, int(max_lag_ms))
+        self._tokens = self.rate
+        self._last = time.monotonic()
+        self._paused_until = 0.0
+        self._last_lag = 0.0
+        self._lock = threading.Lock()
+        self.lag_events = 0
+        self.worst_lag_ms = 0
+        self.waited = 0.0
+
+    def _refill(self, now: float):
+        elapsed = now - self._last
+        self._last = now
+        if self.configured_rate and self.rate < self.configured_rate and now - self._last_lag > self.PAUSE_ON_LAG:
+            self.rate = min(self.configured_rate, self.rate + self.configured_rate * self.RECOVERY_PER_SECOND * elapsed)
+        # Burst of at most one second worth of I/O
+        self._tokens = min(self.rate, self._tokens + elapsed * self.rate)
+
+    def consume(self, n: int):
+        if n <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                pause = self._paused_until - now
+                if pause <= 0:
+                    if not self.rate:
+                        return
+                    self._refill(now)
+                    # Debt is allowed: a large read waits for its own size
+                    self._tokens -= n
+                    wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+                    self.waited += wait
+                    break
+            time.sleep(min(pause, 1.0))
+        if wait:
+            time.sleep(wait)
+
+    def report_lag(self, lag_ms: int):
+        """Feeds a "Can't keep up!" measurement. Over the bound, backs off."""
+        self.worst_lag_ms = max(self.worst_lag_ms, lag_ms)
+        if not self.max_lag_ms or lag_ms <= self.max_lag_ms:
+            return
+        with self._lock:
+            self.lag_events += 1
+            now = time.monotonic()
+            self._last_lag = now
+            self._paused_until = now + self.PAUSE_ON_LAG
+            if not self.configured_rate:
+                # Unlimited until now: start limiting from a conservative rate
+                self.configured_rate = 50 * MIN_RATE
+                self.rate = float(self.configured_rate)
+            self.rate = max(MIN_RATE, self.rate / 2)
+            self._tokens = 0.0
+            self._last = now
+        logger.info(f"Backup I/O: server {lag_ms}ms behind, throttling to {self.rate / 1048576:.1f} MB/s")
+
+    def on_log_line(self, line: str):
+        """Log listener for ServerHandler.add_log_listener."""
+        lag = parse_lag(line)
+        if lag is not None:
+            self.report_lag(lag)
+
+    def get_report(self):
+        return {
+            "rate": int(self.rate),
+            "configured_rate": self.configured_rate,
+            "lag_events": self.lag_events,
+            "worst_lag_ms": self.worst_lag_ms,
+            "throttled_seconds": round(self.waited, 2),
+        }
@@ -0,0 +1,117 @@
+import os
+import logging
+import threading
+from typing import Dict, Optional
+
+from utils.nbt import NbtError, read_nbt_file
+
+logger = logging.getLogger(__name__)
+
+DIFFICULTIES = ("peaceful", "easy", "normal", "hard")
+GAME_MODES = ("survival", "creative", "adventure", "spectator")
+
+# Everything else in level.dat (the singleplayer Player, DragonFight,
+# custom boss bars, datapacks...) is skipped without being decoded
+LEVEL_SELECT = {
+    "Data": {
+        "LevelName": True,
+        "DataVersion": True,
+        "Version": True,
+        "RandomSeed": True,  # Before 1.16
+        "WorldGenSettings": {"seed": True},
+        "GameRules": True,
+        "Difficulty": True,
+        "DifficultyLocked": True,
+        "difficulty_settings": True,  # Newer versions: {difficulty, hardcore, locked}
+        "hardcore": True,
+        "GameType": True,
+        "SpawnX": True,
+        "SpawnY": True,
+        "SpawnZ": True,
+        "spawn": True,  # Newer versions: {dimension, pos: [x, y, z], yaw, pitch}
+        "LastPlayed": True,
+    }
+}
+
+
+def _name(values, value) -> Optional[str]:
+    if isinstance(value, str):
+        return value
+    if isinstance(value, int) and 0 <= value < len(values):
+        return values[value]
+    return None
+
+
+def summarize_level(level_dat: str) -> Dict:
+    """
+    Seed, version, game rules, difficulty, spawn and last played time of a
+    world, from its level.dat. Fields the file does not have are None; the
+    seed is a string, as JavaScript clients cannot hold a 64-bit integer.
+    Raises NbtError if the file cannot be decoded.
+    """
+    root = read_nbt_file(level_dat, LEVEL_SELECT)
+    data = (root or {}).get("Data")
+    if not isinstance(data, dict):
+        raise NbtError(f"{level_dat} has no Data compound")
+
+    version = data.get("Version") or {}
+    seed = (data.get("WorldGenSettings") or {}).get("seed", data.get("RandomSeed"))
+    settings = data.get("difficulty_settings") or {}
+    difficulty = settings.get("difficulty", data.get("Difficulty"))
+    hardcore = settings.get("hardcore", data.get("hardcore"))
+    spawn = None
+    if isinstance(data.get("spawn"), dict) and len(data["spawn"].get("pos") or ()) == 3:
+        x, y, z = data["spawn"]["pos"]
+        spawn = {"x": x, "y": y, "z": z, "dimension": data["spawn"].get("dimension")}
+    elif "SpawnX" in data:
+        spawn = {"x": data["SpawnX"], "y": data.get("SpawnY"), "z": data.get("SpawnZ"),
+                 "dimension": "minecraft:overworld"}
+    last_played = data.get("LastPlayed")
+
+    return {
+        "level_name": data.get("LevelName"),
+        "version": version.get("Name"),
+        "data_version": data.get("DataVersion", version.get("Id")),
+        "snapshot": bool(version.get("Snapshot")) if version else None,
+        "seed": str(seed) if seed is not None else None,
+        "difficulty": _name(DIFFICULTIES, difficulty),
+        "difficulty_locked": bool(settings.get("locked", data.get("DifficultyLocked", 0))),
+        "hardcore": bool(hardcore) if hardcore is not None else None,
+        "game_mode": _name(GAME_MODES, data.get("GameType")),
+        "game_rules": {k: str(v) for k, v in (data.get("GameRules") or {}).items()},
+        "spawn": spawn,
+        "last_played": last_played / 1000 if last_played else None,  # Milliseconds in the file
+    }
+
+
+class LevelInfoCache:
+    """
+    Resúmenes de level.dat, en caché mientras el archivo no cambie.
+
+    Keyed by the level.dat path and invalidated by its (mtime, size), so
+    /worlds decodes each level.dat once per save instead of per request.
+    """
+
+    def __init__(self):
+        self._cache: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+
+    def get(self, level_dat: str) -> Optional[Dict]:
+        """Summary of a level.dat, or None if it cannot be read."""
+        try:
+            st = os.stat(level_dat)
+        except OSError:
+            return None
+        stamp = (st.st_mtime, st.st_size)
+        with self._lock:
+            cached = self._cache.get(level_dat)
+            if cached and cached[0] == stamp:
+                return cached[1]
+        try:
+            summary = summarize_level(level_dat)
+        except (NbtError, OSError) as e:
+            logger.warning(f"Could not read {level_dat}: {e}")
+            summary = None
+        with self._lock:
+            self._cache[level_dat] = (stamp, summary)
+        return summary
@@ -0,0 +1,187 @@
+import os
+import json
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from utils.mod_metadata import read_mod_metadata, provided_ids, BUILTIN_IDS
+
+logger = logging.getLogger(__name__)
+
+
+def sha1_file(path: str) -> str:
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class ModIndex:
+    """
+    Índice de metadatos de los mods de un servidor (<server>/.mlsg/mod_index.json).
+
+    Every jar is identified by (size, mtime, sha1). A listing of mods/ is
+    cheap; jars whose size and mtime are unchanged are not opened again,
+    and a touched jar with the same sha1 keeps its parsed metadata. Changed
+    jars are hashed and parsed in parallel.
+    """
+
+    def __init__(self, server_path: str, max_workers: int = 8):
+        self.server_path = server_path
+        self.mods_dir = os.path.join(server_path, "mods")
+        self.index_file = os.path.join(server_path, ".mlsg", "mod_index.json")
+        self.max_workers = max_workers
+        self._lock = threading.Lock()
+        self.entries: Dict[str, Dict] = self._load_index()  # filename -> entry
+
+    def _load_index(self) -> Dict:
+        try:
+            if os.path.exists(self.index_file):
+                with open(self.index_file, "r", encoding="utf-8") as f:
+                    return json.load(f)
+        except (json.JSONDecodeError, IOError) as e:
+            logger.warning(f"Error loading mod index: {e}")
+        return {}
+
+    def _save_index(self):
+        try:
+            os.makedirs(os.path.dirname(self.index_file), exist_ok=True)
+            with open(self.index_file, "w", encoding="utf-8") as f:
+                json.dump(self.entries, f)
+        except IOError as e:
+            logger.error(f"Error saving mod index: {e}")
+
+    # --- Scanning ---
+
+    def _index_jar(self, path: str, size: int, mtime: int, by_sha1: Dict[str, Dict]) -> Dict:
+        sha1 = sha1_file(path)
+        known = by_sha1.get(sha1)
+        meta = known["meta"] if known else read_mod_metadata(path)
+        return {"size": size, "mtime": mtime, "sha1": sha1, "meta": meta}
+
+    def refresh(self) -> Dict[str, Dict]:
+        """Brings the index up to date with mods/ and returns it."""
+        with self._lock:
+            if not os.path.isdir(self.mods_dir):
+                self.entries = {}
+                return {}
+
+            current = {}
+            changed = []
+            for entry in os.scandir(self.mods_dir):
+                if not entry.is_file() or not entry.name.lower().endswith(".jar"):
+                    continue
+                st = entry.stat()
+                cached = self.entries.get(entry.name)
+                if cached and cached["size"] == st.st_size and cached["mtime"] == int(st.st_mtime):
+                    current[entry.name] = cached
+                else:
+                    changed.append((entry.name, entry.path, st.st_size, int(st.st_mtime)))
+
+            if not changed and current.keys() == self.entries.keys():
+                return self.entries
+
+            by_sha1 = {e["sha1"]: e for e in self.entries.values()}
+            if changed:
+                with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                    futures = {
+                        name: pool.submit(self._index_jar, path, size, mtime, by_sha1)
+                        for name, path, size, mtime in changed
+                    }
+                    for name, future in futures.items():
+                        try:
+                            current[name] = future.result()
+                        except OSError as e:
+                            logger.warning(f"Could not index {name}: {e}")
+                logger.info(f"Mod index: {len(changed)} jar(s) (re)indexed, {len(current)} total")
+
+            self.entries = current
+            self._save_index()
+            return self.entries
+
+    # --- Queries ---
+
+    def get_mods(self) -> List[Dict]:
+        mods = []
+        for filename, entry in sorted(self.refresh().items()):
+            meta = entry.get("meta") or {}
+            mods.append(
+                {
+                    "filename": filename,
+                    "size": entry["size"],
+                    "sha1": entry["sha1"],
+                    "mod_id": meta.get("mod_id"),
+                    "name": meta.get("name"),
+                    "version": meta.get("version"),
+                    "loader": meta.get("loader"),
+                    "client_only": bool(meta.get("client_only")),
+                    "nested": [n.get("mod_id") for n in meta.get("nested") or []],
+                }
+            )
+        return mods
+
+    def get_dependency_graph(self) -> Dict:
+        """
+        Nodes are the jars in mods/, edges their declared dependencies.
+        A required dependency that no jar (nor a nested jar, nor a 'provides')
+        supplies is reported in `missing`.
+        """
+        entries = self.refresh()
+        providers: Dict[str, List[str]] = {}
+        for filename, entry in entries.items():
+            for mod_id in provided_ids(entry.get("meta") or {}):
+                providers.setdefault(mod_id, []).append(filename)
+
+        nodes, edges, missing = [], [], []
+        for filename, entry in sorted(entries.items()):
+            meta = entry.get("meta")
+            if not meta:
+                continue  # Library jar without a mod descriptor
+            nodes.append(
+                {
+                    "filename": filename,
+                    "mod_id": meta.get("mod_id"),
+                    "version": meta.get("version"),
+                    "loader": meta.get("loader"),
+                }
+            )
+            for dep in meta.get("depends") or []:
+                dep_id = dep["mod_id"]
+                if dep_id in BUILTIN_IDS:
+                    continue
+                supplied_by = providers.get(dep_id, [])
+                edges.append(
+                    {
+                        "from": meta.get("mod_id"),
+                        "to": dep_id,
+                        "version": dep.get("version"),
+                        "required": dep.get("required", True),
+                        "satisfied": bool(supplied_by),
+                        "provided_by": supplied_by,
+                    }
+                )
+                if dep.get("required", True) and not supplied_by:
+                    missing.append(
+                        {"mod_id": dep_id, "version": dep.get("version"), "required_by": meta.get("mod_id"), "filename": filename}
+                    )
+
+        # The same mod installed twice (nested copies are deduplicated by the loader)
+        own_ids: Dict[str, List[str]] = {}
+        for node in nodes:
+            if node["mod_id"]:
+                own_ids.setdefault(node["mod_id"], []).append(node["filename"])
+        duplicates = {mod_id: files for mod_id, files in own_ids.items() if len(files) > 1}
+        return {"nodes": nodes, "edges": edges, "missing": missing, "duplicates": duplicates}
+
+    def get_metadata(self) -> Dict[str, Optional[Dict]]:
+        """filename -> parsed metadata (None for library jars)."""
+        return {name: entry.get("meta") for name, entry in self.refresh().items()}
+
+    def find_by_sha1(self, sha1: str) -> Optional[str]:
+        for filename, entry in self.refresh().items():
+            if entry["sha1"] == sha1:
+                return filename
+        return None
@@ -0,0 +1,279 @@
+import io
+import os
+import re
+import json
+import shutil
+import logging
+import zipfile
+from typing import Dict, List, Optional
+
+try:
+    import tomllib
+except ImportError:  # Python < 3.11: regex fallback below
+    tomllib = None
+
+logger = logging.getLogger(__name__)
+
+QUARANTINE_DIR = "mods_client_only"
+
+FABRIC_FILE = "fabric.mod.json"
+QUILT_FILE = "quilt.mod.json"
+FORGE_FILES = ("META-INF/neoforge.mods.toml", "META-INF/mods.toml")
+JARJAR_FILE = "META-INF/jarjar/metadata.json"
+
+# Provided by the loader/game itself, never a missing dependency
+BUILTIN_IDS = {"minecraft", "java", "fabricloader", "quilt_loader", "forge", "neoforge", "javafml", "lowcodefml"}
+
+
+def _load_json(raw: bytes) -> Dict:
+    # Some mods ship fabric.mod.json with a BOM or control characters in strings
+    return json.loads(raw.decode("utf-8-sig"), strict=False)
+
+
+def _load_toml(raw: bytes) -> Optional[Dict]:
+    if tomllib is None:
+        return None
+    try:
+        return tomllib.loads(raw.decode("utf-8-sig"))
+    except (tomllib.TOMLDecodeError, UnicodeDecodeError):
+        return None
+
+
+def _fabric_depends(data: Dict) -> List[Dict]:
+    deps = []
+    for key, required in (("depends", True), ("recommends", False)):
+        entries = data.get(key)
+        if not isinstance(entries, dict):
+            continue
+        for mod_id, version in entries.items():
+            if isinstance(version, list):
+                version = " || ".join(str(v) for v in version)  # A list means any of the ranges
+            elif not isinstance(version, str):
+                version = "*"  # Not a valid range: treat as any version
+            deps.append({"mod_id": mod_id, "version": version, "required": required})
+    return deps
+
+
+def _parse_fabric(data: Dict) -> Dict:
+    env = data.get("environment", "*")
+    return {
+        "loader": "fabric",
+        "mod_id": data.get("id"),
+        "name": data.get("name") or data.get("id"),
+        "version": str(data.get("version", "")),
+        "environment": env,
+        "client_only": env == "client",
+        "client_only_reason": "fabric.mod.json environment=client" if env == "client" else None,
+        "depends": _fabric_depends(data),
+        "provides": list(data.get("provides") or []),
+        "nested_paths": [j.get("file") for j in data.get("jars") or [] if j.get("file")],
+    }
+
+
+def _parse_quilt(data: Dict) -> Dict:
+    loader = data.get("quilt_loader", {})
+    meta = loader.get("metadata", {})
+    env = data.get("minecraft", {}).get("environment", "*")
+    depends = []
+    for dep in loader.get("depends") or []:
+        if isinstance(dep, str):
+            depends.append({"mod_id": dep, "version": "*", "required": True})
+        elif isinstance(dep, dict) and dep.get("id"):
+            versions = dep.get("versions", "*")
+            depends.append({
+                "mod_id": dep["id"],
+                "version": versions if isinstance(versions, str) else str(versions),
+                "required": not dep.get("optional", False),
+            })
+    return {
+        "loader": "quilt",
+        "mod_id": loader.get("id"),
+        "name": meta.get("name") or loader.get("id"),
+        "version": str(loader.get("version", "")),
+        "environment": env,
+        "client_only": env == "client",
+        "client_only_reason": "quilt.mod.json environment=client" if env == "client" else None,
+        "depends": depends,
+        "provides": [p if isinstance(p, str) else p.get("id") for p in loader.get("provides") or []],
+        "nested_paths": [j if isinstance(j, str) else j.get("file") for j in loader.get("jars") or []],
+    }
+
+
+def _parse_forge(raw: bytes, filename: str) -> Dict:
+    loader = "neoforge" if "neoforge" in filename else "forge"
+    data = _load_toml(raw)
+    result = {
+        "loader": loader, "mod_id": None, "name": None, "version": None, "environment": "*",
+        "depends": [], "provides": [], "nested_paths": [],
+    }
+
+    if data is None:
+        # Unparseable (or no tomllib): only the explicit flag is trusted
+        text = raw.decode("utf-8", errors="replace")
+        m = re.search(r'modId\s*=\s*"([^"]+)"', text)
+        result["mod_id"] = m.group(1) if m else None
+        result["name"] = result["mod_id"]
+        if re.search(r"^\s*clientSideOnly\s*=\s*true", text, re.MULTILINE):
+            result.update(environment="client", client_only=True, client_only_reason="mods.toml clientSideOnly=true")
+        else:
+            result.update(client_only=False, client_only_reason=None)
+        return result
+
+    mods = data.get("mods") or [{}]
+    first = mods[0]
+    result["mod_id"] = first.get("modId")
+    result["name"] = first.get("displayName") or first.get("modId")
+    result["version"] = str(first.get("version", ""))
+    # Extra [[mods]] entries in the same jar are provided by it
+    result["provides"] = [m.get("modId") for m in mods[1:] if m.get("modId")]
+
+    dependencies = data.get("dependencies")
+    deps = dependencies.get(result["mod_id"] or "", []) if isinstance(dependencies, dict) else []
+    deps = [d for d in deps if isinstance(d, dict)] if isinstance(deps, list) else []
+    for dep in deps:
+        if not dep.get("modId"):
+            continue
+        # Forge: mandatory=true; NeoForge: type="required"
+        required = dep.get("mandatory") is True or str(dep.get("type", "")).lower() == "required"
+        result["depends"].append(
+            {"mod_id": dep["modId"], "version": dep.get("versionRange", "*"), "required": required}
+        )
+
+    client_only = False
+    reason = None
+    hint = None
+    if data.get("clientSideOnly") is True:
+        client_only, reason = True, "mods.toml clientSideOnly=true"
+    else:
+        mc_dep = next((d for d in deps if d.get("modId") == "minecraft"), None)
+        if mc_dep and str(mc_dep.get("side", "")).upper() == "CLIENT":
+            client_only, reason = True, "mods.toml minecraft dependency side=CLIENT"
+        elif str(first.get("displayTest", "")).upper() == "IGNORE_ALL_VERSION":
+            # Common in client-only mods but not conclusive: only warn about it
+            hint = "mods.toml displayTest=IGNORE_ALL_VERSION"
+
+    result.update(
+        environment="client" if client_only else "*",
+        client_only=client_only,
+        client_only_reason=reason,
+        client_only_hint=hint,
+    )
+    return result
+
+
+def _read_descriptor(zf: zipfile.ZipFile) -> Optional[Dict]:
+    names = set(zf.namelist())
+    if FABRIC_FILE in names:
+        meta = _parse_fabric(_load_json(zf.read(FABRIC_FILE)))
+    elif QUILT_FILE in names:
+        meta = _parse_quilt(_load_json(zf.read(QUILT_FILE)))
+    else:
+        meta = None
+        for name in FORGE_FILES:
+            if name in names:
+                meta = _parse_forge(zf.read(name), name)
+                break
+    if meta is None:
+        return None
+    if JARJAR_FILE in names:
+        # Forge/NeoForge Jar-in-Jar
+        try:
+            jarjar = _load_json(zf.read(JARJAR_FILE))
+            meta["nested_paths"].extend(j.get("path") for j in jarjar.get("jars", []) if j.get("path"))
+        except ValueError:
+            pass
+    meta["nested_paths"] = [p for p in meta["nested_paths"] if p in names]
+    return meta
+
+
+def _read_nested(zf: zipfile.ZipFile, paths: List[str], depth: int) -> List[Dict]:
+    """Metadata of the jars bundled inside a jar (Fabric/Quilt 'jars', Forge jarjar)."""
+    nested = []
+    for path in paths:
+        try:
+            with zipfile.ZipFile(io.BytesIO(zf.read(path)), "r") as inner:
+                meta = _read_descriptor(inner)
+                if not meta:
+                    continue
+                if depth > 0:
+                    meta["nested"] = _read_nested(inner, meta["nested_paths"], depth - 1)
+                meta.pop("nested_paths", None)
+                meta["path"] = path
+                nested.append(meta)
+        except (zipfile.BadZipFile, KeyError, ValueError, TypeError, AttributeError, IndexError) as e:
+            logger.debug(f"Could not read nested jar {path}: {e}")
+    return nested
+
+
+def read_mod_metadata(jar_path: str, nested_depth: int = 2) -> Optional[Dict]:
+    """
+    Lee los metadatos de un mod (Fabric, Quilt, Forge o NeoForge) desde su jar:
+    id, version, environment, dependencies and the mods bundled inside it.
+    Returns None if the jar has no known descriptor (plain library jars).
+    """
+    try:
+        with zipfile.ZipFile(jar_path, "r") as zf:
+            meta = _read_descriptor(zf)
+            if meta is None:
+                return None
+            meta["nested"] = _read_nested(zf, meta.pop("nested_paths"), nested_depth - 1) if nested_depth else []
+            return meta
+    except (zipfile.BadZipFile, OSError, ValueError) as e:
+        logger.warning(f"Could not read mod metadata from {os.path.basename(jar_path)}: {e}")
+    except (TypeError, AttributeError, KeyError, IndexError) as e:
+        # A descriptor with unexpected types: the jar is indexed without metadata
+        logger.warning(f"Malformed mod metadata in {os.path.basename(jar_path)}: {e!r}")
+    return None
+
+
+def provided_ids(meta: Dict) -> List[str]:
+    """Every mod ID a jar makes available: its own, 'provides' and nested mods."""
+    ids = [meta.get("mod_id")] + list(meta.get("provides") or [])
+    for inner in meta.get("nested") or []:
+        ids.extend(provided_ids(inner))
+    return [i for i in ids if i]
+
+
+def scan_client_only(server_path: str, metadata: Optional[Dict[str, Optional[Dict]]] = None) -> List[Dict]:
+    """
+    Lists the jars in mods/ that only work on the client.
+    `metadata` (filename -> parsed metadata, e.g. from ModIndex) avoids reopening the jars.
+    `certain` is False for heuristic matches, which are never quarantined.
+    """
+    if metadata is None:
+        mods_dir = os.path.join(server_path, "mods")
+        if not os.path.isdir(mods_dir):
+            return []
+        metadata = {
+            entry.name: read_mod_metadata(entry.path)
+            for entry in os.scandir(mods_dir)
+            if entry.is_file() and entry.name.lower().endswith(".jar")
+        }
+    found = []
+    for filename, meta in sorted(metadata.items()):
+        if not meta:
+            continue
+        if meta.get("client_only"):
+            found.append({"filename": filename, "mod_id": meta.get("mod_id"), "reason": meta["client_only_reason"], "certain": True})
+        elif meta.get("client_only_hint"):
+            found.append({"filename": filename, "mod_id": meta.get("mod_id"), "reason": meta["client_only_hint"], "certain": False})
+    return found
+
+
+def quarantine_client_only(server_path: str, entries: Optional[List[Dict]] = None) -> List[str]:
+    """Moves the certain client-only jars to mods_client_only/. Returns the moved filenames."""
+    if entries is None:
+        entries = scan_client_only(server_path)
+    target_dir = os.path.join(server_path, QUARANTINE_DIR)
+    moved = []
+    for item in entries:
+        if not item.get("certain"):
+            continue
+        src = os.path.join(server_path, "mods", item["filename"])
+        try:
+            os.makedirs(target_dir, exist_ok=True)
+            shutil.move(src, os.path.join(target_dir, item["filename"]))
+            moved.append(item["filename"])
+        except OSError as e:
+            logger.error(f"Could not quarantine {item['filename']}: {e}")
+    return moved
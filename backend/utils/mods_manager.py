@@ -1,15 +1,54 @@
-import requests
 import os
 import logging
 import json
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlparse
 from typing import List, Dict, Optional
 
+from utils.http_cache import HttpCache
+from utils.mod_index import ModIndex
+from utils.mod_metadata import provided_ids
+from utils.blob_store import BlobStore, replace_file
+
 
 class ModsManager:
     BASE_URL = "https://api.modrinth.com/v2"
 
-    def __init__(self):
+    # Cache lifetimes (seconds) when Modrinth sends no longer max-age
+    SEARCH_TTL = 300
+    VERSIONS_TTL = 600
+    STALE_WINDOW = 24 * 3600
+
+    # Modpack downloads
+    PACK_WORKERS = 8
+    PER_HOST_LIMIT = 6
+    PACK_RETRIES = 2  # Passes over the alternative URLs of a file
+
+    def __init__(
+        self,
+        cache_dir: Optional[str] = None,
+        base_url: Optional[str] = None,
+        blob_store: Optional[BlobStore] = None,
+    ):
+        if base_url:
+            # Mirrors or a local stand-in of the Modrinth API
+            self.BASE_URL = base_url.rstrip("/")
         self.headers = {"User-Agent": "MinecraftLocalServerGUI/1.0 (internal-dev)"}
+        # Shared pooled session + response cache (disk cache only if cache_dir is given)
+        self.http = HttpCache(cache_dir, headers=self.headers)
+        # Shared SHA-256 store: identical jars across servers are linked, not re-downloaded
+        self.blob_store = blob_store
+        self._indexes: Dict[str, ModIndex] = {}
+        self._indexes_lock = threading.Lock()
+
+    def get_mod_index(self, server_path: str) -> ModIndex:
+        key = os.path.normcase(os.path.realpath(server_path))
+        with self._indexes_lock:
+            if key not in self._indexes:
+                self._indexes[key] = ModIndex(server_path)
+            return self._indexes[key]
 
     def search_mods(
         self,
@@ -45,11 +84,12 @@ class ModsManager:
                 params["index"] = "downloads"
 
             logging.info(f"Searching mods: query='{query}' params={params}")
-            response = requests.get(
+            response = self.http.get(
                 f"{self.BASE_URL}/search",
                 params=params,
-                headers=self.headers,
                 timeout=10,
+                ttl=self.SEARCH_TTL,
+                stale_while_revalidate=self.STALE_WINDOW,
             )
 
             if response.status_code != 200:
@@ -60,7 +100,10 @@ class ModsManager:
 
             data = response.json()
             hits = data.get("hits", [])
-            logging.info(f"Found {len(hits)} mods for query '{query}'")
+            logging.info(
+                f"Found {len(hits)} mods for query '{query}'"
+                + (" (cached)" if response.from_cache else "")
+            )
             return hits
         except Exception as e:
             logging.exception(f"Exception searching mods: {e}")
@@ -81,11 +124,12 @@ class ModsManager:
             # Remove None values
             params = {k: v for k, v in params.items() if v}
 
-            response = requests.get(
+            response = self.http.get(
                 f"{self.BASE_URL}/project/{slug}/version",
                 params=params,
-                headers=self.headers,
                 timeout=10,
+                ttl=self.VERSIONS_TTL,
+                stale_while_revalidate=self.STALE_WINDOW,
             )
             response.raise_for_status()
             return response.json()
@@ -94,17 +138,24 @@ class ModsManager:
             return []
 
     def install_mod(
-        self, version_id: str, server_path: str, progress_callback=None
+        self,
+        version_id: str,
+        server_path: str,
+        progress_callback=None,
+        loader: Optional[str] = None,
+        game_version: Optional[str] = None,
+        resolve_dependencies: bool = True,
     ) -> Dict:
         """
-        Download and install a specific mod version or modpack.
+        Download and install a specific mod version or modpack, together with
+        its required dependencies (resolved transitively for the loader and
+        game version) that are not installed yet.
         """
         try:
             # Get version info to find the file URL
-            response = requests.get(
-                f"{self.BASE_URL}/version/{version_id}",
-                headers=self.headers,
-                timeout=10,
+            # A published version never changes, so it can stay cached for long
+            response = self.http.get(
+                f"{self.BASE_URL}/version/{version_id}", timeout=10, ttl=7 * 24 * 3600
             )
             response.raise_for_status()
             version_data = response.json()
@@ -122,173 +173,480 @@ class ModsManager:
             if filename.endswith(".mrpack"):
                 if progress_callback:
                     progress_callback(0, "Downloading modpack...")
-                return self.install_modpack(
-                    url, filename, server_path, progress_callback
-                )
+                return self.install_modpack(url, server_path, progress_callback)
 
-            mods_dir = os.path.join(server_path, "mods")
-            if not os.path.exists(mods_dir):
-                os.makedirs(mods_dir)
+            plan = [version_data]
+            if resolve_dependencies:
+                if progress_callback:
+                    progress_callback(5, "Resolving dependencies...")
+                plan += self._resolve_dependencies(version_data, server_path, loader, game_version)
 
-            file_path = os.path.join(mods_dir, filename)
+            pack_files = []
+            for version in plan:
+                version_files = version.get("files") or []
+                if not version_files:
+                    continue
+                primary = next((f for f in version_files if f.get("primary")), version_files[0])
+                pack_files.append(
+                    {"path": f"mods/{primary['filename']}", "hashes": primary.get("hashes", {}), "downloads": [primary["url"]]}
+                )
 
             # Download
             if progress_callback:
-                progress_callback(10, f"Downloading {filename}...")
-            logging.info(f"Downloading mod: {url} -> {file_path}")
-            with requests.get(url, stream=True, timeout=30) as r:
-                r.raise_for_status()
-                with open(file_path, "wb") as f:
-                    for chunk in r.iter_content(chunk_size=8192):
-                        f.write(chunk)
+                progress_callback(10, f"Downloading {len(pack_files)} file(s)...")
+            logging.info(f"Installing mod {filename} with {len(pack_files) - 1} dependencies")
+            stats = self._download_pack_files(pack_files, server_path, progress_callback)
+            if f"mods/{filename}" in stats["failed"]:
+                return {"success": False, "error": f"Failed to download {filename}"}
 
             if progress_callback:
                 progress_callback(100, "Installed!")
-            return {"success": True, "filename": filename, "path": file_path}
+            return {
+                "success": True,
+                "filename": filename,
+                "path": os.path.join(server_path, "mods", filename),
+                "dependencies": [f["path"].split("/", 1)[1] for f in pack_files[1:]],
+                "failed": stats["failed"],
+            }
 
         except Exception as e:
             logging.error(f"Error installing mod: {e}")
             return {"success": False, "error": str(e)}
 
-    def install_modpack(
-        self, url: str, filename: str, server_path: str, progress_callback=None
-    ) -> Dict:
-        import zipfile
-        import shutil
-
-        try:
-            # 1. Download .mrpack
-            temp_dir = os.path.join(server_path, "temp_modpack")
-            if os.path.exists(temp_dir):
-                shutil.rmtree(temp_dir)
-            os.makedirs(temp_dir)
-
-            mrpack_path = os.path.join(temp_dir, filename)
-
-            logging.info(f"Downloading modpack: {url}")
-            with requests.get(url, stream=True, timeout=30) as r:
+    def _installed_projects(self, server_path: str):
+        """Mod IDs from the jars' metadata and Modrinth project IDs from their hashes."""
+        index = self.get_mod_index(server_path)
+        mod_ids = set()
+        for meta in index.get_metadata().values():
+            if meta:
+                mod_ids.update(provided_ids(meta))
+        project_ids = set()
+        hashes = [m["sha1"] for m in index.get_mods()]
+        if hashes:
+            try:
+                r = self.http.session.post(
+                    f"{self.BASE_URL}/version_files", json={"hashes": hashes, "algorithm": "sha1"}, timeout=30
+                )
                 r.raise_for_status()
-                with open(mrpack_path, "wb") as f:
-                    for chunk in r.iter_content(chunk_size=8192):
-                        f.write(chunk)
+                project_ids = {v.get("project_id") for v in r.json().values()}
+            except Exception as e:
+                logging.warning(f"Could not identify installed mods on Modrinth: {e}")
+        return mod_ids, project_ids
 
-            # 2. Extract
-            if progress_callback:
-                progress_callback(20, "Extracting modpack...")
-            with zipfile.ZipFile(mrpack_path, "r") as zf:
-                zf.extractall(temp_dir)
-
-            # 3. Read index
-            index_path = os.path.join(temp_dir, "modrinth.index.json")
-            if not os.path.exists(index_path):
-                return {
-                    "success": False,
-                    "error": "Invalid modpack: modrinth.index.json missing",
-                }
-
-            with open(index_path, "r") as f:
-                index_data = json.load(f)
-
-            files_to_download = index_data.get("files", [])
-            total_files = len(files_to_download)
-            logging.info(f"Found {total_files} mods in modpack.")
+    def _resolve_dependencies(
+        self, root_version: Dict, server_path: str, loader: Optional[str], game_version: Optional[str]
+    ) -> List[Dict]:
+        """
+        Breadth-first walk over the required dependencies. Each level is
+        resolved with one batched /projects call plus concurrent version
+        lookups; projects already installed (by mod ID or by jar hash) are skipped.
+        """
+        installed_ids, installed_projects = self._installed_projects(server_path)
+        seen = {root_version.get("project_id")}
+        resolved: List[Dict] = []
+        level = [root_version]
+
+        def latest_version(dep: Dict) -> Optional[Dict]:
+            if dep.get("version_id"):
+                r = self.http.get(f"{self.BASE_URL}/version/{dep['version_id']}", timeout=10, ttl=7 * 24 * 3600)
+            else:
+                params = {}
+                if loader:
+                    params["loaders"] = json.dumps([loader])
+                if game_version:
+                    params["game_versions"] = json.dumps([game_version])
+                r = self.http.get(
+                    f"{self.BASE_URL}/project/{dep['project_id']}/version",
+                    params=params,
+                    timeout=10,
+                    ttl=self.VERSIONS_TTL,
+                    stale_while_revalidate=self.STALE_WINDOW,
+                )
+            r.raise_for_status()
+            data = r.json()
+            if isinstance(data, list):
+                return data[0] if data else None  # Newest first
+            return data
+
+        while level:
+            wanted = {}
+            for version in level:
+                for dep in version.get("dependencies") or []:
+                    project_id = dep.get("project_id")
+                    if dep.get("dependency_type") != "required" or not project_id or project_id in seen:
+                        continue
+                    seen.add(project_id)
+                    if project_id not in installed_projects:
+                        wanted[project_id] = dep
+            if not wanted:
+                break
+
+            # Slugs usually match the mod ID in the jar (e.g. "fabric-api", "cloth-config")
+            r = self.http.get(
+                f"{self.BASE_URL}/projects",
+                params={"ids": json.dumps(sorted(wanted))},
+                timeout=10,
+                ttl=self.VERSIONS_TTL,
+            )
+            r.raise_for_status()
+            for project in r.json():
+                if project.get("slug") in installed_ids or project.get("id") in installed_ids:
+                    wanted.pop(project.get("id"), None)
+
+            with ThreadPoolExecutor(max_workers=self.PACK_WORKERS) as pool:
+                futures = {pid: pool.submit(latest_version, dep) for pid, dep in wanted.items()}
+            level = []
+            for project_id, future in futures.items():
+                try:
+                    version = future.result()
+                except Exception as e:
+                    logging.error(f"Could not resolve dependency {project_id}: {e}")
+                    continue
+                if not version:
+                    logging.warning(
+                        f"No version of dependency {project_id} for {loader} {game_version or ''}"
+                    )
+                    continue
+                resolved.append(version)
+                level.append(version)
 
-            # 4. Download dependencies
-            mods_dir = os.path.join(server_path, "mods")  # Default base
-            # Note: files in modpack might go to other folders, but usually mods/
+        return resolved
 
-            # Ensure we start with a clean state?
-            # Ideally yes for modpacks, but maybe user wants to keep some.
-            # For now, let's just add/overwrite.
+    # Mayor que esto, el .mrpack se vuelca a un archivo temporal del sistema
+    MRPACK_SPOOL_LIMIT = 64 * 1024 * 1024
 
-            for i, file_info in enumerate(files_to_download):
-                rel_path = file_info.get("path")
-                download_urls = file_info.get("downloads", [])
+    def install_modpack(
+        self, url: str, server_path: str, progress_callback=None
+    ) -> Dict:
+        """
+        Installs a .mrpack without unpacking it to disk: the pack is kept in a
+        spooled buffer, the index is read from it and the override entries
+        are streamed from the zip straight to their final paths.
+        """
+        import zipfile
+        import tempfile
 
-                if not rel_path or not download_urls:
-                    continue
+        try:
+            # 1. Download .mrpack (in memory unless it is very large)
+            logging.info(f"Downloading modpack: {url}")
+            with tempfile.SpooledTemporaryFile(max_size=self.MRPACK_SPOOL_LIMIT) as pack:
+                with self.http.session.get(url, stream=True, timeout=30) as r:
+                    r.raise_for_status()
+                    for chunk in r.iter_content(chunk_size=256 * 1024):
+                        pack.write(chunk)
+                pack.seek(0)
 
-                # Report progress
-                pct = 20 + int((i / total_files) * 60)  # 20% to 80%
                 if progress_callback:
-                    name = rel_path.split("/")[-1]
-                    progress_callback(pct, f"Installing: {name}")
-
-                target_path = os.path.join(server_path, rel_path)
-                target_dir = os.path.dirname(target_path)
-                if not os.path.exists(target_dir):
-                    os.makedirs(target_dir)
-
-                # Download first valid url
-                dl_url = download_urls[0]
+                    progress_callback(20, "Reading modpack...")
+                with zipfile.ZipFile(pack, "r") as zf:
+                    # 2. Read index
+                    try:
+                        index_data = json.loads(zf.read("modrinth.index.json"))
+                    except KeyError:
+                        return {
+                            "success": False,
+                            "error": "Invalid modpack: modrinth.index.json missing",
+                        }
+
+                    files_to_download = index_data.get("files", [])
+                    # Client-only entries (shaders, minimaps...) only slow down or crash a server
+                    client_only = [
+                        f.get("path") for f in files_to_download
+                        if (f.get("env") or {}).get("server") == "unsupported"
+                    ]
+                    files_to_download = [f for f in files_to_download if f.get("path") not in client_only]
+                    total_files = len(files_to_download)
+                    logging.info(
+                        f"Found {total_files} mods in modpack ({len(client_only)} client-only skipped)."
+                    )
 
-                try:
-                    with requests.get(dl_url, stream=True, timeout=30) as r:
-                        r.raise_for_status()
-                        with open(target_path, "wb") as f:
-                            for chunk in r.iter_content(chunk_size=8192):
-                                f.write(chunk)
-                except Exception as dl_err:
-                    logging.error(f"Failed to download dependency {rel_path}: {dl_err}")
-                    # Continue best effort? Or fail? Modpacks usually need all.
-                    # Let's log and continue to try getting most.
-
-            # 5. Handle Overrides
-            if progress_callback:
-                progress_callback(80, "Applying configuration...")
-            overrides_dir = os.path.join(temp_dir, "overrides")
-            if os.path.exists(overrides_dir):
-                logging.info("Applying overrides...")
-                for root, dirs, files in os.walk(overrides_dir):
-                    rel_root = os.path.relpath(root, overrides_dir)
-                    target_root = os.path.join(server_path, rel_root)
-                    if not os.path.exists(target_root):
-                        os.makedirs(target_root)
-
-                    for f in files:
-                        src_file = os.path.join(root, f)
-                        dst_file = os.path.join(target_root, f)
-                        try:
-                            shutil.copy2(src_file, dst_file)
-                        except Exception as copy_err:
-                            logging.error(f"Failed to copy override {f}: {copy_err}")
-
-            # Cleanup
-            shutil.rmtree(temp_dir)
+                    # 3. Download dependencies (files may go to mods/, config/, etc.)
+                    stats = self._download_pack_files(
+                        files_to_download, server_path, progress_callback
+                    )
+                    if stats["failed"]:
+                        logging.error(f"Failed to download {len(stats['failed'])} modpack files: {stats['failed']}")
+
+                    # 4. Handle Overrides (server-overrides win over overrides)
+                    if progress_callback:
+                        progress_callback(80, "Applying configuration...")
+                    override_bytes = self._extract_overrides(
+                        zf, server_path, ("overrides/", "server-overrides/")
+                    )
 
             if progress_callback:
                 progress_callback(100, "Modpack installed successfully!")
             return {
                 "success": True,
                 "message": f"Installed modpack with {total_files} mods.",
+                "downloaded": stats["downloaded"],
+                "skipped": stats["skipped"],
+                "linked": stats["linked"],
+                "failed": stats["failed"],
+                "client_only_skipped": client_only,
+                "bytes_written": stats["bytes"] + override_bytes,
             }
 
         except Exception as e:
             logging.error(f"Modpack installation failed: {e}")
             return {"success": False, "error": str(e)}
 
+    @staticmethod
+    def _extract_overrides(zf, server_path: str, prefixes) -> int:
+        """Streams every entry under the given prefixes to server_path. Returns bytes written."""
+        import shutil
+
+        root = os.path.realpath(server_path)
+        written = 0
+        for prefix in prefixes:
+            entries = [i for i in zf.infolist() if i.filename.startswith(prefix) and not i.is_dir()]
+            if entries:
+                logging.info(f"Applying {len(entries)} files from {prefix}")
+            for info in entries:
+                rel_path = info.filename[len(prefix):]
+                target = os.path.realpath(os.path.join(root, rel_path))
+                if not target.startswith(root + os.sep):
+                    logging.warning(f"Skipping override outside the server folder: {info.filename}")
+                    continue
+                try:
+                    os.makedirs(os.path.dirname(target), exist_ok=True)
+                    # Never in place: the target may be a hardlink into the blob store
+                    with zf.open(info) as src, replace_file(target) as dst:
+                        shutil.copyfileobj(src, dst, 256 * 1024)
+                    written += info.file_size
+                except Exception as copy_err:
+                    logging.error(f"Failed to copy override {rel_path}: {copy_err}")
+        return written
+
+    @staticmethod
+    def _file_hash(path: str, algorithm: str) -> str:
+        h = hashlib.new(algorithm)
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                h.update(block)
+        return h.hexdigest()
+
+    @staticmethod
+    def _expected_hash(file_info: Dict):
+        """Strongest hash the index provides as (algorithm, hexdigest), or (None, None)."""
+        hashes = file_info.get("hashes") or {}
+        for algorithm in ("sha512", "sha1"):
+            if hashes.get(algorithm):
+                return algorithm, hashes[algorithm].lower()
+        return None, None
+
+    def _download_pack_files(
+        self, files: List[Dict], server_path: str, progress_callback=None
+    ) -> Dict:
+        """
+        Downloads the files of a modrinth.index.json concurrently.
+
+        Each file is verified against its sha512/sha1, retried over its
+        alternative download URLs and skipped when already present with the
+        right hash. Connections per host are capped so the CDN doesn't throttle us.
+        """
+        root = os.path.realpath(server_path)
+        host_limits: Dict[str, threading.Semaphore] = {}
+        lock = threading.Lock()
+        stats = {"downloaded": 0, "skipped": 0, "linked": 0, "failed": [], "bytes": 0}
+        done = [0]
+        total = len(files) or 1
+
+        def host_limit(url: str) -> threading.Semaphore:
+            host = urlparse(url).netloc
+            with lock:
+                return host_limits.setdefault(host, threading.Semaphore(self.PER_HOST_LIMIT))
+
+        def fetch(file_info: Dict) -> str:
+            rel_path = file_info.get("path")
+            urls = file_info.get("downloads") or []
+            if not rel_path or not urls:
+                return "skipped"
+
+            target = os.path.realpath(os.path.join(root, rel_path))
+            if not target.startswith(root + os.sep):
+                raise ValueError(f"Path escapes the server folder: {rel_path}")
+            algorithm, expected = self._expected_hash(file_info)
+
+            if algorithm and os.path.exists(target):
+                if self._file_hash(target, algorithm) == expected:
+                    return "skipped"
+
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            if self.blob_store and self.blob_store.materialize_alias(algorithm, expected, target):
+                return "linked"
+            part = target + ".part"
+            last_error = None
+            for _ in range(self.PACK_RETRIES):
+                for url in urls:
+                    try:
+                        with host_limit(url):
+                            h = hashlib.new(algorithm) if algorithm else None
+                            with self.http.session.get(url, stream=True, timeout=30) as r:
+                                r.raise_for_status()
+                                with open(part, "wb") as f:
+                                    for chunk in r.iter_content(chunk_size=256 * 1024):
+                                        f.write(chunk)
+                                        if h:
+                                            h.update(chunk)
+                        if h and h.hexdigest() != expected:
+                            raise ValueError(f"{algorithm} mismatch from {url}")
+                        os.replace(part, target)
+                        with lock:
+                            stats["bytes"] += os.path.getsize(target)
+                        if self.blob_store and rel_path.endswith(".jar"):
+                            self.blob_store.adopt(target, {algorithm: expected} if algorithm else None)
+                        return "downloaded"
+                    except Exception as e:
+                        last_error = e
+                        logging.warning(f"Modpack file {rel_path}: {e}")
+            if os.path.exists(part):
+                os.remove(part)
+            raise RuntimeError(str(last_error))
+
+        with ThreadPoolExecutor(max_workers=self.PACK_WORKERS) as pool:
+            futures = {pool.submit(fetch, f): f.get("path") for f in files}
+            for future in as_completed(futures):
+                rel_path = futures[future]
+                try:
+                    stats[future.result()] += 1
+                except Exception as e:
+                    logging.error(f"Failed to download dependency {rel_path}: {e}")
+                    stats["failed"].append(rel_path)
+                done[0] += 1
+                if progress_callback:
+                    name = (rel_path or "").split("/")[-1]
+                    progress_callback(20 + int(done[0] / total * 60), f"Installing: {name}")
+
+        logging.info(
+            f"Modpack files: {stats['downloaded']} downloaded, {stats['linked']} linked from the store, "
+            f"{stats['skipped']} already present, "
+            f"{len(stats['failed'])} failed"
+        )
+        return stats
+
     def get_installed_mods(self, server_path: str) -> List[Dict]:
         """
-        List all .jar files in the mods folder.
+        List all .jar files in the mods folder with their parsed metadata.
         """
-        mods = []
         mods_dir = os.path.join(server_path, "mods")
         if not os.path.exists(mods_dir):
             return []
 
         try:
-            for f in os.listdir(mods_dir):
-                if f.endswith(".jar"):
-                    file_path = os.path.join(mods_dir, f)
-                    size_mb = round(os.path.getsize(file_path) / (1024 * 1024), 2)
-                    mods.append(
-                        {"filename": f, "size": f"{size_mb} MB", "path": file_path}
-                    )
+            mods = self.get_mod_index(server_path).get_mods()
         except Exception as e:
             logging.error(f"Error listing installed mods: {e}")
+            return []
 
+        for mod in mods:
+            mod["size_bytes"] = mod["size"]
+            mod["size"] = f"{round(mod['size'] / (1024 * 1024), 2)} MB"
+            mod["path"] = os.path.join(mods_dir, mod["filename"])
         return mods
 
+    def get_dependency_graph(self, server_path: str) -> Dict:
+        return self.get_mod_index(server_path).get_dependency_graph()
+
+    # --- Updates ---
+
+    def check_updates(self, server_path: str, loader: str, game_version: Optional[str]) -> Dict:
+        """
+        Resolves every jar in mods/ against Modrinth by its sha1 in two batched
+        calls (version_files for the installed version, version_files/update
+        for the newest one matching the loader and game version).
+        """
+        mods = self.get_mod_index(server_path).get_mods()
+        by_hash = {m["sha1"]: m for m in mods}
+        if not by_hash:
+            return {"updates": [], "unknown": [], "up_to_date": 0}
+
+        hashes = list(by_hash)
+        current = self.http.session.post(
+            f"{self.BASE_URL}/version_files",
+            json={"hashes": hashes, "algorithm": "sha1"},
+            timeout=30,
+        )
+        current.raise_for_status()
+        current = current.json()
+
+        query = {"hashes": hashes, "algorithm": "sha1", "loaders": [loader]}
+        if game_version:
+            query["game_versions"] = [game_version]
+        latest = self.http.session.post(
+            f"{self.BASE_URL}/version_files/update", json=query, timeout=30
+        )
+        latest.raise_for_status()
+        latest = latest.json()
+
+        updates, unknown, up_to_date = [], [], 0
+        for sha1, mod in by_hash.items():
+            installed = current.get(sha1)
+            if not installed:
+                unknown.append(mod["filename"])  # Not on Modrinth (or a local build)
+                continue
+            newest = latest.get(sha1)
+            if not newest or newest.get("id") == installed.get("id"):
+                up_to_date += 1
+                continue
+            updates.append(
+                {
+                    "filename": mod["filename"],
+                    "project_id": installed.get("project_id"),
+                    "current_version": installed.get("version_number"),
+                    "current_version_id": installed.get("id"),
+                    "latest_version": newest.get("version_number"),
+                    "version_id": newest.get("id"),
+                    "date_published": newest.get("date_published"),
+                }
+            )
+        updates.sort(key=lambda u: u["filename"].lower())
+        return {"updates": updates, "unknown": sorted(unknown), "up_to_date": up_to_date}
+
+    def apply_updates(self, server_path: str, updates: List[Dict], progress_callback=None) -> Dict:
+        """
+        Installs the given updates ({"filename", "version_id"} items from
+        check_updates) concurrently and removes the replaced jars. Updates whose
+        version could not be resolved are listed in "unresolved" and, like
+        failed downloads, make the result unsuccessful.
+        """
+        files, replaces, unresolved = [], {}, []
+        for update in updates:
+            try:
+                version = self.http.get(
+                    f"{self.BASE_URL}/version/{update['version_id']}", timeout=10, ttl=7 * 24 * 3600
+                )
+                version.raise_for_status()
+                version_files = version.json().get("files", [])
+                primary = next((f for f in version_files if f.get("primary")), version_files[0])
+            except Exception as e:
+                logging.error(f"Could not resolve update for {update.get('filename')}: {e}")
+                unresolved.append(update.get("filename"))
+                continue
+            rel_path = f"mods/{primary['filename']}"
+            files.append({"path": rel_path, "hashes": primary.get("hashes", {}), "downloads": [primary["url"]]})
+            replaces[rel_path] = update["filename"]
+
+        stats = self._download_pack_files(files, server_path, progress_callback)
+
+        updated = []
+        for rel_path, old_name in replaces.items():
+            if rel_path in stats["failed"]:
+                continue
+            new_name = rel_path.split("/", 1)[1]
+            if new_name != old_name:
+                self.delete_mod(old_name, server_path)
+            updated.append({"from": old_name, "to": new_name})
+
+        if progress_callback:
+            progress_callback(100, f"Updated {len(updated)} mod(s)")
+        return {
+            "success": not stats["failed"] and not unresolved,
+            "updated": updated,
+            "failed": stats["failed"],
+            "unresolved": unresolved,
+        }
+
     def delete_mod(self, filename: str, server_path: str) -> bool:
         try:
             path = os.path.join(server_path, "mods", filename)
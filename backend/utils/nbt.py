@@ -0,0 +1,200 @@
+import gzip
+import zlib
+import struct
+import logging
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+TAG_END = 0
+TAG_BYTE = 1
+TAG_SHORT = 2
+TAG_INT = 3
+TAG_LONG = 4
+TAG_FLOAT = 5
+TAG_DOUBLE = 6
+TAG_BYTE_ARRAY = 7
+TAG_STRING = 8
+TAG_LIST = 9
+TAG_COMPOUND = 10
+TAG_INT_ARRAY = 11
+TAG_LONG_ARRAY = 12
+
+# Fixed-size payloads: struct format (big-endian)
+_SCALARS = {
+    TAG_BYTE: struct.Struct(">b"),
+    TAG_SHORT: struct.Struct(">h"),
+    TAG_INT: struct.Struct(">i"),
+    TAG_LONG: struct.Struct(">q"),
+    TAG_FLOAT: struct.Struct(">f"),
+    TAG_DOUBLE: struct.Struct(">d"),
+}
+# Array tags: element size and struct code
+_ARRAYS = {TAG_BYTE_ARRAY: (1, "b"), TAG_INT_ARRAY: (4, "i"), TAG_LONG_ARRAY: (8, "q")}
+_U16 = struct.Struct(">H")
+_I32 = struct.Struct(">i")
+
+
+class NbtError(Exception):
+    pass
+
+
+class NbtReader:
+    """
+    Decodificador NBT (Java Edition, big-endian), en streaming.
+
+    The source is either bytes (read through a memoryview, no copies) or a
+    binary file object such as gzip.open(...), read incrementally. Values
+    are decoded as they are walked: compounds become dicts, lists become
+    lists, arrays are returned as tuples of ints. A `select`
+    pattern restricts decoding to the parts that are needed; everything
+    else is skipped by jumping over its length without building objects,
+    which is what makes reading one field of a chunk or level.dat cheap.
+
+    A pattern is a dict of {name: True | sub-pattern} applied to a
+    compound: True decodes the whole value, a dict descends into a
+    compound (or into each compound of a list) with that pattern.
+    """
+
+    def __init__(self, data, offset: int = 0):
+        self._stream = data if hasattr(data, "read") else None
+        self.data = None if self._stream is not None else memoryview(data)
+        self.pos = offset
+
+    # --- Primitives ---
+
+    def _take(self, n: int):
+        if self._stream is not None:
+            chunk = self._stream.read(n) if n > 0 else b""
+            if n < 0 or len(chunk) != n:
+                raise NbtError(f"Unexpected end of NBT data at byte {self.pos}")
+            self.pos += n
+            return chunk
+        end = self.pos + n
+        if n < 0 or end > len(self.data):
+            raise NbtError(f"Unexpected end of NBT data at byte {self.pos}")
+        chunk = self.data[self.pos:end]
+        self.pos = end
+        return chunk
+
+    def _skip(self, n: int):
+        if self._stream is None or n < 4096:
+            self._take(n)
+            return
+        # Large skips on a stream: seek forward, nothing is kept in memory
+        start = self._stream.tell()
+        if self._stream.seek(n, 1) - start != n:
+            raise NbtError(f"Unexpected end of NBT data at byte {self.pos}")
+        self.pos += n
+
+    def _scalar(self, tag: int):
+        fmt = _SCALARS[tag]
+        return fmt.unpack(self._take(fmt.size))[0]
+
+    def _string(self) -> str:
+        (length,) = _U16.unpack(self._take(2))
+        # Modified UTF-8; only differs from UTF-8 for NUL and supplementary characters
+        return bytes(self._take(length)).decode("utf-8", errors="replace")
+
+    def _length(self) -> int:
+        (length,) = _I32.unpack(self._take(4))
+        return max(0, length)
+
+    # --- Decoding ---
+
+    def read_payload(self, tag: int, select: Optional[Dict] = None) -> Any:
+        if tag in _SCALARS:
+            return self._scalar(tag)
+        if tag == TAG_STRING:
+            return self._string()
+        if tag in _ARRAYS:
+            size, code = _ARRAYS[tag]
+            length = self._length()
+            return struct.unpack(f">{length}{code}", self._take(length * size))
+        if tag == TAG_LIST:
+            item_tag = self._take(1)[0]
+            length = self._length()
+            return [self.read_payload(item_tag, select) for _ in range(length)]
+        if tag == TAG_COMPOUND:
+            return self._compound(select)
+        raise NbtError(f"Unknown NBT tag {tag} at byte {self.pos}")
+
+    def _compound(self, select: Optional[Dict]) -> Dict[str, Any]:
+        result = {}
+        while True:
+            tag = self._take(1)[0]
+            if tag == TAG_END:
+                return result
+            name = self._string()
+            if select is None:
+                result[name] = self.read_payload(tag)
+                continue
+            wanted = select.get(name)
+            if wanted is None:
+                self.skip_payload(tag)
+            elif wanted is True or tag not in (TAG_COMPOUND, TAG_LIST):
+                result[name] = self.read_payload(tag)
+            else:
+                result[name] = self.read_payload(tag, wanted)
+
+    def skip_payload(self, tag: int):
+        """Moves past a payload without decoding it."""
+        if tag in _SCALARS:
+            self._skip(_SCALARS[tag].size)
+        elif tag == TAG_STRING:
+            (length,) = _U16.unpack(self._take(2))
+            self._skip(length)
+        elif tag in _ARRAYS:
+            self._skip(self._length() * _ARRAYS[tag][0])
+        elif tag == TAG_LIST:
+            item_tag = self._take(1)[0]
+            length = self._length()
+            if item_tag in _SCALARS:
+                self._skip(length * _SCALARS[item_tag].size)
+            else:
+                for _ in range(length):
+                    self.skip_payload(item_tag)
+        elif tag == TAG_COMPOUND:
+            while True:
+                item_tag = self._take(1)[0]
+                if item_tag == TAG_END:
+                    return
+                (length,) = _U16.unpack(self._take(2))
+                self._skip(length)
+                self.skip_payload(item_tag)
+        elif tag != TAG_END:
+            raise NbtError(f"Unknown NBT tag {tag} at byte {self.pos}")
+
+    def read_root(self, select: Optional[Dict] = None) -> Tuple[str, Any]:
+        """Reads the root named tag. Returns (name, value)."""
+        tag = self._take(1)[0]
+        if tag == TAG_END:
+            return "", None
+        name = self._string()
+        return name, self.read_payload(tag, select)
+
+
+def read_nbt(data: bytes, select: Optional[Dict] = None) -> Any:
+    """Value of the root tag of uncompressed NBT bytes (see NbtReader for `select`)."""
+    return NbtReader(data).read_root(select)[1]
+
+
+def read_nbt_file(path: str, select: Optional[Dict] = None) -> Any:
+    """
+    Value of the root tag of an NBT file (level.dat, playerdata, ...).
+    Gzip (the usual), zlib and uncompressed files are recognised by their
+    first bytes; gzip is decompressed as it is decoded.
+    """
+    with open(path, "rb") as f:
+        magic = f.read(2)
+    try:
+        if magic == b"\x1f\x8b":
+            with gzip.open(path, "rb") as stream:
+                return NbtReader(stream).read_root(select)[1]
+        with open(path, "rb") as f:
+            data = f.read()
+        if magic[:1] == b"\x78":
+            data = zlib.decompress(data)
+        return read_nbt(data, select)
+    except (OSError, EOFError, zlib.error) as e:
+        raise NbtError(f"Could not decompress {path}: {e}")
@@ -0,0 +1,226 @@
+import os
+import json
+import mmap
+import time
+import heapq
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+from utils.region_file import HEADER_SIZE, SECTOR_SIZE, RegionError, parse_header
+from utils.world_size import dimension_of
+
+logger = logging.getLogger(__name__)
+
+REGION_KINDS = ("region", "entities", "poi")
+TOP_CHUNKS_PER_FILE = 5
+
+
+def _region_coords(filename: str):
+    # r.<x>.<z>.mca
+    parts = filename.split(".")
+    try:
+        return int(parts[1]), int(parts[2])
+    except (IndexError, ValueError):
+        return None
+
+
+def analyze_header(path: str) -> Dict:
+    """
+    Stats of one region file from its 8 KiB header only (mmap'ed).
+    Chunk sizes are sector-granular (allocated sectors x 4 KiB).
+    """
+    size = os.path.getsize(path)
+    result = {
+        "size": size,
+        "chunks": 0,
+        "allocated_sectors": 0,
+        "free_sectors": 0,
+        "days": {},  # "YYYY-MM-DD" (UTC) of the chunk timestamps -> count
+        "newest": 0,
+        "oldest": 0,
+        "largest": [],  # [sectors, index]
+    }
+    if size < HEADER_SIZE:
+        return result  # Empty region files are left behind by the game
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), HEADER_SIZE, access=mmap.ACCESS_READ) as header:
+        entries = parse_header(header[:HEADER_SIZE])
+
+    timestamps = []
+    sizes = []
+    for index, (offset, count, timestamp) in enumerate(entries):
+        if offset == 0 and count == 0:
+            continue
+        result["chunks"] += 1
+        result["allocated_sectors"] += count
+        sizes.append((count, index))
+        if timestamp:
+            timestamps.append(timestamp)
+            day = time.strftime("%Y-%m-%d", time.gmtime(timestamp))
+            result["days"][day] = result["days"].get(day, 0) + 1
+
+    file_sectors = -(-size // SECTOR_SIZE)
+    result["free_sectors"] = max(0, file_sectors - 2 - result["allocated_sectors"])
+    if timestamps:
+        result["newest"] = max(timestamps)
+        result["oldest"] = min(timestamps)
+    result["largest"] = [list(x) for x in heapq.nlargest(TOP_CHUNKS_PER_FILE, sizes)]
+    return result
+
+
+class RegionAnalyzer:
+    """
+    Analizador de los archivos de región (.mca) de los mundos de un servidor.
+
+    Only the 8 KiB header of every region/, entities/ and poi/ file is read
+    (mmap, in parallel). Per-file results are cached by (mtime, size) in
+    <server>/.mlsg/region_analysis.json, so analysing again after a play
+    session only reads the regions that were saved since.
+    """
+
+    def __init__(self, server_path: str, max_workers: int = 8):
+        self.server_path = server_path
+        self.cache_file = os.path.join(server_path, ".mlsg", "region_analysis.json")
+        self.max_workers = max_workers
+        self._lock = threading.Lock()
+        self.cache: Dict[str, Dict] = self._load_cache()
+
+    def _load_cache(self) -> Dict:
+        try:
+            if os.path.exists(self.cache_file):
+                with open(self.cache_file, "r", encoding="utf-8") as f:
+                    return json.load(f)
+        except (json.JSONDecodeError, IOError) as e:
+            logger.warning(f"Error loading region analysis cache: {e}")
+        return {}
+
+    def _save_cache(self):
+        try:
+            os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
+            with open(self.cache_file, "w", encoding="utf-8") as f:
+                json.dump(self.cache, f)
+        except IOError as e:
+            logger.error(f"Error saving region analysis cache: {e}")
+
+    def _region_files(self, world_path: str) -> List[Dict]:
+        found = []
+        for root, dirs, files in os.walk(world_path):
+            kind = os.path.basename(root)
+            if kind not in REGION_KINDS:
+                continue
+            rel_dir = os.path.relpath(root, world_path)
+            dimension = dimension_of(rel_dir)
+            for name in files:
+                if name.endswith(".mca"):
+                    full = os.path.join(root, name)
+                    found.append(
+                        {
+                            "path": full,
+                            "key": os.path.relpath(full, self.server_path).replace(os.sep, "/"),
+                            "name": name,
+                            "kind": kind,
+                            "dimension": dimension,
+                        }
+                    )
+        return found
+
+    def analyze(self, world_path: str, top: int = 20) -> Dict:
+        started = time.time()
+        with self._lock:
+            files = self._region_files(world_path)
+            stale = []
+            for item in files:
+                try:
+                    st = os.stat(item["path"])
+                except OSError:
+                    continue
+                item["mtime"], item["size"] = st.st_mtime, st.st_size
+                cached = self.cache.get(item["key"])
+                if not cached or cached["mtime"] != st.st_mtime or cached["size"] != st.st_size:
+                    stale.append(item)
+
+            def read(item):
+                try:
+                    return item, analyze_header(item["path"])
+                except (OSError, ValueError, RegionError) as e:
+                    logger.warning(f"Region analyzer: Could not read {item['key']}: {e}")
+                    return item, None
+
+            if stale:
+                with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                    for item, stats in pool.map(read, stale):
+                        if stats is not None:
+                            stats["mtime"] = item["mtime"]
+                            self.cache[item["key"]] = stats
+
+            # Forget files of this world that no longer exist
+            world_prefix = os.path.relpath(world_path, self.server_path).replace(os.sep, "/") + "/"
+            present = {item["key"] for item in files}
+            for key in [k for k in self.cache if k.startswith(world_prefix) and k not in present]:
+                del self.cache[key]
+            if stale:
+                self._save_cache()
+
+            return self._report(files, top, len(stale), time.time() - started)
+
+    def _report(self, files: List[Dict], top: int, analyzed: int, duration: float) -> Dict:
+        totals = {"files": 0, "chunks": 0, "file_bytes": 0, "allocated_bytes": 0, "wasted_bytes": 0}
+        by_dimension: Dict[str, Dict[str, Dict]] = {}
+        months: Dict[str, int] = {}
+        today = time.mktime(time.strptime(time.strftime("%Y-%m-%d", time.gmtime()), "%Y-%m-%d"))
+        age = {"day": 0, "week": 0, "month": 0, "older": 0}
+        largest_chunks = []
+        largest_files = []
+
+        for item in files:
+            stats = self.cache.get(item["key"])
+            if not stats:
+                continue
+            group = by_dimension.setdefault(item["dimension"], {}).setdefault(
+                item["kind"], {"files": 0, "chunks": 0, "file_bytes": 0, "allocated_bytes": 0, "wasted_bytes": 0}
+            )
+            values = {
+                "files": 1,
+                "chunks": stats["chunks"],
+                "file_bytes": stats["size"],
+                "allocated_bytes": stats["allocated_sectors"] * SECTOR_SIZE,
+                "wasted_bytes": stats["free_sectors"] * SECTOR_SIZE,
+            }
+            for key, value in values.items():
+                group[key] += value
+                totals[key] += value
+            for day, count in stats["days"].items():
+                months[day[:7]] = months.get(day[:7], 0) + count
+                days_ago = (today - time.mktime(time.strptime(day, "%Y-%m-%d"))) / 86400
+                bucket = "day" if days_ago < 1 else "week" if days_ago < 7 else "month" if days_ago < 30 else "older"
+                age[bucket] += count
+
+            coords = _region_coords(item["name"])
+            for sectors, index in stats["largest"]:
+                chunk = {
+                    "file": item["key"],
+                    "dimension": item["dimension"],
+                    "kind": item["kind"],
+                    "bytes": sectors * SECTOR_SIZE,
+                }
+                if coords:
+                    chunk["x"] = coords[0] * 32 + index % 32
+                    chunk["z"] = coords[1] * 32 + index // 32
+                largest_chunks.append(chunk)
+            largest_files.append({"file": item["key"], "bytes": stats["size"], "chunks": stats["chunks"]})
+
+        for group in [g for kinds in by_dimension.values() for g in kinds.values()] + [totals]:
+            group["avg_chunk_bytes"] = group["allocated_bytes"] // group["chunks"] if group["chunks"] else 0
+
+        return {
+            "totals": totals,
+            "by_dimension": by_dimension,
+            "chunk_age": age,
+            "chunks_by_month": dict(sorted(months.items())),
+            "largest_chunks": heapq.nlargest(top, largest_chunks, key=lambda c: c["bytes"]),
+            "largest_files": heapq.nlargest(top, largest_files, key=lambda f: f["bytes"]),
+            "analyzed_files": analyzed,
+            "cached_files": len(files) - analyzed,
+            "duration": round(duration, 3),
+        }
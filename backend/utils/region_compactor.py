@@ -0,0 +1,123 @@
+import os
+import time
+import logging
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional
+
+from utils.region_file import RegionError, exclusive_rewrite, read_chunk_records, region_size, write_region
+from utils.world_size import dimension_of
+
+logger = logging.getLogger(__name__)
+
+REGION_KINDS = ("region", "entities", "poi")
+MAX_ERRORS = 50
+
+
+def _compact_file(task: Dict) -> Dict:
+    """Worker: rewrites one region file packed, if that makes it smaller."""
+    path = task["path"]
+    result = {"key": task["key"], "dimension": task["dimension"], "compacted": False,
+              "bytes_before": 0, "bytes_after": 0, "error": None}
+    try:
+        before = os.path.getsize(path)
+        records = read_chunk_records(path)
+    except (OSError, RegionError) as e:
+        result["error"] = f"{task['key']}: {e}"
+        return result
+    after = region_size([record for _, _, record in records])
+    result["bytes_before"] = before
+    result["bytes_after"] = before
+    if after >= before:
+        return result  # Already contiguous
+    try:
+        write_region(path, {index: (ts, record) for index, ts, record in records})
+    except (OSError, RegionError) as e:
+        result["error"] = f"{task['key']}: {e}"
+        return result
+    result["compacted"] = True
+    result["bytes_after"] = after
+    return result
+
+
+class RegionCompactor:
+    """
+    Compacta los archivos de región (.mca) de un mundo (servidor detenido).
+
+    The game allocates a chunk new sectors when it outgrows its old ones
+    and leaves the old sectors free, so region files only ever grow and
+    their chunks end up scattered. Each file of region/, entities/ and
+    poi/ is rewritten with its chunks packed in index order (timestamps
+    and records untouched), through a temp file, fsync and rename: a crash
+    leaves either the old file or the new one. Files run in a process pool.
+    """
+
+    def __init__(self, workers: Optional[int] = None):
+        self.workers = max(1, workers or os.cpu_count() or 1)
+
+    def _tasks(self, world_path: str) -> List[Dict]:
+        tasks = []
+        for root, dirs, files in os.walk(world_path):
+            if os.path.basename(root) not in REGION_KINDS:
+                continue
+            dimension = dimension_of(os.path.relpath(root, world_path))
+            for name in files:
+                path = os.path.join(root, name)
+                if name.endswith(".mca.tmp"):
+                    # Left by an interrupted rewrite; the .mca itself is intact
+                    os.remove(path)
+                    continue
+                if not name.endswith(".mca") or os.path.getsize(path) == 0:
+                    continue
+                tasks.append({
+                    "path": path,
+                    "key": os.path.relpath(path, world_path).replace(os.sep, "/"),
+                    "dimension": dimension,
+                })
+        return tasks
+
+    def compact(
+        self,
+        world_path: str,
+        progress_callback: Optional[Callable[[int, int], None]] = None,
+        server_active: Optional[Callable[[], bool]] = None,
+    ) -> Dict:
+        """
+        Rewrites the world's region files packed. Returns the report (files,
+        compacted, bytes before/after, reclaimed per dimension). Raises
+        RegionError if the world is already being rewritten or server_active()
+        is true; the server cannot be started until it returns.
+        """
+        with exclusive_rewrite(world_path, server_active):
+            started = time.time()
+            tasks = self._tasks(world_path)
+            totals = {"files": len(tasks), "compacted": 0, "bytes_before": 0, "bytes_after": 0}
+            by_dimension: Dict[str, Dict] = {}
+            errors = []
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                futures = [pool.submit(_compact_file, task) for task in tasks]
+                for done, future in enumerate(as_completed(futures), 1):
+                    result = future.result()
+                    if result["error"]:
+                        errors.append(result["error"])
+                    totals["compacted"] += int(result["compacted"])
+                    totals["bytes_before"] += result["bytes_before"]
+                    totals["bytes_after"] += result["bytes_after"]
+                    dim = by_dimension.setdefault(result["dimension"], {"files": 0, "reclaimed_bytes": 0})
+                    dim["files"] += 1
+                    dim["reclaimed_bytes"] += result["bytes_before"] - result["bytes_after"]
+                    if progress_callback:
+                        progress_callback(done, len(tasks))
+
+            totals["reclaimed_bytes"] = totals["bytes_before"] - totals["bytes_after"]
+            report = {
+                **totals,
+                "by_dimension": by_dimension,
+                "errors": errors[:MAX_ERRORS],
+                "error_count": len(errors),
+                "duration": round(time.time() - started, 3),
+            }
+            logger.info(
+                f"Region compaction of {os.path.basename(world_path)}: {totals['compacted']}/{totals['files']} "
+                f"files, {totals['reclaimed_bytes'] / 1048576:.1f} MB reclaimed in {report['duration']}s"
+            )
+            return report
@@ -0,0 +1,178 @@
+import os
+import gzip
+import zlib
+import struct
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SECTOR_SIZE = 4096
+HEADER_SIZE = 2 * SECTOR_SIZE
+CHUNKS_PER_REGION = 1024
+
+# Compression byte of a chunk record; bit 128 means the payload lives in c.<x>.<z>.mcc
+COMPRESSION_GZIP = 1
+COMPRESSION_ZLIB = 2
+COMPRESSION_NONE = 3
+COMPRESSION_LZ4 = 4
+EXTERNAL_FLAG = 128
+
+
+class RegionError(Exception):
+    pass
+
+
+# Worlds whose region files are being rewritten (trim, compaction)
+_rewriting = set()
+_rewriting_lock = threading.RLock()
+
+
+def _key(path: str) -> str:
+    return os.path.normcase(os.path.abspath(path))
+
+
+def is_rewriting(path: str) -> bool:
+    """True while the region files of a world at (or below) path are being rewritten."""
+    key = _key(path)
+    with _rewriting_lock:
+        return any(w == key or w.startswith(key + os.sep) for w in _rewriting)
+
+
+@contextmanager
+def no_rewrite(path: str):
+    """
+    Holds off rewrites of the worlds below path while the block runs, e.g.
+    while a server start is committed. Raises RegionError if one is running.
+    """
+    with _rewriting_lock:
+        if is_rewriting(path):
+            raise RegionError("World files are being rewritten (trim or compaction); wait for it to finish")
+        yield
+
+
+@contextmanager
+def exclusive_rewrite(world_path: str, server_active: Optional[Callable[[], bool]] = None):
+    """
+    Only one offline rewrite of a world's region files at a time, and none
+    while the server is active. Raises RegionError if busy or active.
+    ServerHandler.start refuses to start while this is held (no_rewrite).
+    """
+    key = _key(world_path)
+    with _rewriting_lock:
+        if key in _rewriting:
+            raise RegionError("The region files of this world are already being rewritten")
+        if server_active and server_active():
+            raise RegionError("Stop the server before rewriting its region files")
+        _rewriting.add(key)
+    try:
+        yield
+    finally:
+        with _rewriting_lock:
+            _rewriting.discard(key)
+
+
+def parse_header(header: bytes) -> List[Tuple[int, int, int]]:
+    """
+    Decodes the 8 KiB header of a region (.mca) file.
+    Returns 1024 (sector_offset, sector_count, timestamp) tuples, indexed by
+    x + z * 32 (local chunk coordinates); absent chunks are (0, 0, 0).
+    """
+    if len(header) < HEADER_SIZE:
+        raise RegionError(f"Region header too short ({len(header)} bytes)")
+    locations = struct.unpack(">1024I", header[:SECTOR_SIZE])
+    timestamps = struct.unpack(">1024I", header[SECTOR_SIZE:HEADER_SIZE])
+    return [(loc >> 8, loc & 0xFF, ts) for loc, ts in zip(locations, timestamps)]
+
+
+def iter_chunk_records(data: bytes) -> Iterator[Tuple[int, int, bytes]]:
+    """
+    Yields (index, timestamp, record) for every chunk in a region file's
+    bytes. `record` is the chunk as stored on disk without the sector
+    padding: 4-byte length, compression byte and compressed NBT.
+    Raises RegionError if an entry points outside the file.
+    """
+    size = len(data)
+    for index, (offset, count, timestamp) in enumerate(parse_header(data)):
+        if offset == 0 and count == 0:
+            continue
+        start = offset * SECTOR_SIZE
+        if offset < 2 or start + 5 > size:
+            raise RegionError(f"Chunk {index} points outside the file (sector {offset})")
+        (length,) = struct.unpack_from(">I", data, start)
+        if length == 0 or length + 4 > count * SECTOR_SIZE or start + 4 + length > size:
+            raise RegionError(f"Chunk {index} has an invalid length ({length} bytes, {count} sectors)")
+        yield index, timestamp, data[start:start + 4 + length]
+
+
+def read_chunk_records(path: str) -> List[Tuple[int, int, bytes]]:
+    """Every chunk record of a region file (see iter_chunk_records)."""
+    with open(path, "rb") as f:
+        data = f.read()
+    if not data:
+        return []  # The game leaves empty region files behind
+    return list(iter_chunk_records(data))
+
+
+def decompress_record(record: bytes) -> bytes:
+    """
+    Uncompressed chunk NBT of a record (see iter_chunk_records).
+    Raises RegionError for chunks stored outside the region (.mcc) and for
+    compressions this module cannot read (LZ4).
+    """
+    compression = record[4]
+    if compression & EXTERNAL_FLAG:
+        raise RegionError("Chunk is stored in an external .mcc file")
+    payload = record[5:]
+    try:
+        if compression == COMPRESSION_ZLIB:
+            return zlib.decompress(payload)
+        if compression == COMPRESSION_GZIP:
+            return gzip.decompress(payload)
+    except (zlib.error, OSError, EOFError) as e:
+        raise RegionError(f"Corrupt chunk data: {e}")
+    if compression == COMPRESSION_NONE:
+        return bytes(payload)
+    raise RegionError(f"Unsupported chunk compression {compression}")
+
+
+def region_size(records) -> int:
+    """Size of the region file build_region would produce for these records."""
+    return HEADER_SIZE + sum(-(-len(r) // SECTOR_SIZE) * SECTOR_SIZE for r in records)
+
+
+def build_region(chunks: Dict[int, Tuple[int, bytes]]) -> bytes:
+    """
+    Builds region file bytes from {index: (timestamp, record)}.
+    Chunks are laid out in index order, each padded to whole sectors.
+    """
+    locations = [0] * CHUNKS_PER_REGION
+    timestamps = [0] * CHUNKS_PER_REGION
+    body = []
+    sector = 2
+    for index in sorted(chunks):
+        timestamp, record = chunks[index]
+        sectors = -(-len(record) // SECTOR_SIZE)
+        if sectors > 255:
+            raise RegionError(f"Chunk {index} is too large for a region file ({len(record)} bytes)")
+        locations[index] = (sector << 8) | sectors
+        timestamps[index] = timestamp
+        body.append(record)
+        body.append(b"\0" * (sectors * SECTOR_SIZE - len(record)))
+        sector += sectors
+    header = struct.pack(">1024I", *locations) + struct.pack(">1024I", *timestamps)
+    return header + b"".join(body)
+
+
+def write_region(path: str, chunks: Dict[int, Tuple[int, bytes]], mtime: Optional[float] = None):
+    """Writes a region file atomically (temp file + rename)."""
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(build_region(chunks))
+        f.flush()
+        os.fsync(f.fileno())  # Contents are on disk before the rename makes them live
+    if mtime is not None:
+        os.utime(tmp, (mtime, mtime))
+    os.replace(tmp, path)
@@ -0,0 +1,308 @@
+import os
+import ssl
+import json
+import time
+import hashlib
+import logging
+import threading
+import urllib.request
+import urllib.error
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = "MinecraftServerGUI/1.0"
+CHUNK_SIZE = 64 * 1024
+# Persist segment progress at most this often (bytes per segment)
+STATE_SAVE_INTERVAL = 4 * 1024 * 1024
+MIN_SEGMENT_SIZE = 2 * 1024 * 1024
+
+
+class DownloadError(Exception):
+    pass
+
+
+def unverified_ssl_context() -> ssl.SSLContext:
+    # Unverified context for robustness in frozen envs (same as the other downloaders)
+    ctx = ssl.create_default_context()
+    ctx.check_hostname = False
+    ctx.verify_mode = ssl.CERT_NONE
+    return ctx
+
+
+def sha256_file(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(1024 * 1024)
+            if not block:
+                break
+            h.update(block)
+    return h.hexdigest()
+
+
+class SegmentedDownloader:
+    """
+    Descarga un archivo en varios segmentos paralelos usando HTTP Range.
+
+    Progress is kept next to the destination in '<dest>.part' (the data,
+    preallocated to the full size) and '<dest>.part.json' (the byte ranges
+    already written), so an interrupted download continues where it stopped,
+    both after a dropped connection (per-segment retry) and after a restart
+    of the application. Servers without Range support fall back to a single
+    stream.
+    """
+
+    def __init__(
+        self,
+        segments: int = 4,
+        retries: int = 5,
+        timeout: int = 30,
+        headers: Optional[Dict[str, str]] = None,
+    ):
+        self.segments = max(1, segments)
+        self.retries = retries
+        self.timeout = timeout
+        self.headers = {"User-Agent": USER_AGENT, **(headers or {})}
+        self._ctx = unverified_ssl_context()
+
+    # --- HTTP helpers ---
+
+    def _open(self, url: str, byte_range: Optional[str] = None):
+        headers = dict(self.headers)
+        if byte_range:
+            headers["Range"] = f"bytes={byte_range}"
+        req = urllib.request.Request(url, headers=headers)
+        return urllib.request.urlopen(req, context=self._ctx, timeout=self.timeout)
+
+    def _probe(self, url: str) -> Dict:
+        """Size, validator and Range support of the remote file."""
+        with self._open(url, "0-0") as resp:
+            status = resp.status
+            content_range = resp.getheader("Content-Range", "")
+            info = {
+                "url": resp.geturl(),  # Follow redirects once (GitHub release assets)
+                "etag": resp.getheader("ETag"),
+                "last_modified": resp.getheader("Last-Modified"),
+                "ranges": False,
+                "size": 0,
+            }
+            if status == 206 and "/" in content_range:
+                total = content_range.rsplit("/", 1)[1]
+                if total.isdigit():
+                    info["size"] = int(total)
+                    info["ranges"] = True
+            else:
+                info["size"] = int(resp.getheader("Content-Length", 0) or 0)
+        return info
+
+    # --- State ---
+
+    @staticmethod
+    def _state_path(dest: str) -> str:
+        return dest + ".part.json"
+
+    def _load_state(self, dest: str, info: Dict) -> Optional[Dict]:
+        """Returns the saved state if it belongs to the same remote file."""
+        part = dest + ".part"
+        try:
+            with open(self._state_path(dest), "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+        same_file = (
+            state.get("size") == info["size"]
+            and state.get("etag") == info["etag"]
+            and state.get("last_modified") == info["last_modified"]
+        )
+        if not same_file or not os.path.exists(part) or os.path.getsize(part) != info["size"]:
+            logger.info("Partial download does not match the remote file, starting over.")
+            return None
+        return state
+
+    def _save_state(self, dest: str, state: Dict):
+        tmp = self._state_path(dest) + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp, self._state_path(dest))
+
+    def _new_state(self, info: Dict) -> Dict:
+        size = info["size"]
+        count = max(1, min(self.segments, size // MIN_SEGMENT_SIZE or 1))
+        step = size // count
+        segments = []
+        for i in range(count):
+            start = i * step
+            end = size - 1 if i == count - 1 else (i + 1) * step - 1
+            segments.append({"start": start, "end": end, "done": 0})
+        return {
+            "size": size,
+            "etag": info["etag"],
+            "last_modified": info["last_modified"],
+            "segments": segments,
+        }
+
+    def _cleanup(self, dest: str):
+        for path in (dest + ".part", self._state_path(dest)):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    # --- Download ---
+
+    def download(
+        self,
+        url: str,
+        dest: str,
+        expected_sha256: Optional[str] = None,
+        progress_callback: Optional[Callable[[int, int], None]] = None,
+    ) -> bool:
+        """
+        Downloads url into dest. progress_callback(downloaded, total) is
+        called from the worker threads. Returns False if the download failed
+        or the SHA-256 does not match (the partial file is discarded then).
+        """
+        if progress_callback is None:
+            progress_callback = lambda done, total: None
+
+        try:
+            info = self._probe(url)
+        except Exception as e:
+            logger.error(f"Download: Could not reach {url}: {e}")
+            return False
+
+        started = time.time()
+        try:
+            if info["ranges"] and info["size"] > 0:
+                self._download_segmented(info, dest, progress_callback)
+            else:
+                logger.info("Server does not support Range requests, using a single stream.")
+                self._download_single(info, dest, progress_callback)
+        except Exception as e:
+            # Keep .part/.part.json so the next attempt resumes
+            logger.error(f"Download failed: {e}")
+            return False
+
+        part = dest + ".part"
+        if expected_sha256:
+            actual = sha256_file(part)
+            if actual.lower() != expected_sha256.lower():
+                logger.error(
+                    f"Checksum mismatch for {os.path.basename(dest)}: "
+                    f"expected {expected_sha256}, got {actual}"
+                )
+                self._cleanup(dest)
+                return False
+            logger.info(f"Checksum verified for {os.path.basename(dest)}")
+
+        os.replace(part, dest)
+        self._cleanup(dest)
+        elapsed = max(time.time() - started, 0.001)
+        size_mb = os.path.getsize(dest) / (1024 * 1024)
+        logger.info(f"Downloaded {size_mb:.1f} MB in {elapsed:.1f}s ({size_mb / elapsed:.1f} MB/s)")
+        return True
+
+    def _download_single(self, info: Dict, dest: str, progress_callback):
+        part = dest + ".part"
+        total = info["size"]
+        last_error = None
+        for attempt in range(self.retries + 1):
+            try:
+                downloaded = 0
+                with self._open(info["url"]) as resp, open(part, "wb") as f:
+                    while True:
+                        chunk = resp.read(CHUNK_SIZE)
+                        if not chunk:
+                            break
+                        f.write(chunk)
+                        downloaded += len(chunk)
+                        progress_callback(downloaded, total)
+                if total and downloaded != total:
+                    raise DownloadError(f"Incomplete download ({downloaded}/{total} bytes)")
+                return
+            except (OSError, urllib.error.URLError, DownloadError) as e:
+                last_error = e
+                logger.warning(f"Download attempt {attempt + 1} failed: {e}")
+                time.sleep(min(2 ** attempt, 10))
+        raise DownloadError(str(last_error))
+
+    def _download_segmented(self, info: Dict, dest: str, progress_callback):
+        part = dest + ".part"
+        state = self._load_state(dest, info)
+        if state is None:
+            state = self._new_state(info)
+            with open(part, "wb") as f:
+                f.truncate(info["size"])
+            self._save_state(dest, state)
+        else:
+            done = sum(s["done"] for s in state["segments"])
+            logger.info(f"Resuming download at {done}/{info['size']} bytes")
+
+        lock = threading.Lock()
+        total = info["size"]
+
+        def downloaded() -> int:
+            return sum(s["done"] for s in state["segments"])
+
+        def fetch(segment: Dict):
+            last_error = None
+            attempt = 0
+            while attempt <= self.retries:
+                offset = segment["start"] + segment["done"]
+                if offset > segment["end"]:
+                    return
+                try:
+                    self._fetch_range(info["url"], part, segment, offset, lock, dest, state, progress_callback, downloaded)
+                except (OSError, urllib.error.URLError, DownloadError) as e:
+                    last_error = e
+                    if segment["start"] + segment["done"] > offset:
+                        # Dropped mid-range after making progress: resume right away
+                        attempt = 0
+                        logger.info(f"Segment {segment['start']}-{segment['end']} resuming at {segment['done']} bytes: {e}")
+                        continue
+                    attempt += 1
+                    logger.warning(
+                        f"Segment {segment['start']}-{segment['end']} interrupted at "
+                        f"{segment['done']} bytes (attempt {attempt}): {e}"
+                    )
+                    time.sleep(min(2 ** attempt, 10))
+            raise DownloadError(f"Segment {segment['start']}-{segment['end']} failed: {last_error}")
+
+        pending = [s for s in state["segments"] if s["start"] + s["done"] <= s["end"]]
+        try:
+            with ThreadPoolExecutor(max_workers=len(pending) or 1) as pool:
+                for future in [pool.submit(fetch, s) for s in pending]:
+                    future.result()
+        finally:
+            with lock:
+                self._save_state(dest, state)
+
+        if downloaded() != total:
+            raise DownloadError(f"Incomplete download ({downloaded()}/{total} bytes)")
+
+    def _fetch_range(self, url, part, segment, offset, lock, dest, state, progress_callback, downloaded):
+        with self._open(url, f"{offset}-{segment['end']}") as resp:
+            if resp.status != 206:
+                raise DownloadError(f"Server ignored Range request (HTTP {resp.status})")
+            unsaved = 0
+            # Unbuffered: whatever the state file claims is already in the OS cache
+            with open(part, "r+b", buffering=0) as f:
+                f.seek(offset)
+                remaining = segment["end"] - offset + 1
+                while remaining > 0:
+                    chunk = resp.read(min(CHUNK_SIZE, remaining))
+                    if not chunk:
+                        break
+                    f.write(chunk)
+                    remaining -= len(chunk)
+                    unsaved += len(chunk)
+                    with lock:
+                        segment["done"] += len(chunk)
+                        if unsaved >= STATE_SAVE_INTERVAL:
+                            self._save_state(dest, state)
+                            unsaved = 0
+                    progress_callback(downloaded(), state["size"])
+                if remaining > 0:
+                    raise DownloadError(f"Connection closed {remaining} bytes before the end of the range")
@@ -0,0 +1,178 @@
+import os
+import re
+import json
+import time
+import logging
+import statistics
+import threading
+from typing import Optional, Dict, List
+
+logger = logging.getLogger(__name__)
+
+# Phases in the order they normally happen during a start
+PHASES = [
+    "start_requested",
+    "java_resolved",
+    "command_built",
+    "process_spawned",
+    "first_log_line",
+    "mods_loading",
+    "preparing_spawn",
+    "done",
+]
+
+MOD_LOADING_PATTERN = re.compile(
+    r"ModLauncher running|Launching target '(?:neo)?forge|Loading \d+ mods|"
+    r"Fabric Loader|Quilt Loader|Forge Mod Loader"
+)
+PREPARING_SPAWN_PATTERN = re.compile(
+    r"Preparing spawn area|Preparing start region|Preparing level"
+)
+
+
+class StartupTimeline:
+    """
+    Timestamps every phase of a server start and keeps a history of them in
+    <server>/.mlsg/startup_history.json.
+
+    A finished start is flagged as a regression when its total time exceeds
+    the rolling median of the previous starts by more than `threshold`
+    (fraction) and by at least `min_delta` seconds.
+    """
+
+    def __init__(
+        self,
+        server_path: str,
+        history_size: int = 50,
+        median_window: int = 10,
+        threshold: float = 0.25,
+        min_delta: float = 5.0,
+    ):
+        self.history_file = os.path.join(server_path, ".mlsg", "startup_history.json")
+        self.history_size = history_size
+        self.median_window = median_window
+        self.threshold = threshold
+        self.min_delta = min_delta
+        self._lock = threading.Lock()
+        self._current: Optional[Dict] = None
+        self._history: List[Dict] = self._load_history()
+
+    def _load_history(self) -> List[Dict]:
+        try:
+            if os.path.exists(self.history_file):
+                with open(self.history_file, "r", encoding="utf-8") as f:
+                    return json.load(f)
+        except (json.JSONDecodeError, IOError) as e:
+            logger.warning(f"Error loading startup history: {e}")
+        return []
+
+    def _save_history(self):
+        try:
+            os.makedirs(os.path.dirname(self.history_file), exist_ok=True)
+            with open(self.history_file, "w", encoding="utf-8") as f:
+                json.dump(self._history, f, indent=2)
+        except IOError as e:
+            logger.error(f"Error saving startup history: {e}")
+
+    # --- Recording ---
+
+    def begin(self):
+        with self._lock:
+            self._current = {"started_at": time.time(), "marks": {}}
+            self._current["marks"]["start_requested"] = self._current["started_at"]
+
+    def mark(self, phase: str, ts: Optional[float] = None):
+        """Records the first occurrence of a phase in the current start."""
+        with self._lock:
+            if self._current is None or phase in self._current["marks"]:
+                return
+            self._current["marks"][phase] = ts or time.time()
+
+    def is_active(self) -> bool:
+        return self._current is not None
+
+    def observe_line(self, line: str):
+        """Detects log-driven phases (first line, mod loading, spawn preparation)."""
+        if self._current is None:
+            return
+        marks = self._current["marks"]
+        if "first_log_line" not in marks:
+            self.mark("first_log_line")
+        if "mods_loading" not in marks and MOD_LOADING_PATTERN.search(line):
+            self.mark("mods_loading")
+        if "preparing_spawn" not in marks and PREPARING_SPAWN_PATTERN.search(line):
+            self.mark("preparing_spawn")
+
+    def abort(self, reason: str):
+        """Stores an incomplete start (crash, missing Java...) without judging it."""
+        with self._lock:
+            if self._current is None:
+                return
+            entry = self._build_entry(self._current)
+            entry["completed"] = False
+            entry["error"] = reason
+            self._current = None
+            self._append(entry)
+
+    def finish(self, reported_seconds: Optional[float] = None, extra: Optional[Dict] = None) -> Optional[Dict]:
+        """Closes the current start at its Done line and checks for a regression."""
+        with self._lock:
+            if self._current is None:
+                return None
+            self._current["marks"].setdefault("done", time.time())
+            entry = self._build_entry(self._current)
+            entry["completed"] = True
+            entry["reported_seconds"] = reported_seconds
+            if extra:
+                entry.update(extra)
+            self._current = None
+
+            previous = [
+                h["total_seconds"]
+                for h in self._history
+                if h.get("completed") and h.get("total_seconds") is not None
+            ][-self.median_window:]
+            entry["baseline_median"] = round(statistics.median(previous), 2) if previous else None
+            entry["regression"] = bool(
+                entry["baseline_median"]
+                and entry["total_seconds"] > entry["baseline_median"] * (1 + self.threshold)
+                and entry["total_seconds"] - entry["baseline_median"] >= self.min_delta
+            )
+            self._append(entry)
+            return entry
+
+    def _build_entry(self, current: Dict) -> Dict:
+        start = current["started_at"]
+        marks = current["marks"]
+        offsets = {p: round(marks[p] - start, 3) for p in PHASES if p in marks}
+
+        # Duration of each phase = time until the next recorded phase
+        ordered = [p for p in PHASES if p in marks]
+        durations = {}
+        for a, b in zip(ordered, ordered[1:]):
+            durations[f"{a}->{b}"] = round(marks[b] - marks[a], 3)
+
+        return {
+            "started_at": start,
+            "offsets": offsets,
+            "durations": durations,
+            "total_seconds": offsets.get("done"),
+        }
+
+    def _append(self, entry: Dict):
+        self._history.append(entry)
+        del self._history[: -self.history_size]
+        self._save_history()
+
+    # --- Report ---
+
+    def get_history(self) -> Dict:
+        with self._lock:
+            history = list(self._history)
+        totals = [h["total_seconds"] for h in history if h.get("completed")][-self.median_window:]
+        return {
+            "history": history,
+            "rolling_median": round(statistics.median(totals), 2) if totals else None,
+            "threshold": self.threshold,
+            "in_progress": self._current is not None,
+        }
@@ -0,0 +1,323 @@
+import os
+import sys
+import time
+import select
+import struct
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# linux/inotify.h
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+WATCH_MASK = (
+    IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE
+    | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR
+)
+EVENT_HEADER = struct.Struct("iIII")
+
+
+def dimension_of(rel_dir: str) -> str:
+    """Dimension a world sub-folder belongs to ("" is the world root)."""
+    parts = rel_dir.replace(os.sep, "/").split("/") if rel_dir else []
+    if not parts:
+        return "other"
+    if parts[0] == "DIM-1":
+        return "minecraft:the_nether"
+    if parts[0] == "DIM1":
+        return "minecraft:the_end"
+    if parts[0] == "dimensions" and len(parts) >= 3:
+        return f"{parts[1]}:{parts[2]}"
+    if parts[0] in ("region", "entities", "poi", "data"):
+        return "minecraft:overworld"
+    return "other"
+
+
+class _Inotify:
+    """Thin ctypes wrapper over Linux inotify. Raises OSError if unavailable."""
+
+    def __init__(self):
+        import ctypes
+        import ctypes.util
+
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._ctypes = ctypes
+        self.fd = self._libc.inotify_init1(os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+    def add_watch(self, path: str) -> int:
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            raise OSError(self._ctypes.get_errno(), f"inotify_add_watch failed for {path}")
+        return wd
+
+    def rm_watch(self, wd: int):
+        self._libc.inotify_rm_watch(self.fd, wd)
+
+    def read_events(self, timeout: float):
+        """Yields (wd, mask, name) for the events available within timeout."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return
+        data = os.read(self.fd, 64 * 1024)
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+            yield wd, mask, os.fsdecode(name)
+
+    def close(self):
+        os.close(self.fd)
+
+
+class _WorldState:
+    def __init__(self, path: str):
+        self.path = path
+        # rel_dir -> {"mtime", "files": {name: size}, "subdirs": set, "size"}
+        self.dirs: Dict[str, Dict] = {}
+        self.scanned_at = 0.0
+        self.needs_poll = False  # Events were lost (inotify queue overflow)
+
+
+class WorldSizeTracker:
+    """
+    Tamaño de los mundos de un servidor, mantenido de forma incremental.
+
+    The first request for a world scans it once with os.scandir. After that,
+    on Linux, inotify reports which files changed and only those are
+    stat()ed again. Elsewhere (or if inotify is unavailable or overflows)
+    each known directory is checked on request, at most every
+    POLL_INTERVAL seconds: a directory whose mtime changed is listed again,
+    and the files of unchanged ones are only re-stat()ed (region files grow
+    in place without touching the directory mtime).
+
+    Sizes are kept per directory, so per-dimension subtotals are cheap.
+    At most max_worlds worlds are tracked; the least recently used is
+    dropped (with its watches) when the limit is exceeded.
+    """
+
+    POLL_INTERVAL = 5.0
+
+    def __init__(self, max_worlds: int = 16, use_inotify: bool = True):
+        self.max_worlds = max_worlds
+        self._worlds: "OrderedDict[str, _WorldState]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._inotify: Optional[_Inotify] = None
+        self._watches: Dict[int, Tuple[str, str]] = {}  # wd -> (world path, rel_dir)
+        self._dirty: Set[Tuple[str, str, str]] = set()  # (world path, rel_dir, name)
+        self._polling = False  # True once inotify can no longer be trusted
+        self._thread: Optional[threading.Thread] = None
+        self._closed = threading.Event()
+        if use_inotify and sys.platform.startswith("linux"):
+            try:
+                self._inotify = _Inotify()
+                self._thread = threading.Thread(target=self._watch_loop, daemon=True)
+                self._thread.start()
+            except (OSError, AttributeError) as e:
+                logger.info(f"World sizes: inotify unavailable ({e}), polling directories instead")
+                self._inotify = None
+
+    # --- Scanning ---
+
+    def _scan_dir(self, world: _WorldState, rel_dir: str):
+        """Lists one directory (and recursively its new subdirectories)."""
+        full = os.path.join(world.path, rel_dir) if rel_dir else world.path
+        try:
+            mtime = os.stat(full).st_mtime
+            entries = list(os.scandir(full))
+        except OSError:
+            self._drop_dir(world, rel_dir)
+            return
+        files, subdirs = {}, set()
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.add(entry.name)
+                elif entry.is_file(follow_symlinks=False):
+                    files[entry.name] = entry.stat(follow_symlinks=False).st_size
+            except OSError:
+                continue
+        old = world.dirs.get(rel_dir)
+        world.dirs[rel_dir] = {"mtime": mtime, "files": files, "subdirs": subdirs, "size": sum(files.values())}
+        if old is None:
+            self._watch(world, rel_dir)
+        for name in (old["subdirs"] - subdirs) if old else ():
+            self._drop_dir(world, os.path.join(rel_dir, name) if rel_dir else name)
+        for name in subdirs:
+            child = os.path.join(rel_dir, name) if rel_dir else name
+            if child not in world.dirs:
+                self._scan_dir(world, child)
+
+    def _drop_dir(self, world: _WorldState, rel_dir: str):
+        prefix = rel_dir + os.sep
+        for key in [k for k in world.dirs if k == rel_dir or k.startswith(prefix)]:
+            del world.dirs[key]
+            self._unwatch(world, key)
+
+    def _restat_dir(self, world: _WorldState, rel_dir: str):
+        info = world.dirs[rel_dir]
+        full = os.path.join(world.path, rel_dir) if rel_dir else world.path
+        try:
+            mtime = os.stat(full).st_mtime
+        except OSError:
+            self._drop_dir(world, rel_dir)
+            return
+        if mtime != info["mtime"]:
+            self._scan_dir(world, rel_dir)
+            return
+        for name in list(info["files"]):
+            try:
+                info["files"][name] = os.stat(os.path.join(full, name)).st_size
+            except OSError:
+                info["files"].pop(name, None)
+        info["size"] = sum(info["files"].values())
+
+    def _poll(self, world: _WorldState):
+        for rel_dir in list(world.dirs):
+            if rel_dir in world.dirs:
+                self._restat_dir(world, rel_dir)
+
+    # --- inotify ---
+
+    def _watch(self, world: _WorldState, rel_dir: str):
+        if not self._inotify:
+            return
+        try:
+            wd = self._inotify.add_watch(os.path.join(world.path, rel_dir) if rel_dir else world.path)
+            self._watches[wd] = (world.path, rel_dir)
+        except OSError as e:
+            # Out of watches (fs.inotify.max_user_watches): polling covers it
+            logger.info(f"World sizes: {e}, polling directories instead")
+            self._polling = True
+
+    def _unwatch(self, world: _WorldState, rel_dir: str):
+        if not self._inotify:
+            return
+        for wd, target in list(self._watches.items()):
+            if target == (world.path, rel_dir):
+                self._inotify.rm_watch(wd)
+                del self._watches[wd]
+
+    def _watch_loop(self):
+        while not self._closed.is_set():
+            try:
+                events = list(self._inotify.read_events(1.0))
+            except OSError as e:
+                logger.warning(f"World sizes: inotify read failed ({e}), polling directories instead")
+                with self._lock:
+                    self._polling = True
+                return
+            if not events:
+                continue
+            with self._lock:
+                for wd, mask, name in events:
+                    if mask & IN_Q_OVERFLOW:
+                        for world in self._worlds.values():
+                            world.needs_poll = True
+                        continue
+                    target = self._watches.get(wd)
+                    if target is None:
+                        continue
+                    if mask & IN_IGNORED:
+                        self._watches.pop(wd, None)
+                    self._dirty.add((target[0], target[1], name))
+
+    def _apply_dirty(self, world: _WorldState):
+        dirty = [(rel_dir, name) for path, rel_dir, name in self._dirty if path == world.path]
+        if not dirty:
+            return
+        self._dirty = {d for d in self._dirty if d[0] != world.path}
+        rescan = set()
+        for rel_dir, name in dirty:
+            info = world.dirs.get(rel_dir)
+            if info is None:
+                continue
+            if not name or name in info["subdirs"]:
+                rescan.add(rel_dir)  # The directory itself, or a subdirectory came/went
+                continue
+            full = os.path.join(world.path, rel_dir, name)
+            try:
+                st = os.stat(full)
+                if os.path.isdir(full):
+                    rescan.add(rel_dir)
+                    continue
+                info["files"][name] = st.st_size
+            except OSError:
+                info["files"].pop(name, None)
+                if name in info["subdirs"]:
+                    rescan.add(rel_dir)
+            info["size"] = sum(info["files"].values())
+        for rel_dir in rescan:
+            if rel_dir in world.dirs:
+                self._scan_dir(world, rel_dir)
+
+    # --- Public API ---
+
+    def _get_world(self, world_path: str) -> _WorldState:
+        world = self._worlds.get(world_path)
+        if world is None:
+            world = _WorldState(world_path)
+            self._scan_dir(world, "")
+            world.scanned_at = time.time()
+            self._worlds[world_path] = world
+            while len(self._worlds) > self.max_worlds:
+                _, evicted = self._worlds.popitem(last=False)
+                for rel_dir in list(evicted.dirs):
+                    self._unwatch(evicted, rel_dir)
+        else:
+            self._worlds.move_to_end(world_path)
+            if self._inotify and not self._polling:
+                if world.needs_poll:
+                    world.needs_poll = False
+                    self._poll(world)
+                self._apply_dirty(world)
+            elif time.time() - world.scanned_at >= self.POLL_INTERVAL:
+                self._poll(world)
+                world.scanned_at = time.time()
+        return world
+
+    def get_size(self, world_path: str) -> Dict:
+        """{"total": bytes, "dimensions": {dimension: bytes}} for a world folder."""
+        with self._lock:
+            world = self._get_world(os.path.normpath(world_path))
+            dimensions: Dict[str, int] = {}
+            for rel_dir, info in world.dirs.items():
+                dim = dimension_of(rel_dir)
+                dimensions[dim] = dimensions.get(dim, 0) + info["size"]
+            return {"total": sum(dimensions.values()), "dimensions": dimensions}
+
+    def forget(self, world_path: str):
+        with self._lock:
+            world = self._worlds.pop(os.path.normpath(world_path), None)
+            if world:
+                for rel_dir in list(world.dirs):
+                    self._unwatch(world, rel_dir)
+
+    def close(self):
+        """Stops the watcher thread and releases the inotify descriptor."""
+        self._closed.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+        with self._lock:
+            if self._inotify:
+                self._inotify.close()
+                self._inotify = None
+            self._polling = True
+            self._watches.clear()
+            self._worlds.clear()